@@ -0,0 +1,136 @@
+"""Throughput of the sync and async database paths under slow queries.
+
+Each mode runs in its own process against a fresh SQLite file. Every SQL
+statement is slowed down by ``--delay-ms`` inside the database driver's
+thread, the way a slow MySQL query keeps the connection busy without using
+the app's CPU, and ``--concurrency`` clients hammer one route in-process::
+
+    python -m benchmarks.async_vs_sync --concurrency 200 --requests 2000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ("sync", "async")
+
+
+def slow_down(engine, delay: float, is_async: bool):
+    """Make every statement on ``engine`` spend ``delay`` seconds in SQLite."""
+    from sqlalchemy import event
+
+    sync_engine = engine.sync_engine if is_async else engine
+
+    @event.listens_for(sync_engine, "connect")
+    def install_handler(dbapi_connection, connection_record):
+        pending = connection_record.info.setdefault("slow", [False])
+
+        def handler():
+            # runs in the thread executing the statement
+            if pending[0]:
+                pending[0] = False
+                time.sleep(delay)
+            return 0
+
+        if is_async:
+            dbapi_connection.await_(
+                dbapi_connection._connection.set_progress_handler(handler, 50)
+            )
+        else:
+            dbapi_connection.set_progress_handler(handler, 50)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def flag_statement(conn, cursor, statement, parameters, context, executemany):
+        conn.info["slow"][0] = True
+
+
+async def drive(app, route: str, concurrency: int, requests: int):
+    import httpx
+
+    latencies = []
+    remaining = iter(range(requests))
+
+    async def client_loop(client):
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.get(route)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "seconds": round(elapsed, 3),
+        "throughput": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+    }
+
+
+def child(args):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ.update(
+        DATABASE_MODE=args.child,
+        DATABASE_URL=f"sqlite:///{path}?check_same_thread=false",
+        ASYNC_DATABASE_URL=f"sqlite+aiosqlite:///{path}",
+    )
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    import database
+    import main
+    from models import SeaRegionModel
+
+    db = database.SessionLocal()
+    db.add(SeaRegionModel(id="0" * 36, name="Pacific"))
+    db.commit()
+    db.close()
+
+    is_async = args.child == "async"
+    engine = database.async_engine if is_async else database.engine
+    slow_down(engine, delay=args.delay_ms / 1000, is_async=is_async)
+    route = args.route.replace("{id}", "0" * 36)
+    result = asyncio.run(drive(main.app, route, args.concurrency, args.requests))
+    print(json.dumps({"mode": args.child, **result}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--delay-ms", type=float, default=500)
+    parser.add_argument("--route", default="/sea_region/{id}")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args)
+
+    results = []
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.async_vs_sync", *sys.argv[1:]]
+            + ["--child", mode],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    print(f"{'mode':<6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for result in results:
+        print(
+            f"{result['mode']:<6} {result['throughput']:>8} "
+            f"{result['p50_ms']:>8} {result['p95_ms']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
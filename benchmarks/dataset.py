@@ -0,0 +1,189 @@
+"""Seed a synthetic sea region -> country -> state -> city hierarchy.
+
+The dataset is a pure function of its sizes and ``--seed``: the id, name and
+parent of every row are derived from its level and position, so the load
+test (``benchmarks.load``) can address any row without reading it back, and
+two databases seeded with the same arguments hold the same rows. Children
+are spread evenly over their parents.
+
+Rows go in with multi-row INSERTs of ``--batch-size``, one commit per batch,
+together with their search index rows unless ``--no-search-index`` is given.
+Without ``--url`` the app's database is used; the tables are dropped and
+recreated first, so point it at a scratch database::
+
+    python -m benchmarks.dataset --regions 50 --countries 250 --states 10000 \\
+        --cities 2000000 --url mysql+mysqlconnector://...
+"""
+
+import argparse
+import hashlib
+import logging
+import time
+from uuid import UUID
+
+logger = logging.getLogger(__name__)
+
+# level: (level above, parent column), top-down
+LEVELS = {
+    "sea_region": (None, None),
+    "country": ("sea_region", "sea_region_id"),
+    "state": ("country", "country_id"),
+    "city": ("state", "state_id"),
+}
+SYLLABLES = (
+    "ka mo ra ni ta lo be su vi da no ri ma ze lu ko sa ha ti po"
+    " an el or un is ar en ol ul ir am ek ob ut ay"
+).split()
+
+
+class Dataset:
+    """Sizes and seed of a synthetic hierarchy, and the rows they define."""
+
+    def __init__(
+        self,
+        regions: int = 20,
+        countries: int = 100,
+        states: int = 1000,
+        cities: int = 20000,
+        seed: int = 0,
+    ):
+        self.counts = {
+            "sea_region": regions,
+            "country": countries,
+            "state": states,
+            "city": cities,
+        }
+        self.seed = seed
+
+    def _digest(self, level: str, index: int):
+        key = f"{self.seed}/{level}/{index}".encode()
+        return hashlib.blake2b(key, digest_size=16).digest()
+
+    def id(self, level: str, index: int):
+        return str(UUID(bytes=self._digest(level, index), version=4))
+
+    def name(self, level: str, index: int):
+        digest = self._digest(f"{level}-name", index)
+        syllables = 2 + digest[0] % 3
+        word = "".join(
+            SYLLABLES[byte % len(SYLLABLES)] for byte in digest[1:][:syllables]
+        )
+        # names repeat across rows, as real ones do; the suffix keeps most apart
+        return f"{word.capitalize()} {digest[15] % 100}"
+
+    def parent(self, level: str, index: int):
+        """Position of the row's parent in the level above."""
+        return index % self.counts[LEVELS[level][0]]
+
+    def rows(self, level: str, start: int, stop: int):
+        rows = []
+        for index in range(start, min(stop, self.counts[level])):
+            row = {"id": self.id(level, index), "name": self.name(level, index)}
+            # the parent, then the ancestor ids states and cities carry too
+            child, position = level, index
+            above, parent_column = LEVELS[child]
+            while above:
+                position = self.parent(child, position)
+                row[parent_column] = self.id(above, position)
+                child, (above, parent_column) = above, LEVELS[above]
+            rows.append(row)
+        return rows
+
+    def describe(self):
+        return {**self.counts, "seed": self.seed}
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    defaults = Dataset()
+    group = parser.add_argument_group("dataset")
+    group.add_argument("--regions", type=int, default=defaults.counts["sea_region"])
+    group.add_argument("--countries", type=int, default=defaults.counts["country"])
+    group.add_argument("--states", type=int, default=defaults.counts["state"])
+    group.add_argument("--cities", type=int, default=defaults.counts["city"])
+    group.add_argument("--seed", type=int, default=0)
+
+
+def from_arguments(args):
+    return Dataset(
+        regions=args.regions,
+        countries=args.countries,
+        states=args.states,
+        cities=args.cities,
+        seed=args.seed,
+    )
+
+
+def seed(db, dataset: Dataset, batch_size: int, search_index: bool = True):
+    """Insert every row of ``dataset`` into the (empty) tables behind ``db``."""
+    from libs.bulk import bulk_insert
+    from libs.search import index_rows
+    from models import CityModel, CountryModel, SeaRegionModel, StateModel
+
+    models = {
+        "sea_region": SeaRegionModel,
+        "country": CountryModel,
+        "state": StateModel,
+        "city": CityModel,
+    }
+    for level in LEVELS:
+        model = models[level]
+        started = time.perf_counter()
+        for start in range(0, dataset.counts[level], batch_size):
+            rows = dataset.rows(level, start, start + batch_size)
+            bulk_insert(db=db, model=model, rows=rows)
+            if search_index:
+                index_rows(
+                    db=db,
+                    table=model.__tablename__,
+                    rows=[(row["id"], row["name"]) for row in rows],
+                    replace=False,
+                )
+            db.commit()
+        elapsed = time.perf_counter() - started
+        logger.info(
+            "%s: %s rows in %.1fs, %.0f rows/s",
+            level,
+            dataset.counts[level],
+            elapsed,
+            dataset.counts[level] / elapsed if elapsed else 0,
+        )
+
+
+def recreate(engine):
+    import models
+
+    models.Base.metadata.drop_all(engine)
+    models.Base.metadata.create_all(engine)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    parser.add_argument("--url", help="scratch database, defaults to the app's")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument(
+        "--no-search-index",
+        dest="search_index",
+        action="store_false",
+        help="skip the trigram rows (search routes then find nothing)",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    import database
+    import libs.cache  # noqa: F401 (commits bump the shared cache versions)
+
+    engine = create_engine(args.url) if args.url else database.engine
+    recreate(engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        seed(db, from_arguments(args), args.batch_size, args.search_index)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
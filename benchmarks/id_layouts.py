@@ -0,0 +1,125 @@
+"""Insert and lookup cost of random string ids vs time-ordered binary ids.
+
+Each layout runs in its own process, because the id settings are read at
+import: ``uuid4`` ids in ``VARCHAR(36)`` columns (the default) and ``uuid7``
+ids in ``BINARY(16)`` columns. ``--rows`` cities are inserted in batches of
+``BATCH_SIZE`` under one state, then ``--lookups`` random cities are read
+back by id, and the size of the city table with its indexes is reported.
+
+Without ``--url`` every layout gets a fresh SQLite file. The page splits
+random keys cause show up best on InnoDB, so point ``--url`` at a scratch
+MySQL database; its tables are dropped and recreated for each layout::
+
+    python -m benchmarks.id_layouts --rows 200000 --url mysql+mysqlconnector://...
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+LAYOUTS = {
+    "uuid4-string": {"ID_FORMAT": "uuid4", "ID_STORAGE": "string"},
+    "uuid7-binary": {"ID_FORMAT": "uuid7", "ID_STORAGE": "binary"},
+}
+
+
+def table_bytes(db, path):
+    from sqlalchemy import text
+
+    if db.get_bind().dialect.name == "mysql":
+        db.execute(text("ANALYZE TABLE citys"))
+        return db.execute(
+            text(
+                "SELECT data_length + index_length FROM information_schema.tables"
+                " WHERE table_schema = DATABASE() AND table_name = 'citys'"
+            )
+        ).scalar()
+    return os.path.getsize(path)
+
+
+def child(args):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ.update(
+        DATABASE_MODE="sync",
+        DATABASE_URL=args.url or f"sqlite:///{path}",
+        **LAYOUTS[args.child],
+    )
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    import database
+    from libs.bulk import BATCH_SIZE, bulk_insert
+    from libs.utils import generate_id
+    from models import CityModel, CountryModel, SeaRegionModel, StateModel
+
+    database.Base.metadata.drop_all(database.engine)
+    database.Base.metadata.create_all(database.engine)
+    db = database.SessionLocal()
+    parent_id = generate_id()
+    db.add(SeaRegionModel(id=parent_id, name="Pacific"))
+    db.add(CountryModel(id=parent_id, name="Japan", sea_region_id=parent_id))
+    db.add(StateModel(id=parent_id, name="Tokyo", country_id=parent_id))
+    db.commit()
+
+    ids = []
+    started = time.perf_counter()
+    for start in range(0, args.rows, BATCH_SIZE):
+        rows = [
+            {"id": generate_id(), "name": f"City {index}", "state_id": parent_id}
+            for index in range(start, min(start + BATCH_SIZE, args.rows))
+        ]
+        bulk_insert(db=db, model=CityModel, rows=rows)
+        db.commit()
+        ids.extend(row["id"] for row in rows)
+    insert_seconds = time.perf_counter() - started
+
+    sample = random.sample(ids, min(args.lookups, len(ids)))
+    started = time.perf_counter()
+    for city_id in sample:
+        db.query(CityModel).filter(CityModel.id == city_id).one()
+    lookup_seconds = time.perf_counter() - started
+
+    result = {
+        "layout": args.child,
+        "insert_rows_per_s": round(args.rows / insert_seconds),
+        "lookups_per_s": round(len(sample) / lookup_seconds),
+        "table_mb": round(table_bytes(db, path) / 2**20, 1),
+    }
+    db.close()
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=10000)
+    parser.add_argument("--url", help="scratch database, SQLite files by default")
+    parser.add_argument("--child", choices=LAYOUTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args)
+
+    results = []
+    for layout in LAYOUTS:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.id_layouts", *sys.argv[1:]]
+            + ["--child", layout],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    print(f"{'layout':<14} {'inserts/s':>10} {'lookups/s':>10} {'MB':>7}")
+    for result in results:
+        print(
+            f"{result['layout']:<14} {result['insert_rows_per_s']:>10} "
+            f"{result['lookups_per_s']:>10} {result['table_mb']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,429 @@
+"""Load test of every admin route against a synthetic dataset.
+
+Each scenario sends ``--requests`` requests to one route from
+``--concurrency`` concurrent clients and reports throughput and p50/p95/p99
+latency. Reads come first; then rows are added (single and bulk), seeded
+rows updated with their own values, and the added rows deleted again (single
+and batch), so the dataset ends as it began apart from soft-deleted rows.
+
+By default the app runs in-process on a fresh SQLite file seeded with the
+``benchmarks.dataset`` options. ``--url`` runs it on another database
+instead, seeding it first with ``--seed-data`` (its tables are dropped and
+recreated), and ``--base-url`` sends the requests to a running server whose
+database was seeded with the same options. DATABASE_MODE, CACHE_TTL and the
+other settings are read from the environment as usual::
+
+    python -m benchmarks.load --save-baseline baseline.json
+    python -m benchmarks.load --baseline baseline.json --max-throughput-drop 10
+
+With ``--baseline`` a scenario regresses when its throughput dropped or its
+p95 latency grew by more than the given percentages, or when it failed
+requests the baseline did not; any regression exits with status 1.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks import dataset as synthetic
+
+
+class Scenario:
+    """One route under load.
+
+    ``request(index)`` gives the ``(method, url, httpx options)`` of the
+    index-th request, ``expect`` its status code; ``collect`` receives each
+    successful response. ``count`` overrides the number of requests.
+    """
+
+    def __init__(self, name, request, expect=200, collect=None, count=None):
+        self.name = name
+        self.request = request
+        self.expect = expect
+        self.collect = collect
+        self.count = count
+
+
+def scenarios(data: synthetic.Dataset, bulk_size: int):
+    counts = data.counts
+    # rows added by the add scenarios, for the delete scenarios to remove
+    added = {level: [] for level in counts}
+    batches = {level: [] for level in counts}
+
+    def row(level, index):
+        return data.id(level, index % counts[level])
+
+    def name(level, index):
+        return data.name(level, index % counts[level])
+
+    def parent(level, index):
+        above, _ = synthetic.LEVELS[level]
+        return data.id(above, data.parent(level, index % counts[level]))
+
+    def page(level, index):
+        return {"start": (index * 10) % max(min(counts[level], 1000) - 10, 1)}
+
+    # (level, path, parent parameter)
+    routes = [
+        ("sea_region", "/sea_region", None),
+        ("country", "/countries", "sea_region_id"),
+        ("state", "/state", "country_id"),
+        ("city", "/city", "state_id"),
+    ]
+    reads, writes = [], []
+    for level, path, parent_key in routes:
+
+        def body(index, level=level, parent_key=parent_key):
+            value = {"name": name(level, index)}
+            if parent_key:
+                value[parent_key] = parent(level, index)
+            return value
+
+        def collect_one(response, level=level):
+            added[level].append(response.json()["id"])
+
+        def collect_bulk(response, level=level):
+            batches[level].append([row["id"] for row in response.json()["created"]])
+
+        def under_parent(index, level=level, parent_key=parent_key):
+            return {parent_key: parent(level, index)} if parent_key else {}
+
+        reads += [
+            Scenario(
+                f"GET {path}/{{id}}",
+                lambda index, level=level, path=path: (
+                    "GET",
+                    f"{path}/{row(level, index * 7919)}",
+                    {},
+                ),
+            ),
+            Scenario(
+                f"GET {path}",
+                lambda index, level=level, path=path: (
+                    "GET",
+                    path,
+                    {"params": page(level, index)},
+                ),
+            ),
+            Scenario(
+                f"GET {path}?search=",
+                lambda index, level=level, path=path: (
+                    "GET",
+                    path,
+                    {"params": {"search": name(level, index * 7919)[:3]}},
+                ),
+            ),
+            Scenario(
+                f"GET {path}/all/",
+                lambda index, path=path, under_parent=under_parent: (
+                    "GET",
+                    f"{path}/all/",
+                    {"params": under_parent(index)},
+                ),
+            ),
+        ]
+        if parent_key:
+            reads.append(
+                Scenario(
+                    f"GET {path}?{parent_key}=",
+                    lambda index, path=path, under_parent=under_parent: (
+                        "GET",
+                        path,
+                        {"params": under_parent(index)},
+                    ),
+                )
+            )
+        writes += [
+            Scenario(
+                f"POST {path}",
+                lambda index, path=path, body=body: (
+                    "POST",
+                    path,
+                    {"json": body(index)},
+                ),
+                expect=201,
+                collect=collect_one,
+            ),
+            Scenario(
+                f"POST {path}/bulk",
+                lambda index, path=path, body=body: (
+                    "POST",
+                    f"{path}/bulk",
+                    {"json": [body(index * bulk_size + i) for i in range(bulk_size)]},
+                ),
+                expect=201,
+                collect=collect_bulk,
+            ),
+            Scenario(
+                f"PUT {path}/{{id}}",
+                lambda index, level=level, path=path, body=body: (
+                    "PUT",
+                    f"{path}/{row(level, index * 7919)}",
+                    {"json": body(index * 7919)},
+                ),
+            ),
+        ]
+    # children first would not matter (added rows have none), but it keeps
+    # the delete order the same as the purge job's
+    for level, path, _ in reversed(routes):
+        writes += [
+            Scenario(
+                f"DELETE {path}/{{id}}",
+                lambda index, level=level, path=path: (
+                    "DELETE",
+                    f"{path}/{added[level][index]}",
+                    {},
+                ),
+                count=lambda level=level: len(added[level]),
+            ),
+            Scenario(
+                f"DELETE {path}?ids=",
+                lambda index, level=level, path=path: (
+                    "DELETE",
+                    path,
+                    {"params": {"ids": ",".join(batches[level][index])}},
+                ),
+                count=lambda level=level: len(batches[level]),
+            ),
+        ]
+    reads += [
+        Scenario(
+            "GET /tree?root_type=country",
+            lambda index: (
+                "GET",
+                "/tree",
+                {"params": {"root_type": "country", "root_id": row("country", index)}},
+            ),
+        ),
+        Scenario(
+            "GET /tree?format=ndjson",
+            lambda index: ("GET", "/tree", {"params": {"format": "ndjson"}}),
+        ),
+    ]
+    # filters on the ancestor ids states and cities carry
+    for path, ancestor in (
+        ("/state", "sea_region"),
+        ("/city", "country"),
+        ("/city", "sea_region"),
+    ):
+        reads.append(
+            Scenario(
+                f"GET {path}?{ancestor}_id=",
+                lambda index, path=path, ancestor=ancestor: (
+                    "GET",
+                    path,
+                    {"params": {f"{ancestor}_id": row(ancestor, index)}},
+                ),
+            )
+        )
+    return reads + writes
+
+
+def percentile(latencies, q: float):
+    """Nearest-rank ``q`` percentile of the sorted ``latencies``."""
+    if not latencies:
+        return None
+    return latencies[max(math.ceil(len(latencies) * q) - 1, 0)]
+
+
+async def run(client, scenario: Scenario, requests: int, concurrency: int):
+    count = scenario.count() if scenario.count else requests
+    latencies, failures = [], []
+    remaining = iter(range(count))
+
+    async def client_loop():
+        for index in remaining:
+            method, url, options = scenario.request(index)
+            started = time.perf_counter()
+            response = await client.request(method, url, **options)
+            elapsed = time.perf_counter() - started
+            if response.status_code != scenario.expect:
+                failures.append(f"{response.status_code} {response.text[:200]}")
+                continue
+            latencies.append(elapsed)
+            if scenario.collect:
+                scenario.collect(response)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    if failures:
+        logging.warning(
+            "%s: %s failed, e.g. %s", scenario.name, len(failures), failures[0]
+        )
+    latencies.sort()
+    result = {
+        "requests": count,
+        "errors": len(failures),
+        "throughput": round(len(latencies) / elapsed, 1) if elapsed else None,
+    }
+    for name, q in (("p50_ms", 0.5), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+        value = percentile(latencies, q)
+        result[name] = None if value is None else round(value * 1000, 2)
+    return result
+
+
+def change(new, old):
+    if not new or not old:
+        return None
+    return (new - old) / old * 100
+
+
+def compare(results, baseline, max_throughput_drop: float, max_latency_increase: float):
+    """Per scenario, the list of reasons it regressed against ``baseline``."""
+    regressions = {}
+    for name, result in results.items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        reasons = []
+        throughput = change(result["throughput"], before["throughput"])
+        if throughput is not None and -throughput > max_throughput_drop:
+            reasons.append(f"throughput {throughput:+.1f}%")
+        latency = change(result["p95_ms"], before["p95_ms"])
+        if latency is not None and latency > max_latency_increase:
+            reasons.append(f"p95 {latency:+.1f}%")
+        if result["errors"] and not before["errors"]:
+            reasons.append(f"{result['errors']} errors")
+        if reasons:
+            regressions[name] = reasons
+    return regressions
+
+
+def report(results, baseline=None, regressions=()):
+    print(
+        f"{'scenario':<34} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        f" {'errors':>6}" + (f" {'req/s Δ':>8} {'p95 Δ':>8}" if baseline else "")
+    )
+    for name, result in results.items():
+        line = (
+            f"{name:<34} {result['throughput']:>8} {result['p50_ms']!s:>8}"
+            f" {result['p95_ms']!s:>8} {result['p99_ms']!s:>8} {result['errors']:>6}"
+        )
+        before = baseline["results"].get(name) if baseline else None
+        if before:
+            deltas = (
+                change(result["throughput"], before["throughput"]),
+                change(result["p95_ms"], before["p95_ms"]),
+            )
+            line += "".join(
+                f" {'':>8}" if delta is None else f" {delta:>+7.1f}%"
+                for delta in deltas
+            )
+        if name in regressions:
+            line += "  REGRESSED: " + ", ".join(regressions[name])
+        print(line)
+
+
+def prepare(args, data: synthetic.Dataset):
+    """Point the app at the database under test, seeded, and return it."""
+    if not args.url:
+        path = os.path.join(tempfile.mkdtemp(), "bench.db")
+        os.environ.update(
+            DATABASE_URL=f"sqlite:///{path}?check_same_thread=false",
+            ASYNC_DATABASE_URL=f"sqlite+aiosqlite:///{path}",
+        )
+    else:
+        os.environ["DATABASE_URL"] = args.url
+        if args.async_url:
+            os.environ["ASYNC_DATABASE_URL"] = args.async_url
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    import database
+    import libs.cache  # noqa: F401 (commits bump the shared cache versions)
+
+    if not args.url or args.seed_data:
+        synthetic.recreate(database.engine)
+        db = database.SessionLocal()
+        try:
+            synthetic.seed(db, data, batch_size=1000)
+        finally:
+            db.close()
+
+    import main
+
+    return main.app
+
+
+async def drive(args, data: synthetic.Dataset, app=None):
+    import httpx
+
+    if app is not None:
+        client = httpx.AsyncClient(app=app, base_url="http://bench", timeout=None)
+    else:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=None)
+    results = {}
+    async with client:
+        for scenario in scenarios(data, args.bulk_size):
+            if args.only and not any(part in scenario.name for part in args.only):
+                continue
+            results[scenario.name] = await run(
+                client, scenario, args.requests, args.concurrency
+            )
+            logging.info("%s: %s", scenario.name, results[scenario.name])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    synthetic.add_arguments(parser)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--bulk-size", type=int, default=100)
+    parser.add_argument(
+        "--only", action="append", help="run the scenarios containing this text"
+    )
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="database for the in-process app")
+    target.add_argument("--base-url", help="running server, e.g. http://localhost:8000")
+    parser.add_argument("--async-url", help="ASYNC_DATABASE_URL to go with --url")
+    parser.add_argument(
+        "--seed-data", action="store_true", help="recreate and seed the --url database"
+    )
+    parser.add_argument("--save-baseline", help="write the results to this file")
+    parser.add_argument("--baseline", help="compare with the results in this file")
+    parser.add_argument("--max-throughput-drop", type=float, default=10, help="percent")
+    parser.add_argument(
+        "--max-latency-increase", type=float, default=20, help="percent, on p95"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(message)s")
+    data = synthetic.from_arguments(args)
+    app = None if args.base_url else prepare(args, data)
+    results = asyncio.run(drive(args, data, app))
+
+    settings = {
+        "dataset": data.describe(),
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "bulk_size": args.bulk_size,
+        "target": args.base_url or os.environ["DATABASE_URL"].split(":")[0],
+        "database_mode": os.getenv("DATABASE_MODE", "sync"),
+    }
+    baseline, regressions = None, {}
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if baseline["settings"] != settings:
+            logging.warning(
+                "baseline was taken with other settings: %s", baseline["settings"]
+            )
+        regressions = compare(
+            results, baseline, args.max_throughput_drop, args.max_latency_increase
+        )
+    report(results, baseline, regressions)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as file:
+            json.dump({"settings": settings, "results": results}, file, indent=2)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
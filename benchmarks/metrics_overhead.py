@@ -0,0 +1,90 @@
+"""Hot-path cost of the per-route request metrics.
+
+Times ``metrics.observe`` on its own, then drives ``--requests`` sequential
+requests in-process through a one-route app three ways: without middleware,
+with a middleware that only calls the next one (the cost every ``http``
+middleware pays), and with ``metrics.record_request``. No database is
+involved, so the differences are the middleware's own::
+
+    python -m benchmarks.metrics_overhead --requests 5000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+
+def time_observe(calls: int):
+    from libs import metrics
+
+    shard = metrics.Shard()
+    values = [random.expovariate(1 / 20) for _ in range(1024)]
+    started = time.perf_counter()
+    for index in range(calls):
+        metrics.observe(shard, "/city/{city_id}", 200, values[index & 1023])
+    return (time.perf_counter() - started) / calls * 1e9
+
+
+def build_app(middleware):
+    from fastapi import FastAPI
+
+    app = FastAPI()
+
+    @app.get("/city/{city_id}")
+    async def get_city(city_id: str):
+        return {"id": city_id}
+
+    if middleware is not None:
+        app.middleware("http")(middleware)
+    return app
+
+
+async def pass_through(request, call_next):
+    return await call_next(request)
+
+
+async def drive(app, requests: int):
+    import httpx
+
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        for index in range(200):
+            await client.get(f"/city/{index}")
+        started = time.perf_counter()
+        for index in range(requests):
+            await client.get(f"/city/{index}")
+        return (time.perf_counter() - started) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--observations", type=int, default=1000000)
+    args = parser.parse_args()
+
+    os.environ.setdefault(
+        "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    )
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from libs import metrics
+
+    print(f"observe: {time_observe(args.observations):.0f} ns per call")
+    baseline = None
+    for name, middleware in (
+        ("no middleware", None),
+        ("pass-through", pass_through),
+        ("record_request", metrics.record_request),
+    ):
+        per_request = asyncio.run(drive(build_app(middleware), args.requests))
+        baseline = baseline or per_request
+        print(
+            f"{name:<15} {per_request:8.1f} us per request"
+            f" (+{per_request - baseline:.1f})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Cost of serializing a large city list with and without the FAST_JSON path.
+
+Builds ``--rows`` City rows with their State -> Country -> SeaRegion parents
+in memory (no database, so only serialization is measured) and times both
+ways ``run_db`` can turn them into response bytes::
+
+    python -m benchmarks.serialization --rows 10000
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from typing import List
+
+
+def build_rows(count: int):
+    from models import CityModel, CountryModel, SeaRegionModel, StateModel
+
+    region = SeaRegionModel(id="r" * 36, name="Pacific Ocean")
+    countries = [
+        CountryModel(id=f"{i:036d}", name=f"Country {i}", sea_region=region)
+        for i in range(50)
+    ]
+    states = [
+        StateModel(id=f"{i:036d}", name=f"State {i}", country=countries[i % 50])
+        for i in range(500)
+    ]
+    return [
+        CityModel(id=f"{i:036d}", name=f"City {i} é", state=states[i % 500])
+        for i in range(count)
+    ]
+
+
+def pydantic_path(rows):
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from pydantic import parse_obj_as
+
+    from routers.admin.v1.schemas import City
+
+    # what run_db and FastAPI's response_model handling do together
+    data = parse_obj_as(List[City], rows)
+    field_value = parse_obj_as(List[City], data)
+    return JSONResponse(jsonable_encoder(field_value)).body
+
+
+def fast_path(rows):
+    from libs.serialization import FastJSONResponse, dump
+    from routers.admin.v1.schemas import City
+
+    return FastJSONResponse(dump(List[City], rows)).body
+
+
+def measure(function, rows, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = function(rows)
+        timings.append(time.perf_counter() - started)
+    return body, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = build_rows(args.rows)
+    slow_body, slow = measure(pydantic_path, rows, args.repeat)
+    fast_body, fast = measure(fast_path, rows, args.repeat)
+    if slow_body != fast_body:
+        sys.exit("the two paths produced different bytes")
+    print(f"{args.rows} rows, {len(fast_body)} bytes, median of {args.repeat}")
+    print(f"pydantic + JSONResponse  {slow * 1000:8.1f} ms")
+    print(f"dump + FastJSONResponse  {fast * 1000:8.1f} ms  ({slow / fast:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Round trips per write: the guarded single-statement path vs the old one.
+
+Runs ``--writes`` state adds, updates and deletes through the CRUD functions
+and through a copy of the earlier ORM write path (SELECT the parent, SELECT
+the row, write, commit, refresh) against a fresh SQLite file, counting every
+statement and COMMIT the database receives, response serialization included::
+
+    python -m benchmarks.write_round_trips --writes 500
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+
+def legacy_add(state_schema, db):
+    from libs.search import index_rows
+    from libs.utils import generate_id
+    from models import CountryModel, StateModel
+
+    id = generate_id()
+    db_state = StateModel(
+        id=id, name=state_schema.name, country_id=state_schema.country_id
+    )
+    db.query(CountryModel).filter(
+        CountryModel.id == state_schema.country_id, CountryModel.is_deleted == False
+    ).first()
+    db.add(db_state)
+    index_rows(db=db, table="states", rows=[(id, state_schema.name)], replace=False)
+    db.commit()
+    db.refresh(db_state)
+    return db_state
+
+
+def legacy_update(state_schema, state_id, db):
+    from libs.search import index_rows
+    from libs.utils import now
+    from models import CountryModel
+    from routers.admin.v1.crud.state import get_state_by_id
+
+    db_state = get_state_by_id(state_id=state_id, db=db)
+    db.query(CountryModel).filter(
+        CountryModel.id == state_schema.country_id, CountryModel.is_deleted == False
+    ).first()
+    db_state.name = state_schema.name
+    db_state.country_id = state_schema.country_id
+    db_state.updated_at = now()
+    index_rows(db=db, table="states", rows=[(db_state.id, db_state.name)])
+    db.commit()
+    db.refresh(db_state)
+    return db_state
+
+
+def legacy_delete(state_id, db):
+    from libs.search import unindex_rows
+    from libs.utils import now
+    from models import CityModel
+    from routers.admin.v1.crud.state import get_state_by_id
+
+    db_state = get_state_by_id(state_id=state_id, db=db)
+    db.query(CityModel.id).filter(
+        CityModel.state_id == state_id, CityModel.is_deleted == False
+    ).count()
+    db_state.is_deleted = True
+    db_state.updated_at = now()
+    unindex_rows(db=db, table="states", ids=[db_state.id])
+    db.commit()
+    db.refresh(db_state)
+    return f"{db_state.name} is deleted successfully"
+
+
+def run(db, writes: int, add, update, delete, counter):
+    from routers.admin.v1.schemas import State, StateAdd
+
+    results = {}
+    ids = []
+
+    def measure(operation, calls):
+        counter[0] = 0
+        started = time.perf_counter()
+        for call in calls:
+            call()
+        elapsed = time.perf_counter() - started
+        results[operation] = (counter[0] / writes, elapsed / writes * 1000)
+
+    def add_one(index):
+        schema = StateAdd(name=f"State {index}", country_id="0" * 36)
+        ids.append(add(state_schema=schema, db=db)["id"])
+
+    def update_one(index):
+        schema = StateAdd(name=f"Renamed {index}", country_id="0" * 36)
+        State.from_orm(update(state_schema=schema, state_id=ids[index], db=db))
+
+    measure("add", (lambda index=index: add_one(index) for index in range(writes)))
+    measure(
+        "update", (lambda index=index: update_one(index) for index in range(writes))
+    )
+    measure(
+        "delete",
+        (
+            lambda index=index: delete(state_id=ids[index], db=db)
+            for index in range(writes)
+        ),
+    )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writes", type=int, default=500)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ.update(DATABASE_MODE="sync", DATABASE_URL=f"sqlite:///{path}")
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from sqlalchemy import event
+
+    import database
+    from models import CountryModel, SeaRegionModel
+    from routers.admin.v1.crud import state
+
+    database.Base.metadata.create_all(database.engine)
+    db = database.SessionLocal()
+    db.add(SeaRegionModel(id="0" * 36, name="Pacific"))
+    db.add(CountryModel(id="0" * 36, name="Japan", sea_region_id="0" * 36))
+    db.commit()
+
+    counter = [0]
+
+    @event.listens_for(database.engine, "before_cursor_execute")
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        counter[0] += 1
+
+    @event.listens_for(database.engine, "commit")
+    def count_commit(conn):
+        counter[0] += 1
+
+    def legacy_add_dict(state_schema, db):
+        db_state = legacy_add(state_schema=state_schema, db=db)
+        return {"id": db_state.id}
+
+    paths = {
+        "legacy": run(
+            db, args.writes, legacy_add_dict, legacy_update, legacy_delete, counter
+        ),
+        "guarded": run(
+            db,
+            args.writes,
+            state.add_state,
+            state.update_state,
+            state.delete_state,
+            counter,
+        ),
+    }
+    db.close()
+
+    print(f"{args.writes} writes per operation, round trips and ms per write")
+    print(f"{'operation':<10} {'legacy':>14} {'guarded':>14}")
+    for operation in ("add", "update", "delete"):
+        cells = [
+            f"{trips:5.1f} {ms:6.2f} ms"
+            for trips, ms in (paths[path][operation] for path in ("legacy", "guarded"))
+        ]
+        print(f"{operation:<10} {cells[0]:>14} {cells[1]:>14}")
+
+
+if __name__ == "__main__":
+    main()
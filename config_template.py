@@ -0,0 +1,89 @@
+"""Settings template.
+
+Copy this file to ``config.py`` to override the defaults below; every
+setting can also be set through the environment variable of the same name.
+"""
+
+import os
+from urllib.parse import quote
+
+DATABASE_URL = os.getenv(
+    "DATABASE_URL",
+    "mysql+mysqlconnector://root:%s@localhost:3306/master_crud" % quote("Arkay@210"),
+)
+
+# "sync" serves requests from Starlette's threadpool with a blocking Session,
+# "async" from the event loop with an AsyncSession on ASYNC_DATABASE_URL
+DATABASE_MODE = os.getenv("DATABASE_MODE", "sync")
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL",
+    "mysql+aiomysql://root:%s@localhost:3306/master_crud" % quote("Arkay@210"),
+)
+
+# connection pool of both engines; the sizes only apply to queue pools (MySQL)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# below MySQL's wait_timeout so idle connections are replaced, not reused dead
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true")
+# seconds between pool stats log lines, 0 disables them
+DB_POOL_LOG_INTERVAL = float(os.getenv("DB_POOL_LOG_INTERVAL", "0"))
+
+# read cache of sea regions, countries and states; a TTL of 0 disables it
+CACHE_MAXSIZE = int(os.getenv("CACHE_MAXSIZE", "1024"))
+CACHE_TTL = float(os.getenv("CACHE_TTL", "300"))
+# writes bump a counter per table in cache_versions; with several workers,
+# every worker polls it at most once per interval (seconds) to drop stale data
+CACHE_SHARED_VERSIONS = os.getenv("CACHE_SHARED_VERSIONS", "false").lower() in (
+    "1",
+    "true",
+)
+CACHE_VERSION_POLL_INTERVAL = float(os.getenv("CACHE_VERSION_POLL_INTERVAL", "1"))
+
+# encode responses with orjson straight from the rows, skipping the
+# response_model validation; the JSON sent is the same
+FAST_JSON = os.getenv("FAST_JSON", "false").lower() in ("1", "true")
+
+# scripts.purge_deleted: soft-deleted rows untouched for this many days are
+# moved to the *_archive tables ("archive") or dropped ("delete"), in batches
+PURGE_RETENTION_DAYS = float(os.getenv("PURGE_RETENTION_DAYS", "90"))
+PURGE_MODE = os.getenv("PURGE_MODE", "archive")
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", "500"))
+
+# new row ids: "uuid4" (random) or "uuid7" (time-ordered, so inserts append
+# to the primary key index); ID_STORAGE "binary" keeps them as 16 bytes
+# (BINARY(16) on MySQL) instead of 36-character strings. Migration 0006
+# converts existing ids to the storage configured when it runs.
+ID_FORMAT = os.getenv("ID_FORMAT", "uuid4")
+ID_STORAGE = os.getenv("ID_STORAGE", "string")
+
+# read replicas, comma-separated (ASYNC_REPLICA_URLS in async mode): GET and
+# HEAD requests read from them, everything else uses the primary
+REPLICA_URLS = [url for url in os.getenv("REPLICA_URLS", "").split(",") if url]
+ASYNC_REPLICA_URLS = [
+    url for url in os.getenv("ASYNC_REPLICA_URLS", "").split(",") if url
+]
+# after a write, the client's reads stay on the primary for this many seconds
+READ_STICKY_SECONDS = float(os.getenv("READ_STICKY_SECONDS", "5"))
+# replicas failing their check, or lagging by more than this, get no reads;
+# values cached from a replica also expire after this many seconds
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "10"))
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", "5"))
+
+# per-request SQL statement count, DB time and rows, sent as Server-Timing
+# and, with SQL_REQUEST_LOG, logged as a JSON line per request
+SQL_INSTRUMENTATION = os.getenv("SQL_INSTRUMENTATION", "true").lower() in (
+    "1",
+    "true",
+)
+SQL_REQUEST_LOG = os.getenv("SQL_REQUEST_LOG", "false").lower() in ("1", "true")
+# statements slower than this (ms) are logged with their SQL and route; 0 is off
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+# routes declare a statement budget with @query_budget(n); "warn" logs
+# overruns, "raise" fails the request (for test runs), "off" ignores them
+QUERY_BUDGET = os.getenv("QUERY_BUDGET", "off")
+
+# per-route request latency histograms, served with the pool and cache stats
+# as Prometheus text on /metrics
+METRICS = os.getenv("METRICS", "true").lower() in ("1", "true")
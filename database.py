@@ -1,15 +1,71 @@
-from urllib.parse import quote
-
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-SQLALCHEMY_DATABASE_URL = (
-    "mysql+mysqlconnector://root:%s@localhost:3306/master_crud" % quote("Arkay@210")
-)
+from libs import config, replicas
+from libs.pool import engine_options
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+SQLALCHEMY_DATABASE_URL = config.DATABASE_URL
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL, name="sync")
+)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+if config.DATABASE_MODE != "async":
+    for index, url in enumerate(config.REPLICA_URLS):
+        name = f"replica{index}"
+        replica_engine = create_engine(url, **engine_options(url, name=name))
+        replicas.replicas.append(
+            replicas.Replica(
+                name=name,
+                engine=replica_engine,
+                session_factory=sessionmaker(
+                    autocommit=False,
+                    autoflush=False,
+                    bind=replica_engine,
+                    info={"replica": name},
+                ),
+            )
+        )
+
 Base = declarative_base()
+
+async_engine = None
+AsyncSessionLocal = None
+
+if config.DATABASE_MODE == "async":
+    async_engine = create_async_engine(
+        config.ASYNC_DATABASE_URL,
+        **engine_options(config.ASYNC_DATABASE_URL, name="async"),
+    )
+
+    # objects are serialized after the CRUD call returns, outside the
+    # greenlet that could lazy-load expired attributes
+    AsyncSessionLocal = sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        expire_on_commit=False,
+        bind=async_engine,
+        class_=AsyncSession,
+    )
+
+    for index, url in enumerate(config.ASYNC_REPLICA_URLS):
+        name = f"async_replica{index}"
+        replica_engine = create_async_engine(url, **engine_options(url, name=name))
+        replicas.replicas.append(
+            replicas.Replica(
+                name=name,
+                engine=replica_engine,
+                session_factory=sessionmaker(
+                    autocommit=False,
+                    autoflush=False,
+                    expire_on_commit=False,
+                    bind=replica_engine,
+                    class_=AsyncSession,
+                    info={"replica": name},
+                ),
+            )
+        )
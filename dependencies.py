@@ -1,9 +1,62 @@
-from database import SessionLocal
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import parse_obj_as
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from database import AsyncSessionLocal, SessionLocal
+from libs import config, replicas
+from libs.serialization import FastJSONResponse, dump
 
-def get_db():
-    db = SessionLocal()
+
+def get_sync_db(request: Request):
+    replica = replicas.route(request)
+    db = (SessionLocal if replica is None else replica.session_factory)()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db(request: Request):
+    replica = replicas.route(request)
+    factory = AsyncSessionLocal if replica is None else replica.session_factory
+    async with factory() as db:
+        yield db
+
+
+get_db = get_async_db if config.DATABASE_MODE == "async" else get_sync_db
+
+
+async def run_db(function, db, response_model=None, headers=None, **kwargs):
+    """Await the sync CRUD ``function`` on the request's session.
+
+    A blocking ``Session`` is used from Starlette's threadpool, as the plain
+    ``def`` routes did; an ``AsyncSession`` runs the same function through
+    ``run_sync``, which awaits every statement on the event loop instead of
+    holding a thread. The result is converted to ``response_model`` inside
+    that call so that no lazy load happens outside of it.
+
+    With FAST_JSON the result is dumped without validation and returned as a
+    ``FastJSONResponse``, which FastAPI sends as is. Headers that dependencies
+    set on the route's response are lost on a returned response, so GET
+    routes pass their validator ``headers`` along.
+    """
+
+    def call(session):
+        data = function(db=session, **kwargs)
+        if response_model is not None:
+            if config.FAST_JSON:
+                return FastJSONResponse(dump(response_model, data), headers=headers)
+            data = parse_obj_as(response_model, data)
+        return data
+
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(call)
+    return await run_in_threadpool(call, db)
+
+
+def sync_session(db):
+    """The ``Session`` to build (not execute) ORM queries with."""
+    if isinstance(db, AsyncSession):
+        return db.sync_session
+    return db
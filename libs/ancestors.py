@@ -0,0 +1,99 @@
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session
+
+from libs.bulk import BATCH_SIZE
+from libs.utils import now
+from models import CityModel, CountryModel, StateModel
+
+# States and cities carry the ids of their ancestors above the direct parent,
+# so they can be filtered by country or sea region on one index. They are
+# copies, kept right by the write paths in the same transaction as the
+# parent change, and have no foreign keys of their own.
+
+# child model -> {ancestor column: the parent's column it is copied from}
+INHERITED = {
+    StateModel: {"sea_region_id": CountryModel.sea_region_id},
+    CityModel: {
+        "country_id": StateModel.country_id,
+        "sea_region_id": StateModel.sea_region_id,
+    },
+}
+
+# re-parented model -> (the descendant columns holding its id, the columns of
+# its own that those descendants copy)
+DESCENDANTS = {
+    CountryModel: (
+        (StateModel.country_id, CityModel.country_id),
+        ("sea_region_id",),
+    ),
+    StateModel: ((CityModel.state_id,), ("country_id", "sea_region_id")),
+}
+
+
+def every_row(model):
+    """A condition true for live and soft-deleted rows alike.
+
+    Put in front of a lookup by another column, it lets the
+    ``(is_deleted, column, ...)`` indexes serve that lookup.
+    """
+    return model.is_deleted.in_((False, True))
+
+
+def inherited_values(model, parent_id):
+    """The ancestor columns of a ``model`` row under ``parent_id``, as subqueries.
+
+    Meant as ``UPDATE`` values, so the row takes them from its new parent in
+    the statement that moves it there.
+    """
+    return {
+        name: select(column).where(column.class_.id == parent_id).scalar_subquery()
+        for name, column in INHERITED.get(model, {}).items()
+    }
+
+
+def live_parents(db: Session, model, parent, ids):
+    """Map the live ``parent`` rows among ``ids`` to the columns ``model`` rows copy.
+
+    The bulk adds check their items' parents with it, reading what the new
+    children inherit in the same query; a ``model`` that inherits nothing
+    gets an empty dict per live parent.
+    """
+    columns = INHERITED.get(model, {})
+    ids = list(set(ids))
+    found = {}
+    for start in range(0, len(ids), BATCH_SIZE):
+        query = db.query(parent.id, *columns.values()).filter(
+            parent.id.in_(ids[start : start + BATCH_SIZE]),
+            parent.is_deleted == False,
+        )
+        for id, *values in query:
+            found[id] = dict(zip(columns, values))
+    return found
+
+
+def cascade(db: Session, model, id):
+    """Copy row ``id``'s ancestors down to all its descendants after a move.
+
+    One ``UPDATE`` per descendant table, touching only the rows whose copies
+    differ, so a rename without a move changes nothing below it. Soft-deleted
+    descendants are kept right as well, for when they are revived.
+    """
+    keys, names = DESCENDANTS[model]
+    values = {
+        name: select(getattr(model, name)).where(model.id == id).scalar_subquery()
+        for name in names
+    }
+    for key in keys:
+        child = key.class_
+        changed = or_(
+            *(
+                getattr(child, name).is_distinct_from(value)
+                for name, value in values.items()
+            )
+        )
+        db.execute(
+            update(child)
+            .where(every_row(child), key == id, changed)
+            .values(**values, updated_at=now())
+            .execution_options(synchronize_session=False)
+        )
@@ -0,0 +1,31 @@
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+BATCH_SIZE = 1000
+
+
+def parse_rows(schema, items):
+    """Validate each raw item of a bulk request against ``schema`` on its own.
+
+    Returns the ``(index, parsed)`` pairs of the valid items and an
+    ``{"index", "detail"}`` error per invalid one, so that one malformed item
+    does not reject the others.
+    """
+    parsed, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            parsed.append((index, schema.parse_obj(item)))
+        except ValidationError as error:
+            detail = "; ".join(
+                f"{'.'.join(map(str, problem['loc']))}: {problem['msg']}"
+                for problem in error.errors()
+            )
+            errors.append({"index": index, "detail": detail})
+    return parsed, errors
+
+
+def bulk_insert(db: Session, model, rows):
+    """Insert ``rows`` (column dicts) with multi-row INSERTs of ``BATCH_SIZE``."""
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.execute(insert(model), rows[start : start + BATCH_SIZE])
@@ -0,0 +1,251 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, select, update
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.orm import Session
+
+from libs import config
+from libs.utils import now
+from models import CacheVersionModel
+
+# Every table has a generation number that is bumped whenever a transaction
+# writing to it commits. Cached values are stored under the generation they
+# were read at, so a write makes them unreachable without scanning the cache,
+# and a value computed concurrently with a write can never be served after it.
+_generations = {}
+_generations_lock = threading.Lock()
+
+_MISSING = object()
+
+
+def generation(table):
+    """Generation of ``table``, or the tuple of generations of several tables."""
+    if isinstance(table, str):
+        return _generations.get(table, 0)
+    return tuple(_generations.get(name, 0) for name in table)
+
+
+def invalidate(*tables: str):
+    with _generations_lock:
+        for table in tables:
+            _generations[table] = _generations.get(table, 0) + 1
+
+
+caches = {}
+
+
+class TableCache:
+    """Bounded LRU of values derived from one table or a tuple of tables.
+
+    A value is reachable until any of its tables is written or, with a
+    ``ttl``, until it is ``ttl`` seconds old.
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = self.misses = self.evictions = self.expirations = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        caches[name] = self
+
+    def get(self, table, key, default=None):
+        full_key = (table, generation(table), key)
+        with self._lock:
+            entry = self._data.get(full_key)
+            if (
+                entry is not None
+                and entry[1] is not None
+                and entry[1] < time.monotonic()
+            ):
+                del self._data[full_key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._data.move_to_end(full_key)
+            return entry[0]
+
+    def set(self, table, key, value, table_generation=None, ttl=None):
+        if table_generation is None:
+            table_generation = generation(table)
+        full_key = (table, table_generation, key)
+        ttl = min(filter(None, (self.ttl, ttl)), default=None)
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[full_key] = (value, expires)
+            self._data.move_to_end(full_key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+reads = TableCache(name="reads", maxsize=config.CACHE_MAXSIZE, ttl=config.CACHE_TTL)
+
+
+def read_source(db: Session):
+    """``"replica"`` or ``"primary"``: where ``db`` reads from.
+
+    Part of every cache key. A replica may not have this process's latest
+    writes yet, so what it returned after a write must never be served to a
+    request that is reading from the primary to see that write.
+    """
+    return "replica" if "replica" in db.info else "primary"
+
+
+def cached_read(db: Session, tables: tuple, key, load):
+    """Return ``load()`` through the read cache, keyed on ``key`` and ``tables``.
+
+    ``tables`` must list every table the value is built from, parents included,
+    so that e.g. renaming a sea region drops the cached countries embedding it.
+    Exceptions from ``load`` (such as a 404) are not cached. Values read
+    from a replica may predate a write this process already committed, so
+    they are cached apart from the primary's (see ``read_source``) and kept
+    no longer than a replica may lag.
+    """
+    if not config.CACHE_TTL:
+        return load()
+    sync_versions(db)
+    table_generation = generation(tables)
+    source = read_source(db)
+    key = (source, key)
+    value = reads.get(tables, key, _MISSING)
+    if value is _MISSING:
+        value = load()
+        reads.set(
+            tables,
+            key,
+            value,
+            table_generation=table_generation,
+            ttl=config.REPLICA_MAX_LAG_SECONDS if source == "replica" else None,
+        )
+    return value
+
+
+def stats():
+    return {name: cache.stats() for name, cache in caches.items()}
+
+
+# Every commit also bumps the written tables' rows in cache_versions, which
+# the conditional GET validators are read from, so it happens whether or not
+# CACHE_SHARED_VERSIONS is set. The bump holds the row lock of each written
+# table until COMMIT, serializing concurrent writers of the same table; this
+# is an accepted cost: the bump is the transaction's last statement, so the
+# lock is only held for the commit itself, the rows are locked in table name
+# order so writers cannot deadlock on them, and the bulk routes and the
+# importer bump once per batch rather than per row.
+#
+# The generations above only see this process's commits, so with
+# CACHE_SHARED_VERSIONS sync_versions() polls the rows and turns changes
+# made by other workers into local invalidations.
+_seen_versions = {}
+_synced_at = 0.0
+_sync_lock = threading.Lock()
+
+
+def sync_versions(db: Session):
+    global _synced_at
+    if not config.CACHE_SHARED_VERSIONS:
+        return
+    with _sync_lock:
+        if time.monotonic() - _synced_at < config.CACHE_VERSION_POLL_INTERVAL:
+            return
+        _synced_at = time.monotonic()
+    rows = db.execute(select(CacheVersionModel.table_name, CacheVersionModel.version))
+    changed = []
+    for table, version in rows:
+        if _seen_versions.get(table, 0) != version:
+            _seen_versions[table] = version
+            changed.append(table)
+    if changed:
+        invalidate(*changed)
+
+
+def _bump_versions(session: Session, tables):
+    connection = session.connection()
+    dialect = connection.dialect.name
+    timestamp = now()
+    rows = [
+        {"table_name": table, "version": 1, "updated_at": timestamp}
+        for table in sorted(tables)
+    ]
+    bumped = {
+        "version": CacheVersionModel.__table__.c.version + 1,
+        "updated_at": timestamp,
+    }
+    if dialect == "mysql":
+        statement = mysql.insert(CacheVersionModel).values(rows)
+        statement = statement.on_duplicate_key_update(**bumped)
+    elif dialect == "sqlite":
+        statement = sqlite.insert(CacheVersionModel).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=["table_name"], set_=bumped
+        )
+    else:
+        # other backends only bump rows that already exist
+        statement = (
+            update(CacheVersionModel)
+            .where(CacheVersionModel.table_name.in_(tables))
+            .values(**bumped)
+        )
+    # Core execution, so the statement itself is not collected below
+    connection.execute(statement)
+
+
+def _written_tables(session: Session):
+    return session.info.setdefault("written_tables", set())
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_tables(session, flush_context):
+    tables = _written_tables(session)
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        tables.add(obj.__table__.name)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_tables(orm_execute_state):
+    state = orm_execute_state
+    if state.is_insert or state.is_update or state.is_delete:
+        _written_tables(state.session).add(state.statement.table.name)
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_written_tables(session):
+    # flush first so the tables written by pending objects are known
+    session.flush()
+    tables = session.info.get("written_tables")
+    if tables:
+        _bump_versions(session, tables)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_written_tables(session):
+    tables = session.info.pop("written_tables", None)
+    if tables:
+        invalidate(*tables)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_written_tables(session):
+    session.info.pop("written_tables", None)
@@ -0,0 +1,146 @@
+import hashlib
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlalchemy import inspect, select
+from sqlalchemy.orm import MANYTOONE, Session
+
+from dependencies import get_db, run_db
+from models import CacheVersionModel
+
+
+def _validators(state, modified):
+    digest = hashlib.sha1(repr(state).encode()).hexdigest()
+    modified = [value for value in modified if value is not None]
+    # updated_at is a naive local time
+    last_modified = max(modified).astimezone(timezone.utc) if modified else None
+    return f'W/"{digest[:32]}"', last_modified
+
+
+def table_validators(db: Session, tables: tuple):
+    """``(etag, last_modified)`` of the data in ``tables``, from ``cache_versions``.
+
+    Every commit bumps the counters of the tables it wrote (``libs.cache``),
+    so reading them is a primary-key lookup per table however large the
+    tables are.
+    """
+    rows = db.execute(
+        select(
+            CacheVersionModel.table_name,
+            CacheVersionModel.version,
+            CacheVersionModel.updated_at,
+        ).where(CacheVersionModel.table_name.in_(tables))
+    ).all()
+    versions = {row.table_name: (row.version, row.updated_at) for row in rows}
+    state = tuple(versions.get(name, (None, None)) for name in tables)
+    return _validators((tables, state), [updated_at for _, updated_at in state])
+
+
+def _parents(model):
+    """``model``'s many-to-one relationships up to the root, nearest first."""
+    chain = []
+    while True:
+        parents = [
+            relationship
+            for relationship in inspect(model).relationships
+            if relationship.direction is MANYTOONE
+        ]
+        if not parents:
+            return chain
+        chain.append(parents[0])
+        model = parents[0].mapper.class_
+
+
+def row_validators(db: Session, model, id):
+    """``(etag, last_modified)`` of row ``id`` of ``model`` and its ancestors.
+
+    Fetched by primary key in one query; the ETag hashes every column of
+    the rows, so it changes exactly when the response can. ``(None, None)``
+    when there is no such live row, which the route then answers with a 404.
+    """
+    parents = _parents(model)
+    models = [model, *(relationship.mapper.class_ for relationship in parents)]
+    statement = select(*(column for m in models for column in m.__table__.columns))
+    statement = statement.select_from(model)
+    for relationship in parents:
+        statement = statement.outerjoin(relationship.class_attribute)
+    row = db.execute(statement.where(model.id == id)).first()
+    # the row's own columns come first
+    if row is None or row[model.__table__.columns.keys().index("is_deleted")]:
+        return None, None
+    modified = [
+        row[index]
+        for index, column in enumerate(statement.selected_columns)
+        if column.key == "updated_at"
+    ]
+    return _validators((model.__tablename__, tuple(row)), modified)
+
+
+def _opaque(tag: str):
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def _not_modified(request: Request, etag: str, last_modified):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {_opaque(tag.strip()) for tag in if_none_match.split(",")}
+        # weak comparison, so the W/ prefix is ignored on both sides
+        return "*" in tags or _opaque(etag) in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+class Conditional:
+    """Route dependency answering conditional GETs on ``tables``.
+
+    It raises a 304 before the route loads anything when the client's
+    ``If-None-Match`` / ``If-Modified-Since`` still match, and otherwise
+    returns the validator headers, which it also sets on the response.
+    """
+
+    def __init__(self, tables: tuple):
+        self.tables = tables
+
+    def validators(self, db: Session, request: Request):
+        return table_validators(db=db, tables=self.tables)
+
+    async def __call__(
+        self, request: Request, response: Response, db: Session = Depends(get_db)
+    ):
+        etag, last_modified = await run_db(self.validators, db=db, request=request)
+        if etag is None:
+            return {}
+        headers = {"ETag": etag}
+        if last_modified is not None:
+            headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+        if _not_modified(request, etag=etag, last_modified=last_modified):
+            raise HTTPException(
+                status_code=status.HTTP_304_NOT_MODIFIED, headers=headers
+            )
+        response.headers.update(headers)
+        return headers
+
+
+class RowConditional(Conditional):
+    """``Conditional`` for the detail route of ``model``, whose id is the
+    ``path_param`` path parameter: validated on the row and its ancestors
+    rather than on whole tables.
+    """
+
+    def __init__(self, model, path_param: str):
+        self.model = model
+        self.path_param = path_param
+
+    def validators(self, db: Session, request: Request):
+        return row_validators(
+            db=db, model=self.model, id=request.path_params[self.path_param]
+        )
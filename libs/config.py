@@ -0,0 +1,6 @@
+"""Settings of the running app: ``config.py`` when present, else the template."""
+
+try:
+    from config import *  # noqa: F401,F403
+except ImportError:
+    from config_template import *  # noqa: F401,F403
@@ -0,0 +1,55 @@
+import os
+import time
+from uuid import UUID
+
+from sqlalchemy import LargeBinary, String
+from sqlalchemy.dialects import mysql
+from sqlalchemy.types import TypeDecorator
+
+from libs import config
+
+
+def uuid7():
+    """Time-ordered UUID (RFC 9562 version 7).
+
+    A millisecond timestamp comes first and 74 random bits after it, so new
+    ids land at the right edge of the primary key index, not on random pages.
+    """
+    milliseconds = time.time_ns() // 1_000_000
+    value = (milliseconds << 80) | int.from_bytes(os.urandom(10), "big")
+    value = (value & ~(0xF << 76)) | (0x7 << 76)
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)
+    return UUID(int=value)
+
+
+class Id(TypeDecorator):
+    """Row id column: the canonical UUID string to Python, whatever the storage.
+
+    With ``ID_STORAGE=binary`` it is stored as the UUID's 16 bytes
+    (``BINARY(16)`` on MySQL), otherwise as the 36-character string. Strings
+    that are not UUIDs cannot be stored in 16 bytes; they are bound as NULL,
+    so they match no row, just as an unknown id does with string storage.
+    """
+
+    impl = String(36)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if config.ID_STORAGE != "binary":
+            return dialect.type_descriptor(String(36))
+        if dialect.name == "mysql":
+            return dialect.type_descriptor(mysql.BINARY(16))
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None or config.ID_STORAGE != "binary":
+            return value
+        try:
+            return UUID(value).bytes
+        except ValueError:
+            return None
+
+    def process_result_value(self, value, dialect):
+        if value is None or config.ID_STORAGE != "binary":
+            return value
+        return str(UUID(bytes=value))
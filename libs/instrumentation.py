@@ -0,0 +1,148 @@
+import json
+import logging
+import time
+from contextvars import ContextVar
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from libs import config
+
+request_logger = logging.getLogger("sql.requests")
+slow_logger = logging.getLogger("sql.slow")
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+class RequestStats:
+    """SQL issued while serving one request."""
+
+    __slots__ = ("route", "statements", "db_ms", "rows")
+
+    def __init__(self, route: str):
+        self.route = route
+        self.statements = 0
+        self.db_ms = 0.0
+        self.rows = 0
+
+
+# the middleware sets a fresh RequestStats per request; the threadpool and
+# run_sync calls serving the request see the same object
+current = ContextVar("sql_request_stats", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._instrumentation_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_instrumentation_started", None)
+    if started is None:
+        return
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    stats = current.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_ms += elapsed_ms
+        # rows changed, or returned where the driver reports it up front
+        # (MySQL's buffered cursors do, SQLite does not)
+        stats.rows += max(cursor.rowcount, 0)
+    if config.SLOW_QUERY_MS and elapsed_ms >= config.SLOW_QUERY_MS:
+        slow_logger.warning(
+            json.dumps(
+                {
+                    "route": stats.route if stats is not None else None,
+                    "ms": round(elapsed_ms, 2),
+                    "sql": statement,
+                    "parameters": parameters,
+                },
+                default=str,
+            )
+        )
+
+
+_templates = {}
+
+
+def route_template(request: Request):
+    """Path template of the route that served ``request``, e.g. ``/city/{city_id}``."""
+    endpoint = request.scope.get("endpoint")
+    if endpoint is None:
+        return None
+    if endpoint not in _templates:
+        for route in request.app.routes:
+            if getattr(route, "endpoint", None) is endpoint:
+                _templates[endpoint] = route.path
+                break
+        else:
+            _templates[endpoint] = request.url.path
+    return _templates[endpoint]
+
+
+def query_budget(statements: int):
+    """Declare the most SQL statements a route may issue per request.
+
+    Enforced per QUERY_BUDGET: ``"warn"`` logs the overrun, ``"raise"`` fails
+    the request, which is meant for test runs.
+    """
+
+    def decorate(endpoint):
+        endpoint.query_budget = statements
+        return endpoint
+
+    return decorate
+
+
+async def instrument_sql(request: Request, call_next):
+    """Middleware counting the request's SQL statements, DB time and rows.
+
+    They are sent as ``Server-Timing`` and, with SQL_REQUEST_LOG, logged as
+    one JSON line per request. Statements a streamed body issues after the
+    response has started are not included.
+    """
+    stats = RequestStats(route=request.url.path)
+    token = current.set(stats)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        current.reset(token)
+    total_ms = (time.perf_counter() - started) * 1000
+    stats.route = route_template(request) or stats.route
+
+    response.headers["Server-Timing"] = (
+        f'db;dur={stats.db_ms:.2f};desc="{stats.statements} statements,'
+        f' {stats.rows} rows", total;dur={total_ms:.2f}'
+    )
+    if config.SQL_REQUEST_LOG:
+        request_logger.info(
+            json.dumps(
+                {
+                    "method": request.method,
+                    "route": stats.route,
+                    "status": response.status_code,
+                    "statements": stats.statements,
+                    "db_ms": round(stats.db_ms, 2),
+                    "rows": stats.rows,
+                    "total_ms": round(total_ms, 2),
+                }
+            )
+        )
+
+    budget = getattr(request.scope.get("endpoint"), "query_budget", None)
+    if config.QUERY_BUDGET != "off" and budget is not None:
+        if stats.statements > budget:
+            message = (
+                f"{request.method} {stats.route} issued {stats.statements} SQL"
+                f" statements, over its budget of {budget}"
+            )
+            if config.QUERY_BUDGET == "raise":
+                raise QueryBudgetExceeded(message)
+            request_logger.warning(message)
+    return response
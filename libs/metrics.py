@@ -0,0 +1,193 @@
+import threading
+import time
+
+from fastapi import Request
+
+from libs import cache, pool
+from libs.instrumentation import route_template
+from libs.pool import Histogram
+
+# label for requests that matched no route, so unknown paths add no series
+UNMATCHED = "unmatched"
+
+
+class Shard:
+    """One thread's request counters: {route: {status: latency histogram}}.
+
+    Only the owning thread writes to a shard, so observations take no lock;
+    scrapes read every shard and may see a request's count before its sum.
+    """
+
+    __slots__ = ("routes", "in_flight")
+
+    def __init__(self):
+        self.routes = {}
+        self.in_flight = 0
+
+
+_local = threading.local()
+_shards = []
+_shards_lock = threading.Lock()
+started_at = time.time()
+
+
+def _shard():
+    try:
+        return _local.shard
+    except AttributeError:
+        shard = _local.shard = Shard()
+        with _shards_lock:
+            _shards.append(shard)
+        return shard
+
+
+def observe(shard: Shard, route: str, status: int, elapsed_ms: float):
+    statuses = shard.routes.get(route)
+    if statuses is None:
+        statuses = shard.routes[route] = {}
+    histogram = statuses.get(status)
+    if histogram is None:
+        histogram = statuses[status] = Histogram()
+    histogram.observe(elapsed_ms)
+
+
+async def record_request(request: Request, call_next):
+    """Middleware recording every request's latency by route template and status.
+
+    Requests that raise are recorded as status 500.
+    """
+    shard = _shard()
+    shard.in_flight += 1
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        shard.in_flight -= 1
+        observe(
+            shard,
+            route_template(request) or UNMATCHED,
+            status,
+            (time.perf_counter() - started) * 1000,
+        )
+
+
+def routes():
+    """Every shard's histograms merged: {(route, status): Histogram}."""
+    with _shards_lock:
+        shards = list(_shards)
+    merged = {}
+    for shard in shards:
+        for route, statuses in list(shard.routes.items()):
+            for status, histogram in list(statuses.items()):
+                key = (route, status)
+                if key not in merged:
+                    merged[key] = Histogram(histogram.buckets)
+                merged[key].merge(histogram)
+    return merged
+
+
+def in_flight():
+    with _shards_lock:
+        return sum(shard.in_flight for shard in _shards)
+
+
+def snapshot():
+    """Per route: requests, rate since start, errors and latency quantiles (ms)."""
+    uptime = time.time() - started_at
+    data = {}
+    for (route, status), histogram in sorted(routes().items()):
+        entry = data.setdefault(
+            route, {"requests": 0, "errors": 0, "histogram": Histogram()}
+        )
+        entry["requests"] += histogram.count
+        if status >= 500:
+            entry["errors"] += histogram.count
+        entry["histogram"].merge(histogram)
+    for entry in data.values():
+        histogram = entry.pop("histogram")
+        entry["rate_per_s"] = round(entry["requests"] / uptime, 3)
+        for name, q in (("p50_ms", 0.5), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+            value = histogram.quantile(q)
+            entry[name] = None if value is None else round(value, 3)
+    return {"in_flight": in_flight(), "uptime_s": round(uptime, 1), "routes": data}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    pairs = (f'{name}="{_escape(value)}"' for name, value in labels.items())
+    return "{" + ",".join(pairs) + "}"
+
+
+def _histogram(lines, name, snapshot, scale, **labels):
+    """Prometheus lines for a ``Histogram.snapshot()``, bounds divided by ``scale``."""
+    for bound, count in snapshot["buckets"].items():
+        le = bound if bound == "+Inf" else repr(float(bound) / scale)
+        lines.append(f"{name}_bucket{_labels(**labels, le=le)} {count}")
+    lines.append(f"{name}_sum{_labels(**labels)} {round(snapshot['sum'] / scale, 6)}")
+    lines.append(f"{name}_count{_labels(**labels)} {snapshot['count']}")
+
+
+def render():
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    lines = [
+        "# HELP http_request_duration_seconds Request latency by route and status.",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    for (route, status), histogram in sorted(routes().items()):
+        _histogram(
+            lines,
+            "http_request_duration_seconds",
+            histogram.snapshot(),
+            1000,
+            route=route,
+            status=status,
+        )
+    lines += [
+        "# HELP http_requests_in_flight Requests being served.",
+        "# TYPE http_requests_in_flight gauge",
+        f"http_requests_in_flight {in_flight()}",
+    ]
+
+    pools = pool.snapshot()
+    for name, kind, help in (
+        ("checkouts", "counter", "Connections checked out of the pool."),
+        ("timeouts", "counter", "Checkouts that timed out waiting."),
+        ("size", "gauge", "Configured pool size."),
+        ("checked_out", "gauge", "Connections in use."),
+        ("checked_in", "gauge", "Idle connections in the pool."),
+        ("overflow", "gauge", "Connections open beyond the pool size."),
+    ):
+        metric = f"db_pool_{name}_total" if kind == "counter" else f"db_pool_{name}"
+        lines += [f"# HELP {metric} {help}", f"# TYPE {metric} {kind}"]
+        for engine, stats in pools.items():
+            if stats.get(name) is not None:
+                lines.append(f"{metric}{_labels(engine=engine)} {stats[name]}")
+    for name, help in (
+        ("wait", "Time spent waiting for a free connection."),
+        ("checkout", "Whole checkout time, including the pre-ping."),
+    ):
+        metric = f"db_pool_{name}_seconds"
+        lines += [f"# HELP {metric} {help}", f"# TYPE {metric} histogram"]
+        for engine, stats in pools.items():
+            _histogram(lines, metric, stats[f"{name}_ms"], 1000, engine=engine)
+
+    caches = cache.stats()
+    for name, kind, help in (
+        ("hits", "counter", "Cache lookups that found a value."),
+        ("misses", "counter", "Cache lookups that found none."),
+        ("evictions", "counter", "Values dropped to stay within maxsize."),
+        ("expirations", "counter", "Values dropped for exceeding their TTL."),
+        ("size", "gauge", "Values cached."),
+        ("maxsize", "gauge", "Most values the cache holds."),
+    ):
+        metric = f"cache_{name}_total" if kind == "counter" else f"cache_{name}"
+        lines += [f"# HELP {metric} {help}", f"# TYPE {metric} {kind}"]
+        for cache_name, stats in caches.items():
+            lines.append(f"{metric}{_labels(cache=cache_name)} {stats[name]}")
+    return "\n".join(lines) + "\n"
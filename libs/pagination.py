@@ -0,0 +1,212 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Query, undefer
+
+from libs import config
+from libs.cache import TableCache, generation, read_source
+from libs.search import rank, rank_value
+
+counts = TableCache(name="counts", maxsize=4096)
+
+# largest page the list routes accept
+MAX_LIMIT = 1000
+
+
+def sort_columns(model, sort_by: str, order: str, search: Optional[str] = None):
+    """Return the ``(key, expression, descending)`` triples to order by.
+
+    The list always ends with ``id`` so the ordering is total, which keyset
+    pagination relies on.
+    """
+    if sort_by == "relevance" and search is not None:
+        return [
+            ("rank", rank(model=model, search=search), False),
+            ("name", model.name, False),
+            ("id", model.id, False),
+        ]
+    if sort_by == "name":
+        descending = order == "desc"
+        return [("name", model.name, descending), ("id", model.id, descending)]
+    return [("updated_at", model.updated_at, True), ("id", model.id, True)]
+
+
+def _signature(columns):
+    return ",".join(
+        f"{'-' if descending else ''}{key}" for key, _, descending in columns
+    )
+
+
+def encode_cursor(row, columns, search: Optional[str] = None):
+    values = []
+    for key, _, _ in columns:
+        if key == "rank":
+            value = rank_value(name=row.name, search=search)
+        else:
+            value = getattr(row, key)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        values.append(value)
+    payload = {"k": _signature(columns), "v": values}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = payload["v"]
+        if payload["k"] != _signature(columns) or len(values) != len(columns):
+            raise ValueError("cursor was issued for a different sort")
+        for index, (key, _, _) in enumerate(columns):
+            if key == "updated_at" and values[index] is not None:
+                values[index] = datetime.fromisoformat(values[index])
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+    return values
+
+
+def after_cursor(columns, values):
+    """Filter for the rows that sort strictly after ``values``."""
+    clauses = []
+    for index, (_, expression, descending) in enumerate(columns):
+        equal = [columns[j][1] == values[j] for j in range(index)]
+        if descending:
+            clauses.append(and_(*equal, expression < values[index]))
+        else:
+            clauses.append(and_(*equal, expression > values[index]))
+    return or_(*clauses)
+
+
+def keyset_batches(query: Query, columns, batch_size: int):
+    """Yield the rows of ``query`` in ``columns`` order, one query per batch.
+
+    Each batch starts right after the last row of the one before, as a
+    cursor page does, so no more than ``batch_size`` rows are fetched at a
+    time whether or not the driver can stream a result (mysql-connector
+    cannot). ``columns`` are ``sort_columns``-style triples ending with a
+    unique column, and the rows must have their keys as attributes.
+    """
+    query = query.order_by(None).order_by(
+        *(
+            expression.desc() if descending else expression
+            for _, expression, descending in columns
+        )
+    )
+    values = None
+    while True:
+        page = query
+        if values is not None:
+            page = query.filter(after_cursor(columns=columns, values=values))
+        batch = page.limit(batch_size).all()
+        if batch:
+            yield batch
+        if len(batch) < batch_size:
+            return
+        values = [getattr(batch[-1], key) for key, _, _ in columns]
+
+
+def count_rows(query: Query, model, count_mode: str = "exact"):
+    """Count the rows matched by ``query`` according to ``count_mode``.
+
+    The count is a bare ``SELECT count(*)`` over the filtered table, without
+    the ORDER BY or eager-load joins ``Query.count()`` would keep in its
+    subquery. ``"cached"`` reuses the count for the same filters and read
+    source until the table is next written; ``"skip"`` returns ``None``.
+    """
+    if count_mode == "skip":
+        return None
+
+    count_query = (
+        query.enable_eagerloads(False)
+        .order_by(None)
+        .with_entities(func.count(model.id))
+    )
+    if count_mode != "cached":
+        return count_query.scalar()
+
+    table = model.__tablename__
+    table_generation = generation(table)
+    compiled = count_query.statement.compile()
+    source = read_source(query.session)
+    key = (source, str(compiled), tuple(sorted(compiled.params.items())))
+    count = counts.get(table, key)
+    if count is None:
+        count = count_query.scalar()
+        counts.set(
+            table,
+            key,
+            count,
+            table_generation=table_generation,
+            # a replica may not have this process's latest writes yet
+            ttl=config.REPLICA_MAX_LAG_SECONDS if source == "replica" else None,
+        )
+    return count
+
+
+def paginate(
+    query: Query,
+    model,
+    start: int,
+    limit: int,
+    sort_by: str,
+    order: str,
+    cursor: Optional[str] = None,
+    count_mode: str = "exact",
+    search: Optional[str] = None,
+):
+    """Order ``query`` by the requested sort and return one page of it.
+
+    With a ``cursor`` the page starts right after the row it encodes (keyset
+    pagination) and ``start`` is ignored, so deep pages cost the same as the
+    first one; without it the old ``OFFSET`` paging is used.
+    ``sort_by="relevance"`` ranks exact, then prefix, then other matches of
+    ``search`` first.
+
+    ``has_more`` is always returned; ``count`` follows ``count_mode`` (see
+    ``count_rows``). ``limit`` must be at least 1: an empty page could not
+    carry the cursor of the next one.
+    """
+    if limit < 1:
+        raise ValueError(f"limit must be at least 1, got {limit}")
+    columns = sort_columns(model=model, sort_by=sort_by, order=order, search=search)
+
+    count = count_rows(query=query, model=model, count_mode=count_mode)
+
+    if cursor is not None:
+        values = decode_cursor(cursor=cursor, columns=columns)
+        query = query.filter(after_cursor(columns=columns, values=values))
+        start = 0
+
+    query = query.order_by(
+        *(
+            expression.desc() if descending else expression
+            for _, expression, descending in columns
+        )
+    )
+    # the cursor is read from the last row, so its sort keys must be loaded
+    # even when the caller restricted the columns with load_only
+    sort_keys = {"name" if key == "rank" else key for key, _, _ in columns}
+    query = query.options(*(undefer(getattr(model, key)) for key in sort_keys))
+
+    # one extra row tells us whether a next page exists
+    results = query.offset(start).limit(limit + 1).all()
+    next_cursor = None
+    has_more = len(results) > limit
+    if has_more:
+        results = results[:limit]
+        next_cursor = encode_cursor(row=results[-1], columns=columns, search=search)
+
+    return {
+        "count": count,
+        "has_more": has_more,
+        "list": results,
+        "next_cursor": next_cursor,
+    }
@@ -0,0 +1,178 @@
+import bisect
+import logging
+import threading
+import time
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+from libs import config
+
+logger = logging.getLogger(__name__)
+
+# upper bounds in milliseconds of the checkout latency histogram buckets
+LATENCY_BUCKETS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        # first bucket whose upper bound is >= value, the last one past them all
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def merge(self, other: "Histogram"):
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.total += other.total
+        self.count += other.count
+
+    def quantile(self, q: float):
+        """Estimate of the ``q`` quantile, interpolated within its bucket.
+
+        Values past the last bucket are reported as its upper bound.
+        """
+        if not self.count:
+            return None
+        rank, cumulative, lower = q * self.count, 0, 0
+        for bound, count in zip(self.buckets, self.counts):
+            if count and cumulative + count >= rank:
+                return lower + (bound - lower) * (rank - cumulative) / count
+            cumulative += count
+            lower = bound
+        return self.buckets[-1]
+
+    def snapshot(self):
+        cumulative, buckets = 0, {}
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {"count": self.count, "sum": round(self.total, 3), "buckets": buckets}
+
+
+class PoolStats:
+    """Checkout counters of one engine's pool."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_ms = Histogram()
+        self.checkout_ms = Histogram()
+
+    def snapshot(self):
+        pool = self.pool
+        with self.lock:
+            data = {
+                "pool": type(pool).__name__ if pool else None,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms": self.wait_ms.snapshot(),
+                "checkout_ms": self.checkout_ms.snapshot(),
+            }
+        if isinstance(pool, QueuePool):
+            data.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=pool.overflow(),
+            )
+        return data
+
+
+pools = {}
+
+
+def timed_pool_class(poolclass, stats: PoolStats):
+    """Subclass ``poolclass`` to time every checkout into ``stats``."""
+
+    class TimedPool(poolclass):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            # also runs for the pool that replaces this one on recreate()
+            stats.pool = self
+
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                return super()._do_get()
+            except Exception as error:
+                if type(error).__name__ == "TimeoutError":
+                    with stats.lock:
+                        stats.timeouts += 1
+                raise
+            finally:
+                with stats.lock:
+                    stats.wait_ms.observe((time.perf_counter() - started) * 1000)
+
+        def connect(self):
+            started = time.perf_counter()
+            connection = super().connect()
+            with stats.lock:
+                stats.checkouts += 1
+                stats.checkout_ms.observe((time.perf_counter() - started) * 1000)
+            return connection
+
+    TimedPool.__name__ = poolclass.__name__
+    return TimedPool
+
+
+def engine_options(url: str, name: str):
+    """``create_engine`` pool arguments for ``url`` from the DB_POOL_* settings.
+
+    ``wait_ms`` covers waiting for a free connection (or opening a new one),
+    ``checkout_ms`` the whole checkout including the pre-ping.
+    """
+    url = make_url(url)
+    poolclass = url.get_dialect().get_pool_class(url)
+    stats = pools[name] = PoolStats(name)
+    options = {
+        "poolclass": timed_pool_class(poolclass, stats),
+        "pool_pre_ping": config.DB_POOL_PRE_PING,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+    }
+    # the sync session is opened and closed in the get_db dependency's thread
+    # but used from the thread run_db runs the CRUD function in
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+    # only the queue pools (MySQL) are sized, SQLite uses its own pools
+    if issubclass(poolclass, QueuePool):
+        options.update(
+            pool_size=config.DB_POOL_SIZE,
+            max_overflow=config.DB_MAX_OVERFLOW,
+            pool_timeout=config.DB_POOL_TIMEOUT,
+        )
+    return options
+
+
+def snapshot():
+    return {name: stats.snapshot() for name, stats in pools.items()}
+
+
+def log_stats(interval: float):
+    """Log the pool stats every ``interval`` seconds from a daemon thread."""
+
+    def run():
+        while True:
+            time.sleep(interval)
+            for name, stats in snapshot().items():
+                logger.info(
+                    "pool %s: checked_out=%s overflow=%s checkouts=%s timeouts=%s"
+                    " wait_ms_sum=%s",
+                    name,
+                    stats.get("checked_out"),
+                    stats.get("overflow"),
+                    stats["checkouts"],
+                    stats["timeouts"],
+                    stats["wait_ms"]["sum"],
+                )
+
+    threading.Thread(target=run, name="pool-stats", daemon=True).start()
@@ -0,0 +1,161 @@
+import asyncio
+import itertools
+import logging
+import math
+import threading
+import time
+
+from fastapi import Request
+
+from libs import config
+
+logger = logging.getLogger(__name__)
+
+# set on the response to every write; while the browser keeps it, that
+# client's reads go to the primary and see their own writes
+STICKY_COOKIE = "read_primary"
+SAFE_METHODS = ("GET", "HEAD")
+
+
+class Replica:
+    """A read-only engine and its session factory, with its last health check."""
+
+    def __init__(self, name: str, engine, session_factory):
+        self.name = name
+        self.engine = engine
+        self.session_factory = session_factory
+        self.healthy = True
+        self.lag = None
+        self.error = None
+        self.checked_at = None
+
+    def usable(self):
+        return self.healthy and (
+            self.lag is None or self.lag <= config.REPLICA_MAX_LAG_SECONDS
+        )
+
+    def snapshot(self):
+        return {
+            "usable": self.usable(),
+            "healthy": self.healthy,
+            "lag_seconds": self.lag,
+            "error": self.error,
+            "checked_at": self.checked_at,
+        }
+
+
+replicas = []
+_turns = itertools.count()
+
+
+def choose():
+    """A usable replica, taking turns, or None when reads must use the primary."""
+    usable = [replica for replica in replicas if replica.usable()]
+    if not usable:
+        return None
+    return usable[next(_turns) % len(usable)]
+
+
+def route(request: Request):
+    """The replica to serve ``request`` from, or None for the primary.
+
+    Only GET and HEAD requests are routed to replicas, and not while the
+    client holds the sticky cookie of a recent write.
+    """
+    if request.method not in SAFE_METHODS or STICKY_COOKIE in request.cookies:
+        return None
+    return choose()
+
+
+async def stick_to_primary(request: Request, call_next):
+    """Middleware setting the sticky cookie on successful writes."""
+    response = await call_next(request)
+    if (
+        replicas
+        and request.method not in SAFE_METHODS
+        and response.status_code < 400
+        and config.READ_STICKY_SECONDS > 0
+    ):
+        response.set_cookie(
+            STICKY_COOKIE,
+            "1",
+            max_age=math.ceil(config.READ_STICKY_SECONDS),
+            httponly=True,
+        )
+    return response
+
+
+def measure_lag(connection):
+    """Seconds the replica behind ``connection`` is behind its primary.
+
+    Only MySQL reports replication lag; elsewhere the query just proves the
+    database answers and the lag is None (unknown, not held against it).
+    """
+    if connection.dialect.name != "mysql":
+        connection.exec_driver_sql("SELECT 1")
+        return None
+    status = connection.exec_driver_sql("SHOW REPLICA STATUS").mappings().first()
+    if status is None:
+        return None
+    lag = status["Seconds_Behind_Source"]
+    if lag is None:
+        raise RuntimeError("replication is not running")
+    return float(lag)
+
+
+def _record(replica: Replica, lag=None, error=None):
+    if error is not None and replica.healthy:
+        logger.warning("replica %s is unhealthy: %s", replica.name, error)
+    elif error is None and not replica.healthy:
+        logger.info("replica %s is healthy again", replica.name)
+    replica.healthy = error is None
+    replica.lag = lag
+    replica.error = None if error is None else str(error)
+    replica.checked_at = time.time()
+
+
+def check(replica: Replica):
+    try:
+        with replica.engine.connect() as connection:
+            _record(replica, lag=measure_lag(connection))
+    except Exception as error:
+        _record(replica, error=error)
+
+
+async def check_async(replica: Replica):
+    try:
+        async with replica.engine.connect() as connection:
+            _record(replica, lag=await connection.run_sync(measure_lag))
+    except Exception as error:
+        _record(replica, error=error)
+
+
+def start_checks(interval: float, is_async: bool):
+    """Check every replica every ``interval`` seconds in the background.
+
+    Sync engines are checked from a daemon thread, async engines from a task
+    on the running event loop.
+    """
+    if not replicas:
+        return
+    if is_async:
+
+        async def run_async():
+            while True:
+                await asyncio.gather(*(check_async(replica) for replica in replicas))
+                await asyncio.sleep(interval)
+
+        asyncio.get_running_loop().create_task(run_async())
+        return
+
+    def run():
+        while True:
+            for replica in replicas:
+                check(replica)
+            time.sleep(interval)
+
+    threading.Thread(target=run, name="replica-checks", daemon=True).start()
+
+
+def snapshot():
+    return {replica.name: replica.snapshot() for replica in replicas}
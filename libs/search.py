@@ -0,0 +1,95 @@
+import re
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.sql import Select
+
+from libs.bulk import bulk_insert
+from models import SearchTrigramModel
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(text: str):
+    return _WHITESPACE.sub("", text).lower()
+
+
+def ngrams(text: str):
+    """Trigrams of ``text`` plus its two shorter tail grams.
+
+    Every substring of length three or less is then a prefix of some gram,
+    so one- and two-character searches can use the index as well.
+    """
+    text = normalize(text)
+    return {text[i : i + 3] for i in range(len(text))}
+
+
+def index_rows(db: Session, table: str, rows, replace: bool = True):
+    """(Re)index the ``(id, name)`` pairs in ``rows`` for ``table``."""
+    rows = list(rows)
+    if replace:
+        unindex_rows(db=db, table=table, ids=[row_id for row_id, _ in rows])
+    mappings = [
+        {"table_name": table, "gram": gram, "row_id": row_id}
+        for row_id, name in rows
+        for gram in ngrams(name or "")
+    ]
+    bulk_insert(db=db, model=SearchTrigramModel, rows=mappings)
+
+
+def unindex_rows(db: Session, table: str, ids):
+    """Drop the index rows of ``ids``, a list of ids or a SELECT of them."""
+    if not isinstance(ids, Select):
+        ids = list(ids)
+    if isinstance(ids, Select) or ids:
+        db.query(SearchTrigramModel).filter(
+            SearchTrigramModel.table_name == table,
+            SearchTrigramModel.row_id.in_(ids),
+        ).delete(synchronize_session=False)
+
+
+def search_filter(query: Query, model, search: str):
+    """Restrict ``query`` to rows whose name contains ``search``.
+
+    Candidates come from the trigram index; the ``LIKE`` on top only
+    re-checks those candidates, so the table itself is never scanned.
+    """
+    term = normalize(search)
+    grams = select(SearchTrigramModel.row_id).where(
+        SearchTrigramModel.table_name == model.__tablename__
+    )
+    if len(term) >= 3:
+        wanted = {term[i : i + 3] for i in range(len(term) - 2)}
+        grams = (
+            grams.where(SearchTrigramModel.gram.in_(wanted))
+            .group_by(SearchTrigramModel.row_id)
+            .having(func.count(SearchTrigramModel.gram.distinct()) == len(wanted))
+        )
+    elif term:
+        grams = grams.where(
+            SearchTrigramModel.gram.startswith(term, autoescape=True)
+        ).distinct()
+    return query.filter(
+        model.id.in_(grams),
+        model.name.contains(search, autoescape=True),
+    )
+
+
+def rank(model, search: str):
+    """Match quality of ``model.name`` for ``search``: 0 exact, 1 prefix, 2 other."""
+    name = func.lower(model.name)
+    term = search.lower()
+    return case(
+        (name == term, 0),
+        (name.startswith(term, autoescape=True), 1),
+        else_=2,
+    )
+
+
+def rank_value(name: str, search: str):
+    name, term = (name or "").lower(), search.lower()
+    if name == term:
+        return 0
+    if name.startswith(term):
+        return 1
+    return 2
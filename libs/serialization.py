@@ -0,0 +1,58 @@
+from functools import lru_cache
+from typing import Any, List
+
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from pydantic.fields import SHAPE_LIST, SHAPE_SINGLETON, ModelField
+
+
+class FastJSONResponse(ORJSONResponse):
+    """orjson-encoded response with the same bytes as FastAPI's JSONResponse.
+
+    Both emit compact UTF-8 JSON without escaping non-ASCII characters.
+    """
+
+
+def _get(obj, name: str):
+    if isinstance(obj, dict):
+        return obj[name]
+    return getattr(obj, name)
+
+
+def _field_dumper(field: ModelField):
+    if isinstance(field.type_, type) and issubclass(field.type_, BaseModel):
+        build = dumper(field.type_)
+        if field.shape == SHAPE_SINGLETON:
+            return lambda value: None if value is None else build(value)
+        if field.shape == SHAPE_LIST:
+            return lambda value: [build(item) for item in value]
+        raise TypeError(f"unsupported shape of field {field.name}")
+    return None
+
+
+@lru_cache(maxsize=None)
+def dumper(schema: BaseModel):
+    """Build dicts shaped like ``schema`` from ORM rows or dicts, unvalidated.
+
+    This is what ``schema.from_orm(row)`` followed by ``jsonable_encoder``
+    produces, minus the per-attribute validation. The rows come from our own
+    tables, so the values already have the declared types.
+    """
+    fields = [(name, _field_dumper(field)) for name, field in schema.__fields__.items()]
+
+    def build(obj):
+        data = {}
+        for name, dump in fields:
+            value = _get(obj, name)
+            data[name] = value if dump is None else dump(value)
+        return data
+
+    return build
+
+
+def dump(response_model, data: Any):
+    """Dump ``data`` for ``response_model``: a schema or ``List[schema]``."""
+    if getattr(response_model, "__origin__", None) in (list, List):
+        build = dumper(response_model.__args__[0])
+        return [build(item) for item in data]
+    return dumper(response_model)(data)
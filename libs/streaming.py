@@ -0,0 +1,160 @@
+import csv
+import io
+import json
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Query, undefer
+
+from libs.pagination import keyset_batches
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def flatten(data: dict, prefix: str = ""):
+    """Flatten nested dicts into ``parent.child`` keys for CSV columns."""
+    flat = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, prefix=f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def columns(schema: BaseModel, prefix: str = ""):
+    """CSV column names of ``schema``, in the order ``flatten`` produces them."""
+    names = []
+    for name, field in schema.__fields__.items():
+        if isinstance(field.type_, type) and issubclass(field.type_, BaseModel):
+            names.extend(columns(field.type_, prefix=f"{prefix}{name}."))
+        else:
+            names.append(f"{prefix}{name}")
+    return names
+
+
+class _Encoder:
+    """Turns batches of ORM rows into NDJSON or CSV text."""
+
+    def __init__(self, schema: BaseModel, export_format: str):
+        self.schema = schema
+        self.export_format = export_format
+        self.header = export_format == "csv"
+
+    def encode(self, batch):
+        rows = [jsonable_encoder(self.schema.from_orm(row)) for row in batch]
+        if self.export_format == "ndjson":
+            return "".join(
+                json.dumps(row, separators=(",", ":")) + "\n" for row in rows
+            )
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=columns(self.schema))
+        if self.header:
+            writer.writeheader()
+            self.header = False
+        writer.writerows(flatten(row) for row in rows)
+        return buffer.getvalue()
+
+
+def export_columns(model):
+    """Keyset order of the ``/all/`` exports: newest first, as their JSON is."""
+    return [("created_at", model.created_at, True), ("id", model.id, True)]
+
+
+def _stream(query: Query, encoder: _Encoder, batch_size: int):
+    model = query.column_descriptions[0]["entity"]
+    # the keys are read from the last row of each batch, as for a cursor
+    query = query.options(undefer(model.created_at))
+    for batch in keyset_batches(query, export_columns(model), batch_size):
+        yield encoder.encode(batch)
+    yield encoder.encode([])
+
+
+async def _async_stream(
+    db: AsyncSession, query: Query, encoder: _Encoder, batch_size: int
+):
+    statement = query.statement.execution_options(yield_per=batch_size)
+    result = await db.stream(statement)
+    async for batch in result.scalars().partitions(batch_size):
+        yield encoder.encode(batch)
+    yield encoder.encode([])
+
+
+def stream_rows(
+    query: Query,
+    schema: BaseModel,
+    export_format: str,
+    filename: str,
+    db=None,
+    batch_size: int = 1000,
+    headers: dict = None,
+):
+    """Stream ``query`` as NDJSON or CSV, one ``batch_size`` chunk at a time.
+
+    Each row is serialized through ``schema`` so the records match the JSON
+    response of the endpoint; CSV columns are the flattened field paths.
+    A blocking session fetches the rows in keyset batches, newest first; with
+    an ``AsyncSession`` as ``db`` they are streamed on the event loop.
+    ``headers`` are added to the response, e.g. the conditional GET validators.
+    """
+    encoder = _Encoder(schema=schema, export_format=export_format)
+    if isinstance(db, AsyncSession):
+        body = _async_stream(db=db, query=query, encoder=encoder, batch_size=batch_size)
+    else:
+        body = _stream(query=query, encoder=encoder, batch_size=batch_size)
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[export_format],
+        headers={
+            **(headers or {}),
+            "Content-Disposition": f'attachment; filename="{filename}.{export_format}"',
+        },
+    )
+
+
+def _stream_records(parts, batch_size: int):
+    for query, record, columns in parts:
+        for batch in keyset_batches(query, columns, batch_size):
+            yield "".join(
+                json.dumps(record(row), separators=(",", ":")) + "\n" for row in batch
+            )
+
+
+async def _async_stream_records(db: AsyncSession, parts, batch_size: int):
+    for query, record, _ in parts:
+        statement = query.statement.execution_options(yield_per=batch_size)
+        result = await db.stream(statement)
+        async for batch in result.partitions(batch_size):
+            yield "".join(
+                json.dumps(record(row), separators=(",", ":")) + "\n" for row in batch
+            )
+
+
+def stream_ndjson(
+    parts,
+    filename: str,
+    db=None,
+    batch_size: int = 1000,
+    headers: dict = None,
+):
+    """Stream the rows of several queries, one after the other, as NDJSON.
+
+    ``parts`` are ``(query, record, columns)``: ``record(row)`` gives the dict
+    written for a row of the query and ``columns`` its keyset order (see
+    ``keyset_batches``). Only one batch of rows is held at a time.
+    With an ``AsyncSession`` as ``db`` the rows are fetched on the event loop.
+    """
+    if isinstance(db, AsyncSession):
+        body = _async_stream_records(db=db, parts=parts, batch_size=batch_size)
+    else:
+        body = _stream_records(parts=parts, batch_size=batch_size)
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES["ndjson"],
+        headers={
+            **(headers or {}),
+            "Content-Disposition": f'attachment; filename="{filename}.ndjson"',
+        },
+    )
@@ -1,10 +1,51 @@
 from datetime import datetime
 from uuid import uuid4
 
+from sqlalchemy.orm import joinedload, load_only
+from sqlalchemy.orm.relationships import RelationshipProperty
+
+from libs import config
+from libs.ids import uuid7
+
 
 def generate_id():
-    return str(uuid4())
+    return str(uuid7() if config.ID_FORMAT == "uuid7" else uuid4())
 
 
 def now():
     return datetime.now()
+
+
+def joined_parents(model, expand: str):
+    """Loader options that join the parents on the dotted ``expand`` path.
+
+    ``"none"`` joins nothing, so the parents are neither joined nor loaded.
+    """
+    if expand == "none":
+        return []
+    option, current = None, model
+    for name in expand.split("."):
+        attribute = getattr(current, name)
+        option = (
+            joinedload(attribute) if option is None else option.joinedload(attribute)
+        )
+        current = attribute.property.mapper.class_
+    return [option]
+
+
+def load_fields(model, expand: str, fields=None):
+    """Loader options that load only ``fields`` of ``model``.
+
+    Columns left out of ``fields`` are not selected, and the parents on the
+    ``expand`` path are only joined when the parent itself is one of them.
+    """
+    if fields is None:
+        return joined_parents(model, expand)
+    options, columns = [], []
+    for name in fields:
+        attribute = getattr(model, name)
+        if isinstance(attribute.property, RelationshipProperty):
+            options.extend(joined_parents(model, expand))
+        else:
+            columns.append(attribute)
+    return [load_only(model.id, *columns), *options]
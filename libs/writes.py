@@ -0,0 +1,153 @@
+from sqlalchemy import and_, exists, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from libs.search import unindex_rows
+from libs.utils import now
+
+
+def live(model, id):
+    """``EXISTS`` clause that is true while row ``id`` of ``model`` is not deleted."""
+    return exists().where(model.id == id, model.is_deleted == False)
+
+
+def is_live(db: Session, model, id):
+    return db.query(live(model, id)).scalar()
+
+
+def insert_row(
+    db: Session, model, values: dict, parent=None, parent_id=None, inherit=None
+):
+    """Insert one row of ``model`` and return its full column dict.
+
+    With ``parent`` the row is written by ``INSERT ... SELECT ... FROM parent``,
+    so it only goes in while ``parent_id`` is live, in the same statement.
+    Returns None when it did not. ``inherit`` maps further columns to the
+    parent columns they are copied from in that SELECT; never having been
+    read, they are not in the returned dict.
+    """
+    timestamp = now()
+    row = {
+        **values,
+        "is_deleted": False,
+        "created_at": timestamp,
+        "updated_at": timestamp,
+    }
+    if parent is None:
+        db.execute(insert(model).values(**row))
+        return row
+    columns = model.__table__.columns
+    inherit = inherit or {}
+    guarded = select(
+        *(literal(value, type_=columns[name].type) for name, value in row.items()),
+        *inherit.values(),
+    ).where(parent.id == parent_id, parent.is_deleted == False)
+    result = db.execute(insert(model).from_select([*row, *inherit], guarded))
+    return row if result.rowcount == 1 else None
+
+
+def update_row(db: Session, model, id, values: dict, *guards):
+    """``UPDATE`` live row ``id`` of ``model`` with ``values`` if all ``guards`` hold.
+
+    Returns whether the row was updated; telling a missing row from a failed
+    guard is left to the caller, which only needs to on the error path.
+    """
+    statement = (
+        update(model)
+        .where(model.id == id, model.is_deleted == False, *guards)
+        .values(**values, updated_at=now())
+        .execution_options(synchronize_session=False)
+    )
+    return db.execute(statement).rowcount == 1
+
+
+def soft_delete_row(db: Session, model, id, child_key=None):
+    """Soft-delete live row ``id`` of ``model``.
+
+    ``child_key`` is the foreign key of the child table pointing at ``model``;
+    with it the row is left alone while it still has live children.
+    """
+    guards = []
+    if child_key is not None:
+        guards.append(~_live_child(model, child_key))
+    return update_row(db, model, id, {"is_deleted": True}, *guards)
+
+
+def soft_delete_subtree(db: Session, model, ids, child_keys=()):
+    """Soft-delete the live rows ``ids`` of ``model`` and all their live descendants.
+
+    ``child_keys`` are the foreign keys down the tree from ``model``, e.g.
+    ``(StateModel.country_id, CityModel.state_id)`` under countries. Each level
+    is one set-based UPDATE whose rows are picked through the level above, so
+    no descendant id is ever loaded. Levels go deepest first, while the level
+    above is still live to select from. Returns the rows deleted per table.
+    """
+    levels = [ids]
+    for key in child_keys:
+        child = key.class_
+        levels.append(
+            select(child.id).where(key.in_(levels[-1]), child.is_deleted == False)
+        )
+    timestamp = now()
+    deleted = {}
+    for depth in range(len(child_keys), 0, -1):
+        key = child_keys[depth - 1]
+        child = key.class_
+        unindex_rows(db=db, table=child.__tablename__, ids=levels[depth])
+        deleted[child.__tablename__] = _mark_deleted(
+            db, child, key.in_(levels[depth - 1]), timestamp
+        )
+    unindex_rows(db=db, table=model.__tablename__, ids=ids)
+    deleted[model.__tablename__] = _mark_deleted(
+        db, model, model.id.in_(ids), timestamp
+    )
+    return deleted
+
+
+def soft_delete_rows(db: Session, model, ids, child_keys=(), cascade: bool = False):
+    """Soft-delete the live rows ``ids`` of ``model``, subtrees on ``cascade``.
+
+    Returns ``(deleted, missing, blocked)``: the ids deleted, the ids that are
+    not live rows, and the ids left alone because they still have live
+    children and ``cascade`` is off. One probe SELECT sorts them out first.
+    """
+    ids = list(dict.fromkeys(ids))
+    child_key = child_keys[0] if child_keys else None
+    has_children = _probe(db, model, ids, child_key)
+    missing = [id for id in ids if id not in has_children]
+    blocked = [] if cascade else [id for id in ids if has_children.get(id)]
+    deleted = [id for id in ids if id in has_children and id not in blocked]
+    if not deleted:
+        return deleted, missing, blocked
+    if cascade:
+        soft_delete_subtree(db, model, deleted, child_keys)
+    else:
+        condition = model.id.in_(deleted)
+        if child_key is not None:
+            # a child may have been added since the probe
+            condition = and_(condition, ~_live_child(model, child_key))
+        unindex_rows(db=db, table=model.__tablename__, ids=deleted)
+        _mark_deleted(db, model, condition, now())
+    return deleted, missing, blocked
+
+
+def _live_child(model, child_key):
+    return exists().where(child_key == model.id, child_key.class_.is_deleted == False)
+
+
+def _probe(db: Session, model, ids, child_key=None):
+    """Map every live id in ``ids`` to whether it has live children."""
+    if child_key is None:
+        query = db.query(model.id, literal(False))
+    else:
+        query = db.query(model.id, _live_child(model, child_key))
+    return dict(query.filter(model.id.in_(ids), model.is_deleted == False).all())
+
+
+def _mark_deleted(db: Session, model, condition, timestamp):
+    statement = (
+        update(model)
+        .where(condition, model.is_deleted == False)
+        .values(is_deleted=True, updated_at=timestamp)
+        .execution_options(synchronize_session=False)
+    )
+    return db.execute(statement).rowcount
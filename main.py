@@ -2,10 +2,33 @@ from fastapi import FastAPI
 
 import models
 from database import engine
+from libs import config, instrumentation, metrics, pool, replicas
+from routers import ops
 from routers.admin.v1 import api as admin_v1
 
 models.Base.metadata.create_all(bind=engine)
 
 app = FastAPI()
 
+app.middleware("http")(replicas.stick_to_primary)
+if config.SQL_INSTRUMENTATION:
+    app.middleware("http")(instrumentation.instrument_sql)
+# registered last so that it runs outermost and times the whole request
+if config.METRICS:
+    app.middleware("http")(metrics.record_request)
+
 app.include_router(admin_v1.router)
+app.include_router(ops.router)
+
+
+@app.on_event("startup")
+def log_pool_stats():
+    if config.DB_POOL_LOG_INTERVAL > 0:
+        pool.log_stats(config.DB_POOL_LOG_INTERVAL)
+
+
+@app.on_event("startup")
+async def check_replicas():
+    replicas.start_checks(
+        config.REPLICA_CHECK_INTERVAL, is_async=config.DATABASE_MODE == "async"
+    )
@@ -0,0 +1,96 @@
+"""initial schema
+
+Databases created by ``Base.metadata.create_all`` before migrations existed
+already have these tables, so each one is only created when it is missing.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import mysql
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _timestamps():
+    return [
+        sa.Column("is_deleted", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    ]
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "sea_regions" not in existing:
+        op.create_table(
+            "sea_regions",
+            sa.Column("id", sa.String(36), primary_key=True),
+            sa.Column("name", sa.String(255), nullable=True),
+            *_timestamps(),
+        )
+    if "countrys" not in existing:
+        op.create_table(
+            "countrys",
+            sa.Column("id", sa.String(36), primary_key=True),
+            sa.Column("name", sa.String(255), nullable=True),
+            sa.Column(
+                "sea_region_id",
+                sa.String(36),
+                sa.ForeignKey("sea_regions.id"),
+                nullable=True,
+            ),
+            *_timestamps(),
+        )
+    if "states" not in existing:
+        op.create_table(
+            "states",
+            sa.Column("id", sa.String(36), primary_key=True),
+            sa.Column("name", sa.String(255), nullable=True),
+            sa.Column(
+                "country_id", sa.String(36), sa.ForeignKey("countrys.id"), nullable=True
+            ),
+            *_timestamps(),
+        )
+    if "citys" not in existing:
+        op.create_table(
+            "citys",
+            sa.Column("id", sa.String(36), primary_key=True),
+            sa.Column("name", sa.String(255), nullable=True),
+            sa.Column(
+                "state_id", sa.String(36), sa.ForeignKey("states.id"), nullable=True
+            ),
+            *_timestamps(),
+        )
+    if "search_trigrams" not in existing:
+        op.create_table(
+            "search_trigrams",
+            sa.Column("table_name", sa.String(32), primary_key=True),
+            sa.Column(
+                "gram",
+                sa.String(3).with_variant(
+                    mysql.VARCHAR(3, collation="utf8mb4_0900_bin"),
+                    "mysql",
+                ),
+                primary_key=True,
+            ),
+            sa.Column("row_id", sa.String(36), primary_key=True),
+        )
+        op.create_index(
+            "ix_search_trigrams_row", "search_trigrams", ["table_name", "row_id"]
+        )
+
+
+def downgrade():
+    op.drop_table("search_trigrams")
+    op.drop_table("citys")
+    op.drop_table("states")
+    op.drop_table("countrys")
+    op.drop_table("sea_regions")
@@ -0,0 +1,73 @@
+"""backfill the search trigram index
+
+Rows written before the index existed are not searchable until this runs.
+Only live rows without any grams are indexed, in id order and small batches,
+so it is safe to re-run.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+from libs.search import ngrams
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+search_trigrams = sa.table(
+    "search_trigrams",
+    sa.column("table_name", sa.String),
+    sa.column("gram", sa.String),
+    sa.column("row_id", sa.String),
+)
+
+
+def _backfill(connection, table_name):
+    source = sa.table(
+        table_name,
+        sa.column("id", sa.String),
+        sa.column("name", sa.String),
+        sa.column("is_deleted", sa.Boolean),
+    )
+    last_id = ""
+    while True:
+        rows = connection.execute(
+            sa.select(source.c.id, source.c.name)
+            .where(
+                source.c.is_deleted == False,
+                source.c.id > last_id,
+                ~sa.exists().where(
+                    search_trigrams.c.table_name == table_name,
+                    search_trigrams.c.row_id == source.c.id,
+                ),
+            )
+            .order_by(source.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        mappings = [
+            {"table_name": table_name, "gram": gram, "row_id": row.id}
+            for row in rows
+            for gram in ngrams(row.name or "")
+        ]
+        if mappings:
+            connection.execute(search_trigrams.insert(), mappings)
+        last_id = rows[-1].id
+
+
+def upgrade():
+    connection = op.get_bind()
+    for table_name in ("sea_regions", "countrys", "states", "citys"):
+        _backfill(connection, table_name)
+
+
+def downgrade():
+    op.execute(search_trigrams.delete())
@@ -0,0 +1,63 @@
+"""composite indexes for the list queries
+
+Every list query filters on ``is_deleted`` (plus the parent id on the child
+tables) and sorts by ``name`` or ``updated_at``.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "sea_regions": [
+        ("ix_sea_regions_live_name", ["is_deleted", "name"]),
+        ("ix_sea_regions_live_updated_at", ["is_deleted", "updated_at"]),
+    ],
+    "countrys": [
+        ("ix_countrys_live_name", ["is_deleted", "name"]),
+        ("ix_countrys_live_updated_at", ["is_deleted", "updated_at"]),
+        ("ix_countrys_live_parent_name", ["is_deleted", "sea_region_id", "name"]),
+        (
+            "ix_countrys_live_parent_updated_at",
+            ["is_deleted", "sea_region_id", "updated_at"],
+        ),
+    ],
+    "states": [
+        ("ix_states_live_name", ["is_deleted", "name"]),
+        ("ix_states_live_updated_at", ["is_deleted", "updated_at"]),
+        ("ix_states_live_parent_name", ["is_deleted", "country_id", "name"]),
+        (
+            "ix_states_live_parent_updated_at",
+            ["is_deleted", "country_id", "updated_at"],
+        ),
+    ],
+    "citys": [
+        ("ix_citys_live_name", ["is_deleted", "name"]),
+        ("ix_citys_live_updated_at", ["is_deleted", "updated_at"]),
+        ("ix_citys_live_parent_name", ["is_deleted", "state_id", "name"]),
+        ("ix_citys_live_parent_updated_at", ["is_deleted", "state_id", "updated_at"]),
+    ],
+}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table, indexes in INDEXES.items():
+        existing = {index["name"] for index in inspector.get_indexes(table)}
+        for name, columns in indexes:
+            if name not in existing:
+                op.create_index(name, table, columns)
+
+
+def downgrade():
+    for table, indexes in INDEXES.items():
+        for name, _ in indexes:
+            op.drop_index(name, table_name=table)
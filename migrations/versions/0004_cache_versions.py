@@ -0,0 +1,27 @@
+"""cache version counters
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if "cache_versions" not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            "cache_versions",
+            sa.Column("table_name", sa.String(32), primary_key=True),
+            sa.Column("version", sa.BigInteger(), nullable=False),
+        )
+
+
+def downgrade():
+    op.drop_table("cache_versions")
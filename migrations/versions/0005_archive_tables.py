@@ -0,0 +1,45 @@
+"""archive tables for purged soft-deleted rows
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+# archive table -> parent id column
+TABLES = {
+    "sea_regions_archive": None,
+    "countrys_archive": "sea_region_id",
+    "states_archive": "country_id",
+    "citys_archive": "state_id",
+}
+
+
+def upgrade():
+    existing = sa.inspect(op.get_bind()).get_table_names()
+    for table, parent_column in TABLES.items():
+        if table in existing:
+            continue
+        columns = [
+            sa.Column("id", sa.String(36), primary_key=True),
+            sa.Column("name", sa.String(255)),
+            sa.Column("is_deleted", sa.Boolean()),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("updated_at", sa.DateTime()),
+            sa.Column("archived_at", sa.DateTime()),
+        ]
+        if parent_column:
+            columns.insert(2, sa.Column(parent_column, sa.String(36)))
+        op.create_table(table, *columns)
+
+
+def downgrade():
+    for table in reversed(list(TABLES)):
+        op.drop_table(table)
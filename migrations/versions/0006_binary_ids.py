@@ -0,0 +1,109 @@
+"""store ids as 16-byte binary when ID_STORAGE=binary
+
+With the default ``ID_STORAGE=string`` this revision changes nothing. With
+``binary`` every id and parent id column, and the search index's row ids,
+are converted from the 36-character string to the UUID's 16 bytes in place,
+keeping their indexes. On MySQL (8.0+) that is ``UUID_TO_BIN`` inside the
+server, with the foreign keys dropped while the columns change type;
+elsewhere the values are rewritten from Python. To switch storage later,
+downgrade to 0005, change the setting and upgrade again.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+
+import uuid
+
+import sqlalchemy as sa
+from alembic import op
+
+from libs import config
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+COLUMNS = {
+    "sea_regions": ["id"],
+    "countrys": ["id", "sea_region_id"],
+    "states": ["id", "country_id"],
+    "citys": ["id", "state_id"],
+    "search_trigrams": ["row_id"],
+    "sea_regions_archive": ["id"],
+    "countrys_archive": ["id", "sea_region_id"],
+    "states_archive": ["id", "country_id"],
+    "citys_archive": ["id", "state_id"],
+}
+
+
+def is_binary(inspector):
+    column = next(c for c in inspector.get_columns("sea_regions") if c["name"] == "id")
+    return column["type"].python_type is bytes
+
+
+def convert_mysql(bind, to_binary: bool):
+    inspector = sa.inspect(bind)
+    foreign_keys = [
+        (table, foreign_key)
+        for table in COLUMNS
+        for foreign_key in inspector.get_foreign_keys(table)
+    ]
+    for table, foreign_key in foreign_keys:
+        op.drop_constraint(foreign_key["name"], table, type_="foreignkey")
+    for table, columns in COLUMNS.items():
+        for column in columns:
+            # through VARBINARY, which holds both the text and the 16 bytes
+            op.execute(f"ALTER TABLE {table} MODIFY {column} VARBINARY(36)")
+            function = "UUID_TO_BIN" if to_binary else "BIN_TO_UUID"
+            op.execute(f"UPDATE {table} SET {column} = {function}({column})")
+            final = "BINARY(16)" if to_binary else "VARCHAR(36)"
+            op.execute(f"ALTER TABLE {table} MODIFY {column} {final}")
+    for table, foreign_key in foreign_keys:
+        op.create_foreign_key(
+            foreign_key["name"],
+            table,
+            foreign_key["referred_table"],
+            foreign_key["constrained_columns"],
+            foreign_key["referred_columns"],
+        )
+
+
+def convert_generic(bind, to_binary: bool):
+    new_type = sa.LargeBinary(16) if to_binary else sa.String(36)
+    for table, columns in COLUMNS.items():
+        # values first: the type change below casts them as they are
+        rows = sa.table(table, *(sa.column(column) for column in columns))
+        for column in columns:
+            values = bind.execute(
+                sa.select(rows.c[column]).where(rows.c[column] != None).distinct()
+            ).scalars()
+            for value in list(values):
+                new = (
+                    uuid.UUID(value).bytes if to_binary else str(uuid.UUID(bytes=value))
+                )
+                bind.execute(
+                    rows.update().where(rows.c[column] == value).values({column: new})
+                )
+        with op.batch_alter_table(table) as batch:
+            for column in columns:
+                batch.alter_column(column, type_=new_type)
+
+
+def convert(to_binary: bool):
+    bind = op.get_bind()
+    if config.ID_STORAGE != "binary" or is_binary(sa.inspect(bind)) == to_binary:
+        return
+    if bind.dialect.name == "mysql":
+        convert_mysql(bind, to_binary)
+    else:
+        convert_generic(bind, to_binary)
+
+
+def upgrade():
+    convert(to_binary=True)
+
+
+def downgrade():
+    convert(to_binary=False)
@@ -0,0 +1,120 @@
+"""ancestor ids on states and cities
+
+States get their country's ``sea_region_id``; cities get their state's
+``country_id`` and ``sea_region_id``, so the list queries can filter on any
+level above the parent with one index. The columns are filled from the
+parents, states first, in id order and small batches, soft-deleted rows
+included; the archive tables get the columns empty.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+from libs.ids import Id
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+# table -> (parent table, parent column, ancestor columns copied from it)
+COLUMNS = {
+    "states": ("countrys", "country_id", ["sea_region_id"]),
+    "citys": ("states", "state_id", ["country_id", "sea_region_id"]),
+}
+ARCHIVE_COLUMNS = {
+    "states_archive": ["sea_region_id"],
+    "citys_archive": ["country_id", "sea_region_id"],
+}
+INDEXES = {
+    "states": [
+        ("ix_states_live_region_name", ["is_deleted", "sea_region_id", "name"]),
+        (
+            "ix_states_live_region_updated_at",
+            ["is_deleted", "sea_region_id", "updated_at"],
+        ),
+    ],
+    "citys": [
+        ("ix_citys_live_country_name", ["is_deleted", "country_id", "name"]),
+        (
+            "ix_citys_live_country_updated_at",
+            ["is_deleted", "country_id", "updated_at"],
+        ),
+        ("ix_citys_live_region_name", ["is_deleted", "sea_region_id", "name"]),
+        (
+            "ix_citys_live_region_updated_at",
+            ["is_deleted", "sea_region_id", "updated_at"],
+        ),
+    ],
+}
+
+
+def _add_columns(inspector, table, columns):
+    existing = {column["name"] for column in inspector.get_columns(table)}
+    for column in columns:
+        if column not in existing:
+            op.add_column(table, sa.Column(column, Id()))
+
+
+def _backfill(connection, table, parent_table, parent_column, columns):
+    child = sa.table(
+        table, sa.column("id"), sa.column(parent_column), *map(sa.column, columns)
+    )
+    parent = sa.table(parent_table, sa.column("id"), *map(sa.column, columns))
+    values = {
+        column: sa.select(parent.c[column])
+        .where(parent.c.id == child.c[parent_column])
+        .scalar_subquery()
+        for column in columns
+    }
+    last_id = None
+    while True:
+        query = sa.select(child.c.id).order_by(child.c.id).limit(BATCH_SIZE)
+        if last_id is not None:
+            query = query.where(child.c.id > last_id)
+        ids = connection.execute(query).scalars().all()
+        if not ids:
+            break
+        connection.execute(
+            child.update()
+            .where(child.c.id >= ids[0], child.c.id <= ids[-1])
+            .values(**values)
+        )
+        last_id = ids[-1]
+
+
+def upgrade():
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+    for table, (_, _, columns) in COLUMNS.items():
+        _add_columns(inspector, table, columns)
+    for table, columns in ARCHIVE_COLUMNS.items():
+        _add_columns(inspector, table, columns)
+    # states first: cities copy the sea region from them
+    for table, (parent_table, parent_column, columns) in COLUMNS.items():
+        _backfill(connection, table, parent_table, parent_column, columns)
+    for table, indexes in INDEXES.items():
+        existing = {index["name"] for index in inspector.get_indexes(table)}
+        for name, columns in indexes:
+            if name not in existing:
+                op.create_index(name, table, columns)
+
+
+def downgrade():
+    for table, indexes in INDEXES.items():
+        for name, _ in indexes:
+            op.drop_index(name, table_name=table)
+    for table, columns in {
+        **{table: columns for table, (_, _, columns) in COLUMNS.items()},
+        **ARCHIVE_COLUMNS,
+    }.items():
+        # a table rebuild on SQLite, which cannot drop columns otherwise
+        with op.batch_alter_table(table) as batch:
+            for column in columns:
+                batch.drop_column(column)
@@ -0,0 +1,30 @@
+"""time of the last write per table in cache_versions
+
+The conditional GET validators of the list routes are read from
+cache_versions; this is their Last-Modified. Tables not written since stay
+NULL, and their lists carry no Last-Modified until their next write.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = sa.inspect(op.get_bind()).get_columns("cache_versions")
+    if "updated_at" not in {column["name"] for column in columns}:
+        op.add_column("cache_versions", sa.Column("updated_at", sa.DateTime()))
+
+
+def downgrade():
+    # a table rebuild on SQLite, which cannot drop columns otherwise
+    with op.batch_alter_table("cache_versions") as batch:
+        batch.drop_column("updated_at")
@@ -1,55 +1,189 @@
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, String
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, ForeignKey, Index, String
+from sqlalchemy.dialects import mysql
 from sqlalchemy.orm import relationship
 
 from database import Base
+from libs.ids import Id
 
 
 class SeaRegionModel(Base):
     __tablename__ = "sea_regions"
 
-    id = Column(String(36), primary_key=True)
+    id = Column(Id, primary_key=True)
     name = Column(String(255))
     is_deleted = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now)
 
+    __table_args__ = (
+        Index("ix_sea_regions_live_name", "is_deleted", "name"),
+        Index("ix_sea_regions_live_updated_at", "is_deleted", "updated_at"),
+    )
+
 
 class CountryModel(Base):
     __tablename__ = "countrys"
 
-    id = Column(String(36), primary_key=True)
+    id = Column(Id, primary_key=True)
     name = Column(String(255))
-    sea_region_id = Column(String(36), ForeignKey("sea_regions.id"))
+    sea_region_id = Column(Id, ForeignKey("sea_regions.id"))
     is_deleted = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now)
 
     sea_region = relationship("SeaRegionModel", backref="countrys")
 
+    __table_args__ = (
+        Index("ix_countrys_live_name", "is_deleted", "name"),
+        Index("ix_countrys_live_updated_at", "is_deleted", "updated_at"),
+        Index("ix_countrys_live_parent_name", "is_deleted", "sea_region_id", "name"),
+        Index(
+            "ix_countrys_live_parent_updated_at",
+            "is_deleted",
+            "sea_region_id",
+            "updated_at",
+        ),
+    )
+
 
 class StateModel(Base):
     __tablename__ = "states"
 
-    id = Column(String(36), primary_key=True)
+    id = Column(Id, primary_key=True)
     name = Column(String(255))
-    country_id = Column(String(36), ForeignKey("countrys.id"))
+    country_id = Column(Id, ForeignKey("countrys.id"))
+    # copied from the country by the write paths (libs/ancestors.py)
+    sea_region_id = Column(Id)
     is_deleted = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now)
 
     country = relationship("CountryModel", backref="states")
 
+    __table_args__ = (
+        Index("ix_states_live_name", "is_deleted", "name"),
+        Index("ix_states_live_updated_at", "is_deleted", "updated_at"),
+        Index("ix_states_live_parent_name", "is_deleted", "country_id", "name"),
+        Index(
+            "ix_states_live_parent_updated_at",
+            "is_deleted",
+            "country_id",
+            "updated_at",
+        ),
+        Index("ix_states_live_region_name", "is_deleted", "sea_region_id", "name"),
+        Index(
+            "ix_states_live_region_updated_at",
+            "is_deleted",
+            "sea_region_id",
+            "updated_at",
+        ),
+    )
+
 
 class CityModel(Base):
     __tablename__ = "citys"
 
-    id = Column(String(36), primary_key=True)
+    id = Column(Id, primary_key=True)
     name = Column(String(255))
-    state_id = Column(String(36), ForeignKey("states.id"))
+    state_id = Column(Id, ForeignKey("states.id"))
+    # copied from the state by the write paths (libs/ancestors.py)
+    country_id = Column(Id)
+    sea_region_id = Column(Id)
     is_deleted = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now)
 
     state = relationship("StateModel", backref="citys")
+
+    __table_args__ = (
+        Index("ix_citys_live_name", "is_deleted", "name"),
+        Index("ix_citys_live_updated_at", "is_deleted", "updated_at"),
+        Index("ix_citys_live_parent_name", "is_deleted", "state_id", "name"),
+        Index(
+            "ix_citys_live_parent_updated_at", "is_deleted", "state_id", "updated_at"
+        ),
+        Index("ix_citys_live_country_name", "is_deleted", "country_id", "name"),
+        Index(
+            "ix_citys_live_country_updated_at",
+            "is_deleted",
+            "country_id",
+            "updated_at",
+        ),
+        Index("ix_citys_live_region_name", "is_deleted", "sea_region_id", "name"),
+        Index(
+            "ix_citys_live_region_updated_at",
+            "is_deleted",
+            "sea_region_id",
+            "updated_at",
+        ),
+    )
+
+
+class SearchTrigramModel(Base):
+    """Trigram index over the ``name`` column of the tables above."""
+
+    __tablename__ = "search_trigrams"
+
+    table_name = Column(String(32), primary_key=True)
+    # binary, no-pad collation so grams differing only in case, accents or
+    # trailing spaces are still distinct keys on MySQL
+    gram = Column(
+        String(3).with_variant(mysql.VARCHAR(3, collation="utf8mb4_0900_bin"), "mysql"),
+        primary_key=True,
+    )
+    row_id = Column(Id, primary_key=True)
+
+    __table_args__ = (Index("ix_search_trigrams_row", "table_name", "row_id"),)
+
+
+class CacheVersionModel(Base):
+    """Per-table write counter that lets every worker see the others' writes."""
+
+    __tablename__ = "cache_versions"
+
+    table_name = Column(String(32), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    # when the table was last written, the Last-Modified of its lists
+    updated_at = Column(DateTime)
+
+
+class ArchivedRow:
+    """Columns shared by the archive tables the purge job moves old rows to.
+
+    Archived rows keep their parent ids but no foreign keys, since parents
+    are archived independently.
+    """
+
+    id = Column(Id, primary_key=True)
+    name = Column(String(255))
+    is_deleted = Column(Boolean)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.now)
+
+
+class SeaRegionArchiveModel(ArchivedRow, Base):
+    __tablename__ = "sea_regions_archive"
+
+
+class CountryArchiveModel(ArchivedRow, Base):
+    __tablename__ = "countrys_archive"
+
+    sea_region_id = Column(Id)
+
+
+class StateArchiveModel(ArchivedRow, Base):
+    __tablename__ = "states_archive"
+
+    country_id = Column(Id)
+    sea_region_id = Column(Id)
+
+
+class CityArchiveModel(ArchivedRow, Base):
+    __tablename__ = "citys_archive"
+
+    state_id = Column(Id)
+    country_id = Column(Id)
+    sea_region_id = Column(Id)
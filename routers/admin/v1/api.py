@@ -1,82 +1,256 @@
-from typing import List
-
-from fastapi import APIRouter, Depends, HTTPException, Path, Query, status
+from typing import Any, List, Optional, Union
+
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    HTTPException,
+    Path,
+    Query,
+    Response,
+    status,
+)
 from sqlalchemy.orm import Session
 
-from dependencies import get_db
-from routers.admin.v1.crud import city, countries, sea_region, state
+from dependencies import get_db, run_db, sync_session
+from libs.bulk import BATCH_SIZE
+from libs.conditional import Conditional, RowConditional
+from libs.instrumentation import query_budget
+from libs.pagination import MAX_LIMIT
+from libs.streaming import stream_ndjson, stream_rows
+from models import CityModel, CountryModel, SeaRegionModel, StateModel
+from routers.admin.v1.crud import city, countries, sea_region, state, tree
 from routers.admin.v1.schemas import (
+    BulkDeleteResult,
+    BulkResult,
     City,
     CityAdd,
     CityList,
+    CityNode,
     Country,
     CountryAdd,
     CountryList,
+    CountryNode,
     SeaRegion,
     SeaRegionAdd,
     SeaRegionList,
+    SeaRegionNode,
     State,
     StateAdd,
     StateList,
+    StateNode,
+    TreeRecord,
+    any_expansion,
+    expand_paths,
+    expanded,
+    shaped,
+    shaped_list,
 )
 
 router = APIRouter()
 
+
+def expand_query(schema):
+    """``expand`` parameter of ``schema``'s routes, the full nesting by default."""
+    paths = expand_paths(schema)
+    return Query(paths[-1], regex="^(%s)$" % "|".join(paths).replace(".", r"\."))
+
+
+def fields_query():
+    """``fields`` parameter: comma-separated top-level fields to return."""
+    return Query(None, regex=r"^\w+(,\w+)*$", max_length=200)
+
+
+def ids_query():
+    """``ids`` of the batch deletes: up to ``BATCH_SIZE`` comma-separated ids."""
+    return Query(..., regex=r"^[\w-]{36}(,[\w-]{36})*$", max_length=37 * BATCH_SIZE - 1)
+
+
+def bulk_body(schema):
+    """Body of the bulk adds: a list of ``schema`` objects, validated one by one.
+
+    FastAPI would reject the whole list over one malformed item, so the items
+    come in raw and the CRUD function reports each invalid one in ``errors``.
+    """
+    return Body(..., description=f"{schema.__name__} objects")
+
+
+def split_fields(schema, expand: str, fields: Optional[str]):
+    """``fields=`` as a sorted tuple, checked against the ``expand`` shape."""
+    if fields is None:
+        return None
+    fields = tuple(sorted(set(fields.split(","))))
+    try:
+        shaped(schema, expand, fields)
+    except ValueError as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+    return fields
+
+
+# @query_budget is what the route issues with nothing cached: the
+# conditional-GET validator query and the route's own, plus on the cached
+# reads the cache version poll CACHE_SHARED_VERSIONS adds; writes include
+# the cache_versions bump of their commit, and cascading deletes issue two
+# statements per level of the subtree
+sea_region_validators = Conditional(sea_region.READ_TABLES)
+countries_validators = Conditional(countries.READ_TABLES)
+state_validators = Conditional(state.READ_TABLES)
+city_validators = Conditional(city.READ_TABLES)
+tree_validators = Conditional(tree.READ_TABLES)
+sea_region_row_validators = RowConditional(SeaRegionModel, "region_id")
+country_row_validators = RowConditional(CountryModel, "country_id")
+state_row_validators = RowConditional(StateModel, "state_id")
+city_row_validators = RowConditional(CityModel, "city_id")
+
 # sea-region
 
 
 @router.post("/sea_region", status_code=status.HTTP_201_CREATED, tags=["sea_region"])
-def add_sea_region(region_schema: SeaRegionAdd, db: Session = Depends(get_db)):
-    data = sea_region.add_sea_region(region_schema=region_schema, db=db)
+@query_budget(3)
+async def add_sea_region(region_schema: SeaRegionAdd, db: Session = Depends(get_db)):
+    data = await run_db(sea_region.add_sea_region, db=db, region_schema=region_schema)
+    return data
+
+
+@router.post(
+    "/sea_region/bulk",
+    status_code=status.HTTP_201_CREATED,
+    response_model=BulkResult,
+    tags=["sea_region"],
+)
+async def add_sea_regions(
+    items: List[Any] = bulk_body(SeaRegionAdd),
+    all_or_nothing: bool = False,
+    db: Session = Depends(get_db),
+):
+    data = await run_db(
+        sea_region.add_sea_regions,
+        db=db,
+        response_model=BulkResult,
+        items=items,
+        all_or_nothing=all_or_nothing,
+    )
     return data
 
 
 @router.get("/sea_region/{region_id}", response_model=SeaRegion, tags=["sea_region"])
-def get_sea_region(
-    region_id: str = Path(min_length=36, max_length=36), db: Session = Depends(get_db)
+@query_budget(3)
+async def get_sea_region(
+    region_id: str = Path(min_length=36, max_length=36),
+    db: Session = Depends(get_db),
+    validators: dict = Depends(sea_region_row_validators),
 ):
-    data = sea_region.get_sea_region(region_id=region_id, db=db)
+    data = await run_db(
+        sea_region.get_sea_region,
+        db=db,
+        headers=validators,
+        response_model=SeaRegion,
+        region_id=region_id,
+    )
     return data
 
 
 @router.get("/sea_region", response_model=SeaRegionList, tags=["sea_region"])
-def get_region_list(
+@query_budget(3)
+async def get_region_list(
     start: int = 0,
-    limit: int = 10,
+    limit: int = Query(10, ge=1, le=MAX_LIMIT),
     sort_by: str = Query("all", min_length=3, max_length=50),
     order: str = Query("all", min_length=3, max_length=4),
     search: str = Query("all", min_length=1, max_length=50),
+    cursor: Optional[str] = Query(None, max_length=512),
+    count_mode: str = Query("exact", regex="^(exact|skip|cached)$"),
     db: Session = Depends(get_db),
+    validators: dict = Depends(sea_region_validators),
 ):
-    data = sea_region.get_region_list(
-        start=start, limit=limit, sort_by=sort_by, order=order, search=search, db=db
+    data = await run_db(
+        sea_region.get_region_list,
+        db=db,
+        headers=validators,
+        response_model=SeaRegionList,
+        start=start,
+        limit=limit,
+        sort_by=sort_by,
+        order=order,
+        search=search,
+        cursor=cursor,
+        count_mode=count_mode,
     )
     return data
 
 
 @router.get("/sea_region/all/", response_model=List[SeaRegion], tags=["sea_region"])
-def get_all_sea_region(db: Session = Depends(get_db)):
-    data = sea_region.get_all_sea_region(db=db)
+@query_budget(3)
+async def get_all_sea_region(
+    export_format: str = Query("json", alias="format", regex="^(json|ndjson|csv)$"),
+    db: Session = Depends(get_db),
+    validators: dict = Depends(sea_region_validators),
+):
+    if export_format != "json":
+        query = sea_region.get_all_sea_region_query(db=sync_session(db))
+        return stream_rows(
+            query=query,
+            schema=SeaRegion,
+            export_format=export_format,
+            filename="sea_regions",
+            db=db,
+            headers=validators,
+        )
+    data = await run_db(
+        sea_region.get_all_sea_region,
+        db=db,
+        headers=validators,
+        response_model=List[SeaRegion],
+    )
     return data
 
 
 @router.put("/sea_region/{region_id}", response_model=SeaRegion, tags=["sea_region"])
-def update_sea_region(
+@query_budget(4)
+async def update_sea_region(
     region_schema: SeaRegionAdd,
     region_id: str = Path(min_length=36, max_length=36),
     db: Session = Depends(get_db),
 ):
-    data = sea_region.update_sea_region(
-        region_schema=region_schema, region_id=region_id, db=db
+    data = await run_db(
+        sea_region.update_sea_region,
+        db=db,
+        response_model=SeaRegion,
+        region_schema=region_schema,
+        region_id=region_id,
     )
     return data
 
 
 @router.delete("/sea_region/{region_id}", tags=["sea_region"])
-def delete_sea_region(
-    region_id: str = Path(min_length=36, max_length=36), db: Session = Depends(get_db)
+@query_budget(10)
+async def delete_sea_region(
+    region_id: str = Path(min_length=36, max_length=36),
+    cascade: bool = False,
+    db: Session = Depends(get_db),
 ):
-    data = sea_region.delete_sea_region(region_id=region_id, db=db)
+    data = await run_db(
+        sea_region.delete_sea_region, db=db, region_id=region_id, cascade=cascade
+    )
+    return data
+
+
+@router.delete("/sea_region", response_model=BulkDeleteResult, tags=["sea_region"])
+@query_budget(10)
+async def delete_sea_regions(
+    ids: str = ids_query(),
+    cascade: bool = False,
+    all_or_nothing: bool = False,
+    db: Session = Depends(get_db),
+):
+    data = await run_db(
+        sea_region.delete_sea_regions,
+        db=db,
+        response_model=BulkDeleteResult,
+        region_ids=ids.split(","),
+        cascade=cascade,
+        all_or_nothing=all_or_nothing,
+    )
     return data
 
 
@@ -86,67 +260,182 @@ def delete_sea_region(
 
 
 @router.post("/countries", status_code=status.HTTP_201_CREATED, tags=["country"])
-def add_country(country_schema: CountryAdd, db: Session = Depends(get_db)):
-    data = countries.add_country(country_schema=country_schema, db=db)
+@query_budget(3)
+async def add_country(country_schema: CountryAdd, db: Session = Depends(get_db)):
+    data = await run_db(countries.add_country, db=db, country_schema=country_schema)
+    return data
+
+
+@router.post(
+    "/countries/bulk",
+    status_code=status.HTTP_201_CREATED,
+    response_model=BulkResult,
+    tags=["country"],
+)
+async def add_countries(
+    items: List[Any] = bulk_body(CountryAdd),
+    all_or_nothing: bool = False,
+    db: Session = Depends(get_db),
+):
+    data = await run_db(
+        countries.add_countries,
+        db=db,
+        response_model=BulkResult,
+        items=items,
+        all_or_nothing=all_or_nothing,
+    )
     return data
 
 
-@router.get("/countries/{country_id}", response_model=Country, tags=["country"])
-def get_country(
-    country_id: str = Path(min_length=36, max_length=36), db: Session = Depends(get_db)
+@router.get(
+    "/countries/{country_id}", response_model=any_expansion(Country), tags=["country"]
+)
+@query_budget(3)
+async def get_country(
+    country_id: str = Path(min_length=36, max_length=36),
+    expand: str = expand_query(Country),
+    db: Session = Depends(get_db),
+    validators: dict = Depends(country_row_validators),
 ):
-    data = countries.get_country(country_id=country_id, db=db)
+    data = await run_db(
+        countries.get_country,
+        db=db,
+        headers=validators,
+        response_model=expanded(Country, expand),
+        expand=expand,
+        country_id=country_id,
+    )
     return data
 
 
-@router.get("/countries", response_model=CountryList, tags=["country"])
-def get_country_list(
+@router.get(
+    "/countries",
+    responses={200: {"model": any_expansion(Country, CountryList)}},
+    tags=["country"],
+)
+@query_budget(3)
+async def get_country_list(
     start: int = 0,
-    limit: int = 10,
+    limit: int = Query(10, ge=1, le=MAX_LIMIT),
     sort_by: str = Query("all", min_length=3, max_length=50),
     order: str = Query("all", min_length=3, max_length=4),
     search: str = Query("all", min_length=1, max_length=50),
+    cursor: Optional[str] = Query(None, max_length=512),
+    count_mode: str = Query("exact", regex="^(exact|skip|cached)$"),
     sea_region_id: str = Query("all", min_length=3, max_length=36),
+    expand: str = expand_query(Country),
+    fields: Optional[str] = fields_query(),
     db: Session = Depends(get_db),
+    validators: dict = Depends(countries_validators),
 ):
-    data = countries.get_countries_list(
+    fields = split_fields(Country, expand, fields)
+    data = await run_db(
+        countries.get_countries_list,
+        db=db,
+        headers=validators,
+        response_model=shaped_list(CountryList, Country, expand, fields),
+        fields=fields,
+        expand=expand,
         start=start,
         limit=limit,
         sort_by=sort_by,
         order=order,
         search=search,
-        db=db,
         sea_region_id=sea_region_id,
+        cursor=cursor,
+        count_mode=count_mode,
     )
     return data
 
 
-@router.get("/countries/all/", response_model=List[Country], tags=["country"])
-def get_all_country(
+@router.get(
+    "/countries/all/",
+    responses={200: {"model": List[any_expansion(Country)]}},
+    tags=["country"],
+)
+@query_budget(3)
+async def get_all_country(
     sea_region_id: str = Query("all", min_length=3, max_length=36),
+    export_format: str = Query("json", alias="format", regex="^(json|ndjson|csv)$"),
+    expand: str = expand_query(Country),
+    fields: Optional[str] = fields_query(),
     db: Session = Depends(get_db),
+    validators: dict = Depends(countries_validators),
 ):
-    data = countries.get_all_countries(sea_region_id=sea_region_id, db=db)
+    fields = split_fields(Country, expand, fields)
+    if export_format != "json":
+        query = countries.get_all_countries_query(
+            sea_region_id=sea_region_id,
+            db=sync_session(db),
+            expand=expand,
+            fields=fields,
+        )
+        return stream_rows(
+            query=query,
+            schema=shaped(Country, expand, fields),
+            export_format=export_format,
+            filename="countries",
+            db=db,
+            headers=validators,
+        )
+    data = await run_db(
+        countries.get_all_countries,
+        db=db,
+        headers=validators,
+        response_model=List[shaped(Country, expand, fields)],
+        fields=fields,
+        expand=expand,
+        sea_region_id=sea_region_id,
+    )
     return data
 
 
 @router.put("/countries/{country_id}", response_model=Country, tags=["country"])
-def update_country(
+@query_budget(7)
+async def update_country(
     country_schema: CountryAdd,
     country_id: str = Path(min_length=36, max_length=36),
     db: Session = Depends(get_db),
 ):
-    data = countries.update_country(
-        country_schema=country_schema, country_id=country_id, db=db
+    data = await run_db(
+        countries.update_country,
+        db=db,
+        response_model=Country,
+        country_schema=country_schema,
+        country_id=country_id,
     )
     return data
 
 
 @router.delete("/countries/{country_id}", tags=["country"])
-def delete_country(
-    country_id: str = Path(min_length=36, max_length=36), db: Session = Depends(get_db)
+@query_budget(8)
+async def delete_country(
+    country_id: str = Path(min_length=36, max_length=36),
+    cascade: bool = False,
+    db: Session = Depends(get_db),
+):
+    data = await run_db(
+        countries.delete_country, db=db, country_id=country_id, cascade=cascade
+    )
+    return data
+
+
+@router.delete("/countries", response_model=BulkDeleteResult, tags=["country"])
+@query_budget(8)
+async def delete_countries(
+    ids: str = ids_query(),
+    cascade: bool = False,
+    all_or_nothing: bool = False,
+    db: Session = Depends(get_db),
 ):
-    data = countries.delete_country(country_id=country_id, db=db)
+    data = await run_db(
+        countries.delete_countries,
+        db=db,
+        response_model=BulkDeleteResult,
+        country_ids=ids.split(","),
+        cascade=cascade,
+        all_or_nothing=all_or_nothing,
+    )
     return data
 
 
@@ -156,65 +445,183 @@ def delete_country(
 
 
 @router.post("/state", status_code=status.HTTP_201_CREATED, tags=["state"])
-def add_state(state_schema: StateAdd, db: Session = Depends(get_db)):
-    data = state.add_state(state_schema=state_schema, db=db)
+@query_budget(3)
+async def add_state(state_schema: StateAdd, db: Session = Depends(get_db)):
+    data = await run_db(state.add_state, db=db, state_schema=state_schema)
     return data
 
 
-@router.get("/state/{state_id}", response_model=State, tags=["state"])
-def get_state(
-    state_id: str = Path(min_length=36, max_length=36), db: Session = Depends(get_db)
+@router.post(
+    "/state/bulk",
+    status_code=status.HTTP_201_CREATED,
+    response_model=BulkResult,
+    tags=["state"],
+)
+async def add_states(
+    items: List[Any] = bulk_body(StateAdd),
+    all_or_nothing: bool = False,
+    db: Session = Depends(get_db),
 ):
-    data = state.get_state(state_id=state_id, db=db)
+    data = await run_db(
+        state.add_states,
+        db=db,
+        response_model=BulkResult,
+        items=items,
+        all_or_nothing=all_or_nothing,
+    )
     return data
 
 
-@router.get("/state", response_model=StateList, tags=["state"])
-def get_state_list(
+@router.get("/state/{state_id}", response_model=any_expansion(State), tags=["state"])
+@query_budget(3)
+async def get_state(
+    state_id: str = Path(min_length=36, max_length=36),
+    expand: str = expand_query(State),
+    db: Session = Depends(get_db),
+    validators: dict = Depends(state_row_validators),
+):
+    data = await run_db(
+        state.get_state,
+        db=db,
+        headers=validators,
+        response_model=expanded(State, expand),
+        expand=expand,
+        state_id=state_id,
+    )
+    return data
+
+
+@router.get(
+    "/state",
+    responses={200: {"model": any_expansion(State, StateList)}},
+    tags=["state"],
+)
+@query_budget(3)
+async def get_state_list(
     start: int = 0,
-    limit: int = 10,
+    limit: int = Query(10, ge=1, le=MAX_LIMIT),
     sort_by: str = Query("all", min_length=3, max_length=50),
     order: str = Query("all", min_length=3, max_length=4),
     search: str = Query("all", min_length=1, max_length=50),
+    cursor: Optional[str] = Query(None, max_length=512),
+    count_mode: str = Query("exact", regex="^(exact|skip|cached)$"),
     country_id: str = Query("all", min_length=3, max_length=36),
+    sea_region_id: str = Query("all", min_length=3, max_length=36),
+    expand: str = expand_query(State),
+    fields: Optional[str] = fields_query(),
     db: Session = Depends(get_db),
+    validators: dict = Depends(state_validators),
 ):
-    data = state.get_state_list(
+    fields = split_fields(State, expand, fields)
+    data = await run_db(
+        state.get_state_list,
+        db=db,
+        headers=validators,
+        response_model=shaped_list(StateList, State, expand, fields),
+        fields=fields,
+        expand=expand,
         start=start,
         limit=limit,
         sort_by=sort_by,
         order=order,
         search=search,
         country_id=country_id,
-        db=db,
+        sea_region_id=sea_region_id,
+        cursor=cursor,
+        count_mode=count_mode,
     )
     return data
 
 
-@router.get("/state/all/", response_model=List[State], tags=["state"])
-def get_all_state(
+@router.get(
+    "/state/all/",
+    responses={200: {"model": List[any_expansion(State)]}},
+    tags=["state"],
+)
+@query_budget(3)
+async def get_all_state(
     country_id: str = Query("all", min_length=3, max_length=36),
+    sea_region_id: str = Query("all", min_length=3, max_length=36),
+    export_format: str = Query("json", alias="format", regex="^(json|ndjson|csv)$"),
+    expand: str = expand_query(State),
+    fields: Optional[str] = fields_query(),
     db: Session = Depends(get_db),
+    validators: dict = Depends(state_validators),
 ):
-    data = state.get_all_state(country_id=country_id, db=db)
+    fields = split_fields(State, expand, fields)
+    if export_format != "json":
+        query = state.get_all_state_query(
+            country_id=country_id,
+            db=sync_session(db),
+            expand=expand,
+            fields=fields,
+            sea_region_id=sea_region_id,
+        )
+        return stream_rows(
+            query=query,
+            schema=shaped(State, expand, fields),
+            export_format=export_format,
+            filename="states",
+            db=db,
+            headers=validators,
+        )
+    data = await run_db(
+        state.get_all_state,
+        db=db,
+        headers=validators,
+        response_model=List[shaped(State, expand, fields)],
+        fields=fields,
+        expand=expand,
+        country_id=country_id,
+        sea_region_id=sea_region_id,
+    )
     return data
 
 
 @router.put("/state/{state_id}", response_model=State, tags=["state"])
-def update_state(
+@query_budget(6)
+async def update_state(
     state_schema: StateAdd,
     state_id: str = Path(min_length=36, max_length=36),
     db: Session = Depends(get_db),
 ):
-    data = state.update_state(state_schema=state_schema, state_id=state_id, db=db)
+    data = await run_db(
+        state.update_state,
+        db=db,
+        response_model=State,
+        state_schema=state_schema,
+        state_id=state_id,
+    )
     return data
 
 
 @router.delete("/state/{state_id}", tags=["state"])
-def delete_state(
-    state_id: str = Path(min_length=36, max_length=36), db: Session = Depends(get_db)
+@query_budget(6)
+async def delete_state(
+    state_id: str = Path(min_length=36, max_length=36),
+    cascade: bool = False,
+    db: Session = Depends(get_db),
+):
+    data = await run_db(state.delete_state, db=db, state_id=state_id, cascade=cascade)
+    return data
+
+
+@router.delete("/state", response_model=BulkDeleteResult, tags=["state"])
+@query_budget(6)
+async def delete_states(
+    ids: str = ids_query(),
+    cascade: bool = False,
+    all_or_nothing: bool = False,
+    db: Session = Depends(get_db),
 ):
-    data = state.delete_state(state_id=state_id, db=db)
+    data = await run_db(
+        state.delete_states,
+        db=db,
+        response_model=BulkDeleteResult,
+        state_ids=ids.split(","),
+        cascade=cascade,
+        all_or_nothing=all_or_nothing,
+    )
     return data
 
 
@@ -224,63 +631,224 @@ def delete_state(
 
 
 @router.post("/city", status_code=status.HTTP_201_CREATED, tags=["city"])
-def add_city(city_schema: CityAdd, db: Session = Depends(get_db)):
-    data = city.add_city(city_schema=city_schema, db=db)
+@query_budget(3)
+async def add_city(city_schema: CityAdd, db: Session = Depends(get_db)):
+    data = await run_db(city.add_city, db=db, city_schema=city_schema)
     return data
 
 
-@router.get("/city/{city_id}", response_model=City, tags=["city"])
-def get_city(
-    city_id: str = Path(min_length=36, max_length=36), db: Session = Depends(get_db)
+@router.post(
+    "/city/bulk",
+    status_code=status.HTTP_201_CREATED,
+    response_model=BulkResult,
+    tags=["city"],
+)
+async def add_cities(
+    items: List[Any] = bulk_body(CityAdd),
+    all_or_nothing: bool = False,
+    db: Session = Depends(get_db),
 ):
-    data = city.get_city(city_id=city_id, db=db)
+    data = await run_db(
+        city.add_cities,
+        db=db,
+        response_model=BulkResult,
+        items=items,
+        all_or_nothing=all_or_nothing,
+    )
     return data
 
 
-@router.get("/city", response_model=CityList, tags=["city"])
-def get_city_list(
+@router.get("/city/{city_id}", response_model=any_expansion(City), tags=["city"])
+@query_budget(2)
+async def get_city(
+    city_id: str = Path(min_length=36, max_length=36),
+    expand: str = expand_query(City),
+    db: Session = Depends(get_db),
+    validators: dict = Depends(city_row_validators),
+):
+    data = await run_db(
+        city.get_city,
+        db=db,
+        headers=validators,
+        response_model=expanded(City, expand),
+        city_id=city_id,
+        expand=expand,
+    )
+    return data
+
+
+@router.get(
+    "/city", responses={200: {"model": any_expansion(City, CityList)}}, tags=["city"]
+)
+@query_budget(3)
+async def get_city_list(
     start: int = 0,
-    limit: int = 10,
+    limit: int = Query(10, ge=1, le=MAX_LIMIT),
     sort_by: str = Query("all", min_length=3, max_length=50),
     order: str = Query("all", min_length=3, max_length=4),
     search: str = Query("all", min_length=1, max_length=50),
+    cursor: Optional[str] = Query(None, max_length=512),
+    count_mode: str = Query("exact", regex="^(exact|skip|cached)$"),
     state_id: str = Query("all", min_length=3, max_length=36),
+    country_id: str = Query("all", min_length=3, max_length=36),
+    sea_region_id: str = Query("all", min_length=3, max_length=36),
+    expand: str = expand_query(City),
+    fields: Optional[str] = fields_query(),
     db: Session = Depends(get_db),
+    validators: dict = Depends(city_validators),
 ):
-    data = city.get_city_list(
+    fields = split_fields(City, expand, fields)
+    data = await run_db(
+        city.get_city_list,
+        db=db,
+        headers=validators,
+        response_model=shaped_list(CityList, City, expand, fields),
+        fields=fields,
+        expand=expand,
         start=start,
         limit=limit,
         sort_by=sort_by,
         order=order,
         search=search,
         state_id=state_id,
-        db=db,
+        country_id=country_id,
+        sea_region_id=sea_region_id,
+        cursor=cursor,
+        count_mode=count_mode,
     )
     return data
 
 
-@router.get("/city/all/", response_model=List[City], tags=["city"])
-def get_all_city(
+@router.get(
+    "/city/all/", responses={200: {"model": List[any_expansion(City)]}}, tags=["city"]
+)
+@query_budget(2)
+async def get_all_city(
     state_id: str = Query("all", min_length=3, max_length=36),
+    country_id: str = Query("all", min_length=3, max_length=36),
+    sea_region_id: str = Query("all", min_length=3, max_length=36),
+    export_format: str = Query("json", alias="format", regex="^(json|ndjson|csv)$"),
+    expand: str = expand_query(City),
+    fields: Optional[str] = fields_query(),
     db: Session = Depends(get_db),
+    validators: dict = Depends(city_validators),
 ):
-    data = city.get_all_city(state_id=state_id, db=db)
+    fields = split_fields(City, expand, fields)
+    if export_format != "json":
+        query = city.get_all_city_query(
+            state_id=state_id,
+            db=sync_session(db),
+            expand=expand,
+            fields=fields,
+            country_id=country_id,
+            sea_region_id=sea_region_id,
+        )
+        return stream_rows(
+            query=query,
+            schema=shaped(City, expand, fields),
+            export_format=export_format,
+            filename="cities",
+            db=db,
+            headers=validators,
+        )
+    data = await run_db(
+        city.get_all_city,
+        db=db,
+        headers=validators,
+        response_model=List[shaped(City, expand, fields)],
+        fields=fields,
+        expand=expand,
+        state_id=state_id,
+        country_id=country_id,
+        sea_region_id=sea_region_id,
+    )
     return data
 
 
 @router.put("/city/{city_id}", response_model=City, tags=["city"])
-def update_city(
+@query_budget(5)
+async def update_city(
     city_schema: CityAdd,
     city_id: str = Path(min_length=36, max_length=36),
     db: Session = Depends(get_db),
 ):
-    data = city.update_city(city_schema=city_schema, city_id=city_id, db=db)
+    data = await run_db(
+        city.update_city,
+        db=db,
+        response_model=City,
+        city_schema=city_schema,
+        city_id=city_id,
+    )
     return data
 
 
 @router.delete("/city/{city_id}", tags=["city"])
-def delete_city(
+@query_budget(4)
+async def delete_city(
     city_id: str = Path(min_length=36, max_length=36), db: Session = Depends(get_db)
 ):
-    data = city.delete_city(city_id=city_id, db=db)
+    data = await run_db(city.delete_city, db=db, city_id=city_id)
+    return data
+
+
+@router.delete("/city", response_model=BulkDeleteResult, tags=["city"])
+@query_budget(4)
+async def delete_cities(
+    ids: str = ids_query(),
+    all_or_nothing: bool = False,
+    db: Session = Depends(get_db),
+):
+    data = await run_db(
+        city.delete_cities,
+        db=db,
+        response_model=BulkDeleteResult,
+        city_ids=ids.split(","),
+        all_or_nothing=all_or_nothing,
+    )
     return data
+
+
+# tree
+
+
+@router.get(
+    "/tree",
+    responses={
+        200: {
+            "model": List[Union[SeaRegionNode, CountryNode, StateNode, CityNode]],
+            "content": {"application/x-ndjson": {"schema": TreeRecord.schema()}},
+        }
+    },
+    tags=["tree"],
+)
+@query_budget(6)
+async def get_tree(
+    root_type: Optional[str] = Query(None, regex="^(sea_region|country|state|city)$"),
+    root_id: Optional[str] = Query(None, min_length=36, max_length=36),
+    depth: Optional[int] = Query(None, ge=0, le=3),
+    export_format: str = Query("json", alias="format", regex="^(json|ndjson)$"),
+    db: Session = Depends(get_db),
+    validators: dict = Depends(tree_validators),
+):
+    """The hierarchy under ``root_type``/``root_id``, or under every sea region.
+
+    ``depth`` limits the levels below the top one. ``format=json`` returns
+    the nested tree, served from the read cache while nothing changes;
+    ``format=ndjson`` streams one flat record per node, parents first.
+    """
+    if (root_type is None) != (root_id is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="root_type and root_id go together",
+        )
+    if export_format == "ndjson":
+        if root_id is not None:
+            await run_db(tree.check_root, db=db, root_type=root_type, root_id=root_id)
+        parts = tree.tree_records(
+            db=sync_session(db), root_type=root_type, root_id=root_id, depth=depth
+        )
+        return stream_ndjson(parts=parts, filename="tree", db=db, headers=validators)
+    body = await run_db(
+        tree.get_tree_json, db=db, root_type=root_type, root_id=root_id, depth=depth
+    )
+    return Response(body, media_type="application/json", headers=validators)
@@ -1,40 +1,116 @@
+from typing import Any, List, Optional
+
 from fastapi import HTTPException, status
-from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
-from libs.utils import generate_id, now
-from models import CityModel, StateModel
+from libs import ancestors
+from libs.bulk import bulk_insert, parse_rows
+from libs.pagination import paginate
+from libs.search import index_rows, search_filter, unindex_rows
+from libs.utils import generate_id, joined_parents, load_fields
+from libs.writes import (
+    insert_row,
+    is_live,
+    live,
+    soft_delete_row,
+    soft_delete_rows,
+    update_row,
+)
+from models import CityModel, CountryModel, SeaRegionModel, StateModel
 from routers.admin.v1.schemas import CityAdd
 
+# City -> State -> Country -> SeaRegion are all many-to-one, so a single
+# joined load pulls the whole ancestor chain (or the part of it a shorter
+# ``expand`` asks for) in the same SELECT.
+CITY_EXPAND = "state.country.sea_region"
+READ_TABLES = (
+    CityModel.__tablename__,
+    StateModel.__tablename__,
+    CountryModel.__tablename__,
+    SeaRegionModel.__tablename__,
+)
+
 
 def add_city(city_schema: CityAdd, db: Session):
     id = generate_id()
-    db_city = CityModel(id=id, name=city_schema.name, state_id=city_schema.state_id)
-    db_state = (
-        db.query(StateModel)
-        .filter(StateModel.id == city_schema.state_id, StateModel.is_deleted == False)
-        .first()
+    db_city = insert_row(
+        db=db,
+        model=CityModel,
+        values={"id": id, "name": city_schema.name, "state_id": city_schema.state_id},
+        parent=StateModel,
+        parent_id=city_schema.state_id,
+        inherit=ancestors.INHERITED[CityModel],
     )
-    if db_state is None:
+    if db_city is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="state is not found"
         )
-    db.add(db_city)
+    index_rows(
+        db=db,
+        table=CityModel.__tablename__,
+        rows=[(id, city_schema.name)],
+        replace=False,
+    )
     db.commit()
-    db.refresh(db_city)
     return db_city
 
 
-def get_city_by_id(city_id: str, db: Session):
+def add_cities(items: List[Any], all_or_nothing: bool, db: Session):
+    city_schemas, errors = parse_rows(CityAdd, items)
+    invalid = bool(errors)
+    parents = ancestors.live_parents(
+        db=db,
+        model=CityModel,
+        parent=StateModel,
+        ids=[city_schema.state_id for _, city_schema in city_schemas],
+    )
+    rows, created = [], []
+    for index, city_schema in city_schemas:
+        if city_schema.state_id not in parents:
+            errors.append({"index": index, "detail": "state is not found"})
+            continue
+        id = generate_id()
+        rows.append(
+            {
+                "id": id,
+                "name": city_schema.name,
+                "state_id": city_schema.state_id,
+                **parents[city_schema.state_id],
+            }
+        )
+        created.append({"index": index, "id": id})
+    errors.sort(key=lambda error: error["index"])
+    if errors and all_or_nothing:
+        raise HTTPException(
+            status_code=(
+                status.HTTP_422_UNPROCESSABLE_ENTITY
+                if invalid
+                else status.HTTP_404_NOT_FOUND
+            ),
+            detail=errors,
+        )
+    bulk_insert(db=db, model=CityModel, rows=rows)
+    index_rows(
+        db=db,
+        table=CityModel.__tablename__,
+        rows=[(row["id"], row["name"]) for row in rows],
+        replace=False,
+    )
+    db.commit()
+    return {"created": created, "errors": errors}
+
+
+def get_city_by_id(city_id: str, db: Session, expand: str = CITY_EXPAND):
     return (
         db.query(CityModel)
+        .options(*joined_parents(CityModel, expand))
         .filter(CityModel.id == city_id, CityModel.is_deleted == False)
         .first()
     )
 
 
-def get_city(city_id: str, db: Session):
-    db_city = get_city_by_id(city_id=city_id, db=db)
+def get_city(city_id: str, db: Session, expand: str = CITY_EXPAND):
+    db_city = get_city_by_id(city_id=city_id, db=db, expand=expand)
     if db_city is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="city is not found"
@@ -42,6 +118,14 @@ def get_city(city_id: str, db: Session):
     return db_city
 
 
+def ancestor_filter(query, country_id: str, sea_region_id: str):
+    if country_id != "all":
+        query = query.filter(CityModel.country_id == country_id)
+    if sea_region_id != "all":
+        query = query.filter(CityModel.sea_region_id == sea_region_id)
+    return query
+
+
 def get_city_list(
     start: int,
     limit: int,
@@ -50,34 +134,52 @@ def get_city_list(
     search: str,
     state_id: str,
     db: Session,
+    cursor: Optional[str] = None,
+    count_mode: str = "exact",
+    expand: str = CITY_EXPAND,
+    fields: Optional[tuple] = None,
+    country_id: str = "all",
+    sea_region_id: str = "all",
 ):
-    query = db.query(CityModel).filter(CityModel.is_deleted == False)
+    query = (
+        db.query(CityModel)
+        .options(*load_fields(CityModel, expand, fields))
+        .filter(CityModel.is_deleted == False)
+    )
 
     if state_id != "all":
         query = query.filter(
             CityModel.state_id == state_id, CityModel.is_deleted == False
         )
 
+    query = ancestor_filter(query, country_id, sea_region_id)
+
     if search != "all":
-        text = f"""%{search}%"""
-        query = query.filter(or_(CityModel.name.like(text)))
-
-    if sort_by == "name":
-        if order == "desc":
-            query = query.order_by(CityModel.name.desc())
-        else:
-            query = query.order_by(CityModel.name)
-    else:
-        query = query.order_by(CityModel.updated_at.desc())
+        query = search_filter(query=query, model=CityModel, search=search)
 
-    results = query.offset(start).limit(limit).all()
-    count = query.count()
-    data = {"count": count, "list": results}
+    data = paginate(
+        query=query,
+        model=CityModel,
+        start=start,
+        limit=limit,
+        sort_by=sort_by,
+        order=order,
+        cursor=cursor,
+        count_mode=count_mode,
+        search=None if search == "all" else search,
+    )
     return data
 
 
-def get_all_city(state_id: str, db: Session):
-    query = db.query(CityModel)
+def get_all_city_query(
+    state_id: str,
+    db: Session,
+    expand: str = CITY_EXPAND,
+    fields: Optional[tuple] = None,
+    country_id: str = "all",
+    sea_region_id: str = "all",
+):
+    query = db.query(CityModel).options(*load_fields(CityModel, expand, fields))
 
     if state_id != "all":
         query = query.filter(
@@ -85,42 +187,72 @@ def get_all_city(state_id: str, db: Session):
         )
     else:
         query = query.filter(CityModel.is_deleted == False)
+    query = ancestor_filter(query, country_id, sea_region_id)
+
+    return query.order_by(CityModel.created_at.desc())
 
-    db_city = query.order_by(CityModel.created_at.desc()).all()
+
+def get_all_city(
+    state_id: str,
+    db: Session,
+    expand: str = CITY_EXPAND,
+    fields: Optional[tuple] = None,
+    country_id: str = "all",
+    sea_region_id: str = "all",
+):
+    db_city = get_all_city_query(
+        state_id=state_id,
+        db=db,
+        expand=expand,
+        fields=fields,
+        country_id=country_id,
+        sea_region_id=sea_region_id,
+    ).all()
     return db_city
 
 
 def update_city(city_schema: CityAdd, city_id: str, db: Session):
-    db_city = get_city_by_id(city_id=city_id, db=db)
-    if db_city is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="City is not found"
-        )
-    db_state = (
-        db.query(StateModel)
-        .filter(StateModel.id == city_schema.state_id, StateModel.is_deleted == False)
-        .first()
+    updated = update_row(
+        db,
+        CityModel,
+        city_id,
+        {
+            "name": city_schema.name,
+            "state_id": city_schema.state_id,
+            **ancestors.inherited_values(CityModel, city_schema.state_id),
+        },
+        live(StateModel, city_schema.state_id),
     )
-    if db_state is None:
+    if not updated:
+        if not is_live(db, CityModel, city_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="City is not found"
+            )
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="State is not found"
         )
-    db_city.name = city_schema.name
-    db_city.state_id = city_schema.state_id
-    db_city.updated_at = now()
+    index_rows(db=db, table=CityModel.__tablename__, rows=[(city_id, city_schema.name)])
     db.commit()
-    db.refresh(db_city)
-    return db_city
+    # the response nests the parents, which the request did not carry
+    return get_city_by_id(city_id=city_id, db=db)
 
 
 def delete_city(city_id: str, db: Session):
-    db_city = get_city_by_id(city_id=city_id, db=db)
-    if db_city is None:
+    if not soft_delete_row(db, CityModel, city_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="city Not found"
         )
-    db_city.is_deleted = True
-    db_city.updated_at = now()
+    name = db.query(CityModel.name).filter(CityModel.id == city_id).scalar()
+    unindex_rows(db=db, table=CityModel.__tablename__, ids=[city_id])
+    db.commit()
+    return f"{name} is deleted successfully"
+
+
+def delete_cities(city_ids: List[str], all_or_nothing: bool, db: Session):
+    deleted, missing, _ = soft_delete_rows(db=db, model=CityModel, ids=city_ids)
+    errors = [{"id": id, "detail": "city Not found"} for id in missing]
+    if errors and all_or_nothing:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=errors)
     db.commit()
-    db.refresh(db_city)
-    return f"{db_city.name} is deleted successfully"
+    return {"deleted": deleted, "errors": errors}
@@ -1,15 +1,37 @@
+from typing import Any, List, Optional
+
 from fastapi import HTTPException, status
-from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
-from libs.utils import generate_id, now
-from models import CountryModel, SeaRegionModel, StateModel
-from routers.admin.v1.schemas import CountryAdd
+from libs import ancestors
+from libs.bulk import bulk_insert, parse_rows
+from libs.cache import cached_read
+from libs.pagination import paginate
+from libs.search import index_rows, search_filter, unindex_rows
+from libs.utils import generate_id, joined_parents, load_fields
+from libs.writes import (
+    insert_row,
+    is_live,
+    live,
+    soft_delete_row,
+    soft_delete_rows,
+    soft_delete_subtree,
+    update_row,
+)
+from models import CityModel, CountryModel, SeaRegionModel, StateModel
+from routers.admin.v1.schemas import Country, CountryAdd, expanded, shaped
+
+COUNTRY_EXPAND = "sea_region"
+READ_TABLES = (CountryModel.__tablename__, SeaRegionModel.__tablename__)
 
+# Foreign keys of the levels under countries, top down, for cascading deletes.
+SUBTREE = (StateModel.country_id, CityModel.state_id)
 
-def get_country_by_id(country_id: str, db: Session):
+
+def get_country_by_id(country_id: str, db: Session, expand: str = COUNTRY_EXPAND):
     return (
         db.query(CountryModel)
+        .options(*joined_parents(CountryModel, expand))
         .filter(CountryModel.id == country_id, CountryModel.is_deleted == False)
         .first()
     )
@@ -17,36 +39,88 @@ def get_country_by_id(country_id: str, db: Session):
 
 def add_country(country_schema: CountryAdd, db: Session):
     id = generate_id()
-    db_countries = CountryModel(
-        id=id,
-        name=country_schema.name,
-        sea_region_id=country_schema.sea_region_id,
-    )
-    db_region = (
-        db.query(SeaRegionModel)
-        .filter(
-            SeaRegionModel.id == country_schema.sea_region_id,
-            SeaRegionModel.is_deleted == False,
-        )
-        .first()
+    db_countries = insert_row(
+        db=db,
+        model=CountryModel,
+        values={
+            "id": id,
+            "name": country_schema.name,
+            "sea_region_id": country_schema.sea_region_id,
+        },
+        parent=SeaRegionModel,
+        parent_id=country_schema.sea_region_id,
     )
-    if db_region is None:
+    if db_countries is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Sea-Region is Not Found"
         )
-    db.add(db_countries)
+    index_rows(
+        db=db,
+        table=CountryModel.__tablename__,
+        rows=[(id, country_schema.name)],
+        replace=False,
+    )
     db.commit()
-    db.refresh(db_countries)
     return db_countries
 
 
-def get_country(country_id: str, db: Session):
-    db_countries = get_country_by_id(country_id=country_id, db=db)
-    if db_countries is None:
+def add_countries(items: List[Any], all_or_nothing: bool, db: Session):
+    country_schemas, errors = parse_rows(CountryAdd, items)
+    invalid = bool(errors)
+    parents = ancestors.live_parents(
+        db=db,
+        model=CountryModel,
+        parent=SeaRegionModel,
+        ids=[country_schema.sea_region_id for _, country_schema in country_schemas],
+    )
+    rows, created = [], []
+    for index, country_schema in country_schemas:
+        if country_schema.sea_region_id not in parents:
+            errors.append({"index": index, "detail": "Sea-Region is Not Found"})
+            continue
+        id = generate_id()
+        rows.append(
+            {
+                "id": id,
+                "name": country_schema.name,
+                "sea_region_id": country_schema.sea_region_id,
+                **parents[country_schema.sea_region_id],
+            }
+        )
+        created.append({"index": index, "id": id})
+    errors.sort(key=lambda error: error["index"])
+    if errors and all_or_nothing:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Country is not found"
+            status_code=(
+                status.HTTP_422_UNPROCESSABLE_ENTITY
+                if invalid
+                else status.HTTP_404_NOT_FOUND
+            ),
+            detail=errors,
         )
-    return db_countries
+    bulk_insert(db=db, model=CountryModel, rows=rows)
+    index_rows(
+        db=db,
+        table=CountryModel.__tablename__,
+        rows=[(row["id"], row["name"]) for row in rows],
+        replace=False,
+    )
+    db.commit()
+    return {"created": created, "errors": errors}
+
+
+def get_country(country_id: str, db: Session, expand: str = COUNTRY_EXPAND):
+    def load():
+        db_countries = get_country_by_id(country_id=country_id, db=db, expand=expand)
+        if db_countries is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Country is not found"
+            )
+        return expanded(Country, expand).from_orm(db_countries).dict()
+
+    return cached_read(
+        db=db, tables=READ_TABLES, key=("id", country_id, expand), load=load
+    )
 
 
 def get_countries_list(
@@ -57,8 +131,16 @@ def get_countries_list(
     search: str,
     sea_region_id: str,
     db: Session,
+    cursor: Optional[str] = None,
+    count_mode: str = "exact",
+    expand: str = COUNTRY_EXPAND,
+    fields: Optional[tuple] = None,
 ):
-    query = db.query(CountryModel).filter(CountryModel.is_deleted == False)
+    query = (
+        db.query(CountryModel)
+        .options(*load_fields(CountryModel, expand, fields))
+        .filter(CountryModel.is_deleted == False)
+    )
 
     if sea_region_id != "all":
         query = query.filter(
@@ -67,26 +149,29 @@ def get_countries_list(
         )
 
     if search != "all":
-        text = f"""%{search}%"""
-        query = query.filter(or_(CountryModel.name.like(text)))
-
-    if sort_by == "name":
-        if order == "desc":
-            query = query.order_by(CountryModel.name.desc())
-        else:
-            query = query.order_by(CountryModel.name)
-
-    else:
-        query = query.order_by(CountryModel.updated_at.desc())
+        query = search_filter(query=query, model=CountryModel, search=search)
 
-    results = query.offset(start).limit(limit).all()
-    count = query.count()
-    data = {"count": count, "list": results}
+    data = paginate(
+        query=query,
+        model=CountryModel,
+        start=start,
+        limit=limit,
+        sort_by=sort_by,
+        order=order,
+        cursor=cursor,
+        count_mode=count_mode,
+        search=None if search == "all" else search,
+    )
     return data
 
 
-def get_all_countries(sea_region_id: str, db: Session):
-    query = db.query(CountryModel)
+def get_all_countries_query(
+    sea_region_id: str,
+    db: Session,
+    expand: str = COUNTRY_EXPAND,
+    fields: Optional[tuple] = None,
+):
+    query = db.query(CountryModel).options(*load_fields(CountryModel, expand, fields))
 
     if sea_region_id != "all":
         query = query.filter(
@@ -95,52 +180,104 @@ def get_all_countries(sea_region_id: str, db: Session):
         )
     else:
         query = query.filter(CountryModel.is_deleted == False)
-    db_countries = query.order_by(CountryModel.created_at.desc()).all()
-    return db_countries
+    return query.order_by(CountryModel.created_at.desc())
+
+
+def get_all_countries(
+    sea_region_id: str,
+    db: Session,
+    expand: str = COUNTRY_EXPAND,
+    fields: Optional[tuple] = None,
+):
+    def load():
+        db_countries = get_all_countries_query(
+            sea_region_id=sea_region_id, db=db, expand=expand, fields=fields
+        )
+        schema = shaped(Country, expand, fields)
+        return [schema.from_orm(db_country).dict() for db_country in db_countries]
+
+    return cached_read(
+        db=db,
+        tables=READ_TABLES,
+        key=("all", sea_region_id, expand, fields),
+        load=load,
+    )
 
 
 def update_country(country_id: str, db: Session, country_schema: CountryAdd):
-    db_countries = get_country_by_id(country_id=country_id, db=db)
-    if db_countries is None:
+    updated = update_row(
+        db,
+        CountryModel,
+        country_id,
+        {"name": country_schema.name, "sea_region_id": country_schema.sea_region_id},
+        live(SeaRegionModel, country_schema.sea_region_id),
+    )
+    if not updated:
+        if not is_live(db, CountryModel, country_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Country is Not Found"
+            )
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Country is Not Found"
-        )
-    db_region = (
-        db.query(SeaRegionModel)
-        .filter(
-            SeaRegionModel.id == country_schema.sea_region_id,
-            SeaRegionModel.is_deleted == False,
+            status_code=status.HTTP_404_NOT_FOUND, detail="Sea-Region is Not Found"
         )
-        .first()
+    ancestors.cascade(db=db, model=CountryModel, id=country_id)
+    index_rows(
+        db=db,
+        table=CountryModel.__tablename__,
+        rows=[(country_id, country_schema.name)],
     )
-    if db_region is None:
+    db.commit()
+    # the response nests the sea region, which the request did not carry
+    return get_country_by_id(country_id=country_id, db=db)
+
+
+def delete_country(country_id: str, db: Session, cascade: bool = False):
+    if cascade:
+        return _delete_subtree(country_id=country_id, db=db)
+    if not soft_delete_row(db, CountryModel, country_id, child_key=SUBTREE[0]):
+        if not is_live(db, CountryModel, country_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Country is Not Found"
+            )
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Sea-Region is Not Found"
+            status_code=status.HTTP_403_FORBIDDEN, detail="Country has state"
         )
-    db_countries.name = country_schema.name
-    db_countries.updated_at = now()
+    name = db.query(CountryModel.name).filter(CountryModel.id == country_id).scalar()
+    unindex_rows(db=db, table=CountryModel.__tablename__, ids=[country_id])
     db.commit()
-    db.refresh(db_countries)
-    return db_countries
+    return f"{name} is deleted successfully"
 
 
-def delete_country(country_id: str, db: Session):
-    db_countries = get_country_by_id(country_id=country_id, db=db)
-    if db_countries is None:
+def _delete_subtree(country_id: str, db: Session):
+    db_country = (
+        db.query(CountryModel.name)
+        .filter(CountryModel.id == country_id, CountryModel.is_deleted == False)
+        .first()
+    )
+    if db_country is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Country is Not Found"
         )
-    count = (
-        db.query(StateModel.id)
-        .filter(StateModel.country_id == country_id, StateModel.is_deleted == False)
-        .count()
+    soft_delete_subtree(db=db, model=CountryModel, ids=[country_id], child_keys=SUBTREE)
+    db.commit()
+    return f"{db_country.name} is deleted successfully"
+
+
+def delete_countries(
+    country_ids: List[str], cascade: bool, all_or_nothing: bool, db: Session
+):
+    deleted, missing, blocked = soft_delete_rows(
+        db=db, model=CountryModel, ids=country_ids, child_keys=SUBTREE, cascade=cascade
     )
-    if count > 0:
+    errors = [{"id": id, "detail": "Country is Not Found"} for id in missing]
+    errors += [{"id": id, "detail": "Country has state"} for id in blocked]
+    if errors and all_or_nothing:
+        db.rollback()
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN, detail="Country has state"
+            status_code=(
+                status.HTTP_403_FORBIDDEN if blocked else status.HTTP_404_NOT_FOUND
+            ),
+            detail=errors,
         )
-    db_countries.is_deleted = True
-    db_countries.updated_at = now()
     db.commit()
-    db.refresh(db_countries)
-    return f"{db_countries.name} is deleted successfully"
+    return {"deleted": deleted, "errors": errors}
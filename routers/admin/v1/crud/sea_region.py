@@ -1,21 +1,73 @@
+from typing import Any, List, Optional
+
 from fastapi import HTTPException, status
-from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
-from libs.utils import generate_id, now
-from models import CountryModel, SeaRegionModel
-from routers.admin.v1.schemas import SeaRegionAdd
+from libs.bulk import bulk_insert, parse_rows
+from libs.cache import cached_read
+from libs.pagination import paginate
+from libs.search import index_rows, search_filter, unindex_rows
+from libs.utils import generate_id
+from libs.writes import (
+    insert_row,
+    is_live,
+    soft_delete_row,
+    soft_delete_rows,
+    soft_delete_subtree,
+    update_row,
+)
+from models import CityModel, CountryModel, SeaRegionModel, StateModel
+from routers.admin.v1.schemas import SeaRegion, SeaRegionAdd
+
+READ_TABLES = (SeaRegionModel.__tablename__,)
+
+# Foreign keys of the levels under sea regions, top down, for cascading
+# deletes.
+SUBTREE = (
+    CountryModel.sea_region_id,
+    StateModel.country_id,
+    CityModel.state_id,
+)
 
 
 def add_sea_region(region_schema: SeaRegionAdd, db: Session):
     id = generate_id()
-    db_region = SeaRegionModel(id=id, name=region_schema.name)
-    db.add(db_region)
+    db_region = insert_row(
+        db=db, model=SeaRegionModel, values={"id": id, "name": region_schema.name}
+    )
+    index_rows(
+        db=db,
+        table=SeaRegionModel.__tablename__,
+        rows=[(id, region_schema.name)],
+        replace=False,
+    )
     db.commit()
-    db.refresh(db_region)
     return db_region
 
 
+def add_sea_regions(items: List[Any], all_or_nothing: bool, db: Session):
+    region_schemas, errors = parse_rows(SeaRegionAdd, items)
+    # sea regions have no parent, so every error is an invalid item
+    if errors and all_or_nothing:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=errors
+        )
+    rows, created = [], []
+    for index, region_schema in region_schemas:
+        id = generate_id()
+        rows.append({"id": id, "name": region_schema.name})
+        created.append({"index": index, "id": id})
+    bulk_insert(db=db, model=SeaRegionModel, rows=rows)
+    index_rows(
+        db=db,
+        table=SeaRegionModel.__tablename__,
+        rows=[(row["id"], row["name"]) for row in rows],
+        replace=False,
+    )
+    db.commit()
+    return {"created": created, "errors": errors}
+
+
 def get_region_by_id(region_id: str, db: Session):
     return (
         db.query(SeaRegionModel)
@@ -25,79 +77,127 @@ def get_region_by_id(region_id: str, db: Session):
 
 
 def get_sea_region(region_id: str, db: Session):
-    db_region = get_region_by_id(region_id=region_id, db=db)
-    if db_region is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Sea-Region is Not Found"
-        )
-    return db_region
+    def load():
+        db_region = get_region_by_id(region_id=region_id, db=db)
+        if db_region is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Sea-Region is Not Found"
+            )
+        return SeaRegion.from_orm(db_region).dict()
+
+    return cached_read(db=db, tables=READ_TABLES, key=("id", region_id), load=load)
 
 
 def get_region_list(
-    start: int, limit: int, sort_by: str, order: str, search: str, db: Session
+    start: int,
+    limit: int,
+    sort_by: str,
+    order: str,
+    search: str,
+    db: Session,
+    cursor: Optional[str] = None,
+    count_mode: str = "exact",
 ):
     query = db.query(SeaRegionModel).filter(SeaRegionModel.is_deleted == False)
 
     if search != "all":
-        text = f"""%{search}%"""
-        query = query.filter(or_(SeaRegionModel.name.like(text)))
-
-    if sort_by == "name":
-        if order == "desc":
-            query = query.order_by(SeaRegionModel.name.desc())
-        else:
-            query = query.order_by(SeaRegionModel.name)
-    else:
-        query = query.order_by(SeaRegionModel.updated_at.desc())
-
-    results = query.offset(start).limit(limit).all()
-    count = query.count()
-    data = {"count": count, "list": results}
+        query = search_filter(query=query, model=SeaRegionModel, search=search)
+
+    data = paginate(
+        query=query,
+        model=SeaRegionModel,
+        start=start,
+        limit=limit,
+        sort_by=sort_by,
+        order=order,
+        cursor=cursor,
+        count_mode=count_mode,
+        search=None if search == "all" else search,
+    )
     return data
 
 
-def get_all_sea_region(db: Session):
+def get_all_sea_region_query(db: Session):
     query = (
         db.query(SeaRegionModel)
         .filter(SeaRegionModel.is_deleted == False)
         .order_by(SeaRegionModel.name.desc())
-        .all()
     )
     return query
 
 
+def get_all_sea_region(db: Session):
+    def load():
+        query = get_all_sea_region_query(db=db).all()
+        return [SeaRegion.from_orm(db_region).dict() for db_region in query]
+
+    return cached_read(db=db, tables=READ_TABLES, key=("all",), load=load)
+
+
 def update_sea_region(region_id: str, db: Session, region_schema: SeaRegionAdd):
-    db_region = get_region_by_id(region_id=region_id, db=db)
-    if db_region is None:
+    if not update_row(db, SeaRegionModel, region_id, {"name": region_schema.name}):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Sea-region is Not Found"
         )
-    db_region.name = region_schema.name
-    db_region.updated_at = now()
+    index_rows(
+        db=db,
+        table=SeaRegionModel.__tablename__,
+        rows=[(region_id, region_schema.name)],
+    )
     db.commit()
-    db.refresh(db_region)
-    return db_region
+    # everything SeaRegion returns is already known, so nothing is read back
+    return {"id": region_id, "name": region_schema.name}
+
+
+def delete_sea_region(region_id: str, db: Session, cascade: bool = False):
+    if cascade:
+        return _delete_subtree(region_id=region_id, db=db)
+    if not soft_delete_row(db, SeaRegionModel, region_id, child_key=SUBTREE[0]):
+        if not is_live(db, SeaRegionModel, region_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Sea-region is Not Found"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Sea_region has country"
+        )
+    name = db.query(SeaRegionModel.name).filter(SeaRegionModel.id == region_id).scalar()
+    unindex_rows(db=db, table=SeaRegionModel.__tablename__, ids=[region_id])
+    db.commit()
+    return f"{name} is deleted successfully"
 
 
-def delete_sea_region(region_id: str, db: Session):
-    db_region = get_region_by_id(region_id=region_id, db=db)
+def _delete_subtree(region_id: str, db: Session):
+    db_region = (
+        db.query(SeaRegionModel.name)
+        .filter(SeaRegionModel.id == region_id, SeaRegionModel.is_deleted == False)
+        .first()
+    )
     if db_region is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Sea-region is Not Found"
         )
-    count = (
-        db.query(CountryModel.id)
-        .filter(
-            CountryModel.sea_region_id == region_id, CountryModel.is_deleted == False
-        )
-        .count()
+    soft_delete_subtree(
+        db=db, model=SeaRegionModel, ids=[region_id], child_keys=SUBTREE
     )
-    if count > 0:
+    db.commit()
+    return f"{db_region.name} is deleted successfully"
+
+
+def delete_sea_regions(
+    region_ids: List[str], cascade: bool, all_or_nothing: bool, db: Session
+):
+    deleted, missing, blocked = soft_delete_rows(
+        db=db, model=SeaRegionModel, ids=region_ids, child_keys=SUBTREE, cascade=cascade
+    )
+    errors = [{"id": id, "detail": "Sea-region is Not Found"} for id in missing]
+    errors += [{"id": id, "detail": "Sea_region has country"} for id in blocked]
+    if errors and all_or_nothing:
+        db.rollback()
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN, detail="Sea_region has country"
+            status_code=(
+                status.HTTP_403_FORBIDDEN if blocked else status.HTTP_404_NOT_FOUND
+            ),
+            detail=errors,
         )
-    db_region.is_deleted = True
-    db_region.updated_at = now()
     db.commit()
-    db.refresh(db_region)
-    return f"{db_region.name} is deleted successfully"
+    return {"deleted": deleted, "errors": errors}
@@ -1,49 +1,134 @@
+from typing import Any, List, Optional
+
 from fastapi import HTTPException, status
-from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
-from libs.utils import generate_id, now
-from models import CityModel, CountryModel, StateModel
-from routers.admin.v1.schemas import StateAdd
+from libs import ancestors
+from libs.bulk import bulk_insert, parse_rows
+from libs.cache import cached_read
+from libs.pagination import paginate
+from libs.search import index_rows, search_filter, unindex_rows
+from libs.utils import generate_id, joined_parents, load_fields
+from libs.writes import (
+    insert_row,
+    is_live,
+    live,
+    soft_delete_row,
+    soft_delete_rows,
+    soft_delete_subtree,
+    update_row,
+)
+from models import CityModel, CountryModel, SeaRegionModel, StateModel
+from routers.admin.v1.schemas import State, StateAdd, expanded, shaped
+
+# State -> Country -> SeaRegion are many-to-one, so a single joined load
+# pulls the whole ancestor chain (or the part ``expand`` asks for) in the
+# same SELECT.
+STATE_EXPAND = "country.sea_region"
+READ_TABLES = (
+    StateModel.__tablename__,
+    CountryModel.__tablename__,
+    SeaRegionModel.__tablename__,
+)
+
+# cascade=true soft-deletes down through these foreign keys
+SUBTREE = (CityModel.state_id,)
 
 
 def add_state(state_schema: StateAdd, db: Session):
     id = generate_id()
-    db_state = StateModel(
-        id=id, name=state_schema.name, country_id=state_schema.country_id
-    )
-    db_country = (
-        db.query(CountryModel)
-        .filter(
-            CountryModel.id == state_schema.country_id, CountryModel.is_deleted == False
-        )
-        .first()
+    db_state = insert_row(
+        db=db,
+        model=StateModel,
+        values={
+            "id": id,
+            "name": state_schema.name,
+            "country_id": state_schema.country_id,
+        },
+        parent=CountryModel,
+        parent_id=state_schema.country_id,
+        inherit=ancestors.INHERITED[StateModel],
     )
-    if db_country is None:
+    if db_state is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Country is not found"
         )
-    db.add(db_state)
+    index_rows(
+        db=db,
+        table=StateModel.__tablename__,
+        rows=[(id, state_schema.name)],
+        replace=False,
+    )
     db.commit()
-    db.refresh(db_state)
     return db_state
 
 
-def get_state_by_id(state_id: str, db: Session):
+def add_states(items: List[Any], all_or_nothing: bool, db: Session):
+    state_schemas, errors = parse_rows(StateAdd, items)
+    invalid = bool(errors)
+    parents = ancestors.live_parents(
+        db=db,
+        model=StateModel,
+        parent=CountryModel,
+        ids=[state_schema.country_id for _, state_schema in state_schemas],
+    )
+    rows, created = [], []
+    for index, state_schema in state_schemas:
+        if state_schema.country_id not in parents:
+            errors.append({"index": index, "detail": "Country is not found"})
+            continue
+        id = generate_id()
+        rows.append(
+            {
+                "id": id,
+                "name": state_schema.name,
+                "country_id": state_schema.country_id,
+                **parents[state_schema.country_id],
+            }
+        )
+        created.append({"index": index, "id": id})
+    errors.sort(key=lambda error: error["index"])
+    if errors and all_or_nothing:
+        raise HTTPException(
+            status_code=(
+                status.HTTP_422_UNPROCESSABLE_ENTITY
+                if invalid
+                else status.HTTP_404_NOT_FOUND
+            ),
+            detail=errors,
+        )
+    bulk_insert(db=db, model=StateModel, rows=rows)
+    index_rows(
+        db=db,
+        table=StateModel.__tablename__,
+        rows=[(row["id"], row["name"]) for row in rows],
+        replace=False,
+    )
+    db.commit()
+    return {"created": created, "errors": errors}
+
+
+def get_state_by_id(state_id: str, db: Session, expand: str = STATE_EXPAND):
     return (
         db.query(StateModel)
+        .options(*joined_parents(StateModel, expand))
         .filter(StateModel.id == state_id, StateModel.is_deleted == False)
         .first()
     )
 
 
-def get_state(state_id: str, db: Session):
-    query = get_state_by_id(state_id=state_id, db=db)
-    if query is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="State not found"
-        )
-    return query
+def get_state(state_id: str, db: Session, expand: str = STATE_EXPAND):
+    def load():
+        query = get_state_by_id(state_id=state_id, db=db, expand=expand)
+        if query is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="State not found"
+            )
+        return expanded(State, expand).from_orm(query).dict()
+
+    return cached_read(
+        db=db, tables=READ_TABLES, key=("id", state_id, expand), load=load
+    )
 
 
 def get_state_list(
@@ -54,35 +139,51 @@ def get_state_list(
     search: str,
     country_id: str,
     db: Session,
+    cursor: Optional[str] = None,
+    count_mode: str = "exact",
+    expand: str = STATE_EXPAND,
+    fields: Optional[tuple] = None,
+    sea_region_id: str = "all",
 ):
-    query = db.query(StateModel).filter(StateModel.is_deleted == False)
+    query = (
+        db.query(StateModel)
+        .options(*load_fields(StateModel, expand, fields))
+        .filter(StateModel.is_deleted == False)
+    )
 
     if country_id != "all":
         query = query.filter(
             StateModel.country_id == country_id, StateModel.is_deleted == False
         )
 
-    if search != "all":
-        text = f"""%{search}%"""
-        query = query.filter(or_(StateModel.name.like(text)))
+    if sea_region_id != "all":
+        query = query.filter(StateModel.sea_region_id == sea_region_id)
 
-    if sort_by == "name":
-        if order == "desc":
-            query = query.order_by(StateModel.name.desc())
-        else:
-            query = query.order_by(StateModel.name)
-
-    else:
-        query = query.order_by(StateModel.updated_at.desc())
+    if search != "all":
+        query = search_filter(query=query, model=StateModel, search=search)
 
-    results = query.offset(start).limit(limit).all()
-    count = query.count()
-    data = {"count": count, "list": results}
+    data = paginate(
+        query=query,
+        model=StateModel,
+        start=start,
+        limit=limit,
+        sort_by=sort_by,
+        order=order,
+        cursor=cursor,
+        count_mode=count_mode,
+        search=None if search == "all" else search,
+    )
     return data
 
 
-def get_all_state(country_id: str, db: Session):
-    query = db.query(StateModel)
+def get_all_state_query(
+    country_id: str,
+    db: Session,
+    expand: str = STATE_EXPAND,
+    fields: Optional[tuple] = None,
+    sea_region_id: str = "all",
+):
+    query = db.query(StateModel).options(*load_fields(StateModel, expand, fields))
 
     if country_id != "all":
         query = query.filter(
@@ -90,52 +191,113 @@ def get_all_state(country_id: str, db: Session):
         )
     else:
         query = query.filter(StateModel.is_deleted == False)
-    db_state = query.order_by(StateModel.created_at.desc()).all()
-    return db_state
+    if sea_region_id != "all":
+        query = query.filter(StateModel.sea_region_id == sea_region_id)
+    return query.order_by(StateModel.created_at.desc())
+
+
+def get_all_state(
+    country_id: str,
+    db: Session,
+    expand: str = STATE_EXPAND,
+    fields: Optional[tuple] = None,
+    sea_region_id: str = "all",
+):
+    def load():
+        db_state = get_all_state_query(
+            country_id=country_id,
+            db=db,
+            expand=expand,
+            fields=fields,
+            sea_region_id=sea_region_id,
+        )
+        schema = shaped(State, expand, fields)
+        return [schema.from_orm(row).dict() for row in db_state]
+
+    return cached_read(
+        db=db,
+        tables=READ_TABLES,
+        key=("all", country_id, sea_region_id, expand, fields),
+        load=load,
+    )
 
 
 def update_state(state_schema: StateAdd, state_id: str, db: Session):
-    db_state = get_state_by_id(state_id=state_id, db=db)
-    if db_state is None:
+    updated = update_row(
+        db,
+        StateModel,
+        state_id,
+        {
+            "name": state_schema.name,
+            "country_id": state_schema.country_id,
+            **ancestors.inherited_values(StateModel, state_schema.country_id),
+        },
+        live(CountryModel, state_schema.country_id),
+    )
+    if not updated:
+        if not is_live(db, StateModel, state_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="State is not found"
+            )
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="State is not found"
-        )
-    db_country = (
-        db.query(CountryModel)
-        .filter(
-            CountryModel.id == state_schema.country_id, CountryModel.is_deleted == False
+            status_code=status.HTTP_404_NOT_FOUND, detail="country is not found"
         )
-        .first()
+    ancestors.cascade(db=db, model=StateModel, id=state_id)
+    index_rows(
+        db=db, table=StateModel.__tablename__, rows=[(state_id, state_schema.name)]
     )
-    if db_country is None:
+    db.commit()
+    # the response nests the parents, which the request did not carry
+    return get_state_by_id(state_id=state_id, db=db)
+
+
+def delete_state(state_id: str, db: Session, cascade: bool = False):
+    if cascade:
+        return _delete_subtree(state_id=state_id, db=db)
+    if not soft_delete_row(db, StateModel, state_id, child_key=SUBTREE[0]):
+        if not is_live(db, StateModel, state_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="state is Not found"
+            )
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="country is not found"
+            status_code=status.HTTP_403_FORBIDDEN, detail="State has city"
         )
-    db_state.name = state_schema.name
-    db_state.country_id = state_schema.country_id
-    db_state.updated_at = now()
+    name = db.query(StateModel.name).filter(StateModel.id == state_id).scalar()
+    unindex_rows(db=db, table=StateModel.__tablename__, ids=[state_id])
     db.commit()
-    db.refresh(db_state)
-    return db_state
+    return f"{name} is deleted successfully"
 
 
-def delete_state(state_id: str, db: Session):
-    db_state = get_state_by_id(state_id=state_id, db=db)
+def _delete_subtree(state_id: str, db: Session):
+    db_state = (
+        db.query(StateModel.name)
+        .filter(StateModel.id == state_id, StateModel.is_deleted == False)
+        .first()
+    )
     if db_state is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="state is Not found"
         )
-    count = (
-        db.query(CityModel.id)
-        .filter(CityModel.state_id == state_id, CityModel.is_deleted == False)
-        .count()
+    soft_delete_subtree(db=db, model=StateModel, ids=[state_id], child_keys=SUBTREE)
+    db.commit()
+    return f"{db_state.name} is deleted successfully"
+
+
+def delete_states(
+    state_ids: List[str], cascade: bool, all_or_nothing: bool, db: Session
+):
+    deleted, missing, blocked = soft_delete_rows(
+        db=db, model=StateModel, ids=state_ids, child_keys=SUBTREE, cascade=cascade
     )
-    if count > 0:
+    errors = [{"id": id, "detail": "state is Not found"} for id in missing]
+    errors += [{"id": id, "detail": "State has city"} for id in blocked]
+    if errors and all_or_nothing:
+        db.rollback()
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN, detail="State has city"
+            status_code=(
+                status.HTTP_403_FORBIDDEN if blocked else status.HTTP_404_NOT_FOUND
+            ),
+            detail=errors,
         )
-    db_state.is_deleted = True
-    db_state.updated_at = now()
     db.commit()
-    db.refresh(db_state)
-    return f"{db_state.name} is deleted successfully"
+    return {"deleted": deleted, "errors": errors}
@@ -0,0 +1,166 @@
+from typing import Optional
+
+import orjson
+from fastapi import HTTPException, status
+from sqlalchemy import null
+from sqlalchemy.orm import Session
+
+from libs.cache import cached_read
+from libs.writes import is_live
+from models import CityModel, CountryModel, SeaRegionModel, StateModel
+
+READ_TABLES = (
+    SeaRegionModel.__tablename__,
+    CountryModel.__tablename__,
+    StateModel.__tablename__,
+    CityModel.__tablename__,
+)
+
+# (node type, model, parent column, children key), top down
+LEVELS = (
+    ("sea_region", SeaRegionModel, None, "countries"),
+    ("country", CountryModel, CountryModel.sea_region_id, "states"),
+    ("state", StateModel, StateModel.country_id, "cities"),
+    ("city", CityModel, CityModel.state_id, None),
+)
+NODE_TYPES = tuple(level[0] for level in LEVELS)
+NOT_FOUND = {
+    "sea_region": "Sea-Region is Not Found",
+    "country": "Country is not found",
+    "state": "State is not found",
+    "city": "City is not found",
+}
+
+
+def tree_levels(
+    db: Session,
+    root_type: Optional[str] = None,
+    root_id: Optional[str] = None,
+    depth: Optional[int] = None,
+):
+    """One ``(level, query)`` per level of the tree, top down.
+
+    The top level is the ``root_type`` row ``root_id``, or every sea region;
+    ``depth`` levels follow it (all of them by default). Each query selects
+    the ``id``, ``name`` and ``parent_id`` of the level's live rows, ordered
+    by parent and name. It picks the parents with a subquery on the level
+    above rather than a list of their ids, so a level of a million rows binds
+    no million parameters.
+    """
+    start = NODE_TYPES.index(root_type) if root_type else 0
+    stop = len(LEVELS) if depth is None else min(start + 1 + depth, len(LEVELS))
+    levels, parent_ids = [], None
+    for level in LEVELS[start:stop]:
+        _, model, parent, _ = level
+        if parent_ids is None:
+            query = db.query(model.id, model.name, null().label("parent_id"))
+            if root_id is not None:
+                query = query.filter(model.id == root_id)
+        else:
+            query = db.query(model.id, model.name, parent.label("parent_id")).filter(
+                parent.in_(parent_ids)
+            )
+        query = query.filter(model.is_deleted == False)
+        parent_ids = query.with_entities(model.id).statement
+        # by parent first, which the (is_deleted, parent, name) indexes serve
+        order = (model.name,) if parent is None else (parent, model.name)
+        levels.append((level, query.order_by(*order, model.id)))
+    return levels
+
+
+def get_tree(
+    db: Session,
+    root_type: Optional[str] = None,
+    root_id: Optional[str] = None,
+    depth: Optional[int] = None,
+):
+    """The nested tree under the root, or under every sea region.
+
+    Each level is fetched with one query and its rows are grouped under
+    their parents in memory. Nodes above the last level fetched carry their
+    children key, empty when they have no children.
+    """
+    levels = tree_levels(db=db, root_type=root_type, root_id=root_id, depth=depth)
+    top, parents, parent_key = [], None, None
+    for position, ((node_type, _, _, children_key), query) in enumerate(levels):
+        if position == len(levels) - 1:
+            children_key = None
+        nodes = {}
+        for id, name, parent_id in query:
+            node = nodes[id] = {"id": id, "name": name}
+            if children_key is not None:
+                node[children_key] = []
+            if parents is None:
+                top.append(node)
+            elif parent_id in parents:
+                parents[parent_id][parent_key].append(node)
+        if parents is None and root_id is not None and not top:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail=NOT_FOUND[node_type]
+            )
+        parents, parent_key = nodes, children_key
+    return top
+
+
+def get_tree_json(
+    db: Session,
+    root_type: Optional[str] = None,
+    root_id: Optional[str] = None,
+    depth: Optional[int] = None,
+):
+    """``get_tree`` encoded as JSON, through the read cache.
+
+    Encoding a large tree costs about as much as loading it, so the encoded
+    bytes are what is cached. Any write to one of the four tables drops them.
+    """
+
+    def load():
+        return orjson.dumps(
+            get_tree(db=db, root_type=root_type, root_id=root_id, depth=depth)
+        )
+
+    return cached_read(
+        db=db,
+        tables=READ_TABLES,
+        key=("tree", root_type, root_id, depth),
+        load=load,
+    )
+
+
+def check_root(db: Session, root_type: str, root_id: str):
+    model = LEVELS[NODE_TYPES.index(root_type)][1]
+    if not is_live(db, model, root_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=NOT_FOUND[root_type]
+        )
+
+
+def tree_records(
+    db: Session,
+    root_type: Optional[str] = None,
+    root_id: Optional[str] = None,
+    depth: Optional[int] = None,
+):
+    """``(query, record, columns)`` per level, for streaming the tree as flat
+    records (see ``stream_ndjson``).
+
+    Levels come top down, so every parent is sent before its children.
+    """
+
+    def record(node_type):
+        return lambda row: {
+            "type": node_type,
+            "id": row.id,
+            "name": row.name,
+            "parent_id": row.parent_id,
+        }
+
+    parts = []
+    levels = tree_levels(db=db, root_type=root_type, root_id=root_id, depth=depth)
+    for position, ((node_type, model, parent, _), query) in enumerate(levels):
+        # the order tree_levels gives each level
+        columns = [("name", model.name, False), ("id", model.id, False)]
+        if position:
+            columns.insert(0, ("parent_id", parent, False))
+        parts.append((query, record(node_type), columns))
+    return parts
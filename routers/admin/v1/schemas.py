@@ -1,6 +1,7 @@
-from typing import List, Optional
+from functools import lru_cache
+from typing import List, Optional, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, create_model
 
 
 class SeaRegionAdd(BaseModel):
@@ -16,8 +17,10 @@ class SeaRegion(BaseModel):
 
 
 class SeaRegionList(BaseModel):
-    count: int
+    count: Optional[int]
+    has_more: bool
     list: List[SeaRegion]
+    next_cursor: Optional[str]
 
     class Config:
         orm_mode = True
@@ -38,8 +41,10 @@ class Country(BaseModel):
 
 
 class CountryList(BaseModel):
-    count: int
+    count: Optional[int]
+    has_more: bool
     list: List[Country]
+    next_cursor: Optional[str]
 
     class Config:
         orm_mode = True
@@ -60,8 +65,10 @@ class State(BaseModel):
 
 
 class StateList(BaseModel):
-    count: int
+    count: Optional[int]
+    has_more: bool
     list: List[State]
+    next_cursor: Optional[str]
 
     class Config:
         orm_mode = True
@@ -82,8 +89,180 @@ class City(BaseModel):
 
 
 class CityList(BaseModel):
-    count: int
+    count: Optional[int]
+    has_more: bool
     list: List[City]
+    next_cursor: Optional[str]
 
     class Config:
         orm_mode = True
+
+
+class BulkCreated(BaseModel):
+    index: int
+    id: str
+
+
+class BulkError(BaseModel):
+    index: int
+    detail: str
+
+
+class BulkResult(BaseModel):
+    created: List[BulkCreated]
+    errors: List[BulkError]
+
+
+class BulkDeleteError(BaseModel):
+    id: str
+    detail: str
+
+
+class BulkDeleteResult(BaseModel):
+    deleted: List[str]
+    errors: List[BulkDeleteError]
+
+
+# /tree nodes; the children key is left out on the last level fetched
+
+
+class CityNode(BaseModel):
+    id: str
+    name: str
+
+
+class StateNode(BaseModel):
+    id: str
+    name: str
+    cities: Optional[List[CityNode]]
+
+
+class CountryNode(BaseModel):
+    id: str
+    name: str
+    states: Optional[List[StateNode]]
+
+
+class SeaRegionNode(BaseModel):
+    id: str
+    name: str
+    countries: Optional[List[CountryNode]]
+
+
+class TreeRecord(BaseModel):
+    """One node of the streamed tree; parents come before their children."""
+
+    type: str
+    id: str
+    name: str
+    parent_id: Optional[str]
+
+
+# Response models for ``expand``: a City embeds its State, which embeds its
+# Country, which embeds its SeaRegion. A shorter ``expand`` path is served by
+# a generated copy of the schema in which the first parent off the path is
+# replaced by its ``<parent>_id``; the full path is the schema itself.
+
+
+def _parent(schema):
+    """``(field name, schema)`` of the parent embedded in ``schema``, if any."""
+    for name, field in schema.__fields__.items():
+        if isinstance(field.type_, type) and issubclass(field.type_, BaseModel):
+            return name, field.type_
+    return None, None
+
+
+def expand_paths(schema):
+    """Every ``expand`` value of ``schema``, from ``none`` to the full path."""
+    paths, path = ["none"], ""
+    name, parent = _parent(schema)
+    while parent is not None:
+        path = f"{path}.{name}" if path else name
+        paths.append(path)
+        name, parent = _parent(parent)
+    return paths
+
+
+@lru_cache(maxsize=None)
+def expanded(schema, expand: str):
+    if expand == expand_paths(schema)[-1]:
+        return schema
+    parent_name, parent = _parent(schema)
+    head, _, rest = expand.partition(".")
+    fields = {}
+    for name, annotation in schema.__annotations__.items():
+        if name != parent_name:
+            fields[name] = (annotation, ...)
+        elif head == parent_name:
+            fields[name] = (expanded(parent, rest or "none"), ...)
+        else:
+            fields[f"{name}_id"] = (str, ...)
+    if expand == "none":
+        suffix = "Ref"
+    else:
+        suffix = "".join(part.title().replace("_", "") for part in expand.split("."))
+    return create_model(
+        f"{schema.__name__}{suffix}",
+        __config__=schema.__config__,
+        __module__=__name__,
+        **fields,
+    )
+
+
+@lru_cache(maxsize=None)
+def trimmed(schema, fields: tuple):
+    """``schema`` with only its top-level ``fields``, for ``fields=``."""
+    unknown = set(fields) - set(schema.__fields__)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    kept = {
+        name: (annotation, ...)
+        for name, annotation in schema.__annotations__.items()
+        if name in fields
+    }
+    return create_model(
+        f"{schema.__name__}Fields",
+        __config__=schema.__config__,
+        __module__=__name__,
+        **kept,
+    )
+
+
+def shaped(schema, expand: str, fields: tuple = None):
+    """``schema`` nested as deep as ``expand``, trimmed to ``fields`` if given."""
+    schema = expanded(schema, expand)
+    return schema if fields is None else trimmed(schema, fields)
+
+
+@lru_cache(maxsize=None)
+def shaped_list(list_schema, schema, expand: str, fields: tuple = None):
+    """``list_schema`` (a page of ``schema``) with ``shaped`` items."""
+    item = shaped(schema, expand, fields)
+    if item is schema:
+        return list_schema
+    page = {
+        name: (annotation, ... if list_schema.__fields__[name].required else None)
+        for name, annotation in list_schema.__annotations__.items()
+    }
+    page["list"] = (List[item], ...)
+    return create_model(
+        f"{item.__name__}List",
+        __config__=list_schema.__config__,
+        __module__=__name__,
+        **page,
+    )
+
+
+def any_expansion(schema, list_schema=None):
+    """Union of every expansion of ``schema``, deepest first, for a route's
+    ``response_model``: each one requires the parent the next one drops, so
+    the first model that validates is the requested shape."""
+    models = [
+        (
+            expanded(schema, path)
+            if list_schema is None
+            else shaped_list(list_schema, schema, path)
+        )
+        for path in reversed(expand_paths(schema))
+    ]
+    return Union[tuple(models)]
@@ -0,0 +1,41 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from libs import cache, metrics, pool, replicas
+
+router = APIRouter()
+
+
+@router.get("/pool", tags=["ops"])
+def get_pool_stats():
+    """Live pool state and checkout timings (ms) of every engine."""
+    return pool.snapshot()
+
+
+@router.get("/cache", tags=["ops"])
+def get_cache_stats():
+    """Size and hit/miss/eviction counters of every in-process cache."""
+    return cache.stats()
+
+
+@router.get("/replicas", tags=["ops"])
+def get_replica_health():
+    """Last health check and replication lag (seconds) of every read replica."""
+    return replicas.snapshot()
+
+
+@router.get("/routes", tags=["ops"])
+def get_route_stats():
+    """Request count, rate, errors and p50/p95/p99 latency (ms) of every route."""
+    return metrics.snapshot()
+
+
+@router.get(
+    "/metrics",
+    tags=["ops"],
+    response_class=PlainTextResponse,
+    include_in_schema=False,
+)
+def get_metrics():
+    """Route latency, pool and cache stats for Prometheus to scrape."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
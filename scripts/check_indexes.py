@@ -0,0 +1,126 @@
+"""Check that the list queries are served by the composite indexes.
+
+Runs every ``get_*_list`` variant once, EXPLAINs the statements it issues
+and fails when the listed table is not read through the expected index::
+
+    python -m scripts.check_indexes [--url sqlite:///local.db]
+"""
+
+import argparse
+import sys
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import database
+from routers.admin.v1.crud import city, countries, sea_region, state
+
+ANY_ID = "00000000-0000-0000-0000-000000000000"
+
+LIST_FUNCTIONS = [
+    ("sea_regions", sea_region.get_region_list, {}),
+    ("countrys", countries.get_countries_list, {"sea_region_id": "all"}),
+    ("countrys", countries.get_countries_list, {"sea_region_id": ANY_ID}),
+    ("states", state.get_state_list, {"country_id": "all"}),
+    ("states", state.get_state_list, {"country_id": ANY_ID}),
+    ("states", state.get_state_list, {"country_id": "all", "sea_region_id": ANY_ID}),
+    ("citys", city.get_city_list, {"state_id": "all"}),
+    ("citys", city.get_city_list, {"state_id": ANY_ID}),
+    ("citys", city.get_city_list, {"state_id": "all", "country_id": ANY_ID}),
+    ("citys", city.get_city_list, {"state_id": "all", "sea_region_id": ANY_ID}),
+]
+
+# (table, filter column) -> the infix of the indexes leading with that column
+FILTER_INDEXES = {
+    ("countrys", "sea_region_id"): "parent_",
+    ("states", "country_id"): "parent_",
+    ("states", "sea_region_id"): "region_",
+    ("citys", "state_id"): "parent_",
+    ("citys", "country_id"): "country_",
+    ("citys", "sea_region_id"): "region_",
+}
+
+
+def expected_index(table: str, filters: dict, sort_by: str):
+    infix = next(
+        (
+            FILTER_INDEXES[table, key]
+            for key, value in filters.items()
+            if value != "all"
+        ),
+        "",
+    )
+    column = "name" if sort_by == "name" else "updated_at"
+    return f"ix_{table}_live_{infix}{column}"
+
+
+def used_indexes(connection, table: str, statement: str, parameters):
+    """Return the index names the database plans to read ``table`` with."""
+    if connection.dialect.name == "sqlite":
+        plan = connection.exec_driver_sql(
+            "EXPLAIN QUERY PLAN " + statement, parameters
+        ).all()
+        return {
+            detail.split(" INDEX ")[1].split(" ")[0]
+            for *_, detail in plan
+            if f" {table} " in f" {detail} " and " INDEX " in detail
+        }
+    plan = connection.exec_driver_sql("EXPLAIN " + statement, parameters).mappings()
+    return {row["key"] for row in plan if row["table"] == table and row["key"]}
+
+
+def check(engine):
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    failures = 0
+    for table, function, filters in LIST_FUNCTIONS:
+        for sort_by, order in (("name", "asc"), ("name", "desc"), ("all", "all")):
+            statements = []
+
+            def capture(conn, cursor, statement, parameters, context, executemany):
+                statements.append((statement, parameters))
+
+            event.listen(engine, "before_cursor_execute", capture)
+            db = Session()
+            try:
+                function(
+                    start=0,
+                    limit=10,
+                    sort_by=sort_by,
+                    order=order,
+                    search="all",
+                    db=db,
+                    **filters,
+                )
+            finally:
+                db.close()
+                event.remove(engine, "before_cursor_execute", capture)
+
+            expected = expected_index(table=table, filters=filters, sort_by=sort_by)
+            # the last statement is the page query, the one before it the count
+            statement, parameters = statements[-1]
+            with engine.connect() as connection:
+                used = used_indexes(connection, table, statement, parameters)
+            ok = expected in used
+            failures += not ok
+            parent = " ".join(
+                f"{key}={'all' if value == 'all' else '<id>'}"
+                for key, value in filters.items()
+            )
+            print(
+                f"{'ok  ' if ok else 'FAIL'} {function.__name__} {parent}"
+                f" sort_by={sort_by} order={order}:"
+                f" expected {expected}, used {', '.join(sorted(used)) or 'none'}"
+            )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="database URL, defaults to the app's")
+    args = parser.parse_args()
+    engine = create_engine(args.url) if args.url else database.engine
+    sys.exit(1 if check(engine) else 0)
+
+
+if __name__ == "__main__":
+    main()
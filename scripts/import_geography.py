@@ -0,0 +1,416 @@
+"""Synchronize the geography hierarchy from a CSV or JSON file.
+
+Every record is one path through the hierarchy; trailing levels may be left
+empty to describe a sea region, country or state without children::
+
+    sea_region,country,state,city[,sea_region_id,country_id,state_id,city_id]
+
+``.csv`` files are read with a header row, ``.ndjson``/``.jsonl`` files hold
+one JSON object per line and ``.json`` files a list of objects. Each level is
+matched by id when one is given, otherwise by name under its parent; new rows
+are inserted, renamed or re-parented rows updated and soft-deleted rows
+revived. With ``--delete-missing`` the file is treated as the full upstream
+snapshot and live rows it does not mention are soft-deleted afterwards.
+
+Writes are committed every ``--batch-size`` records together with a
+checkpoint file; ``--resume`` replays the committed part of the file without
+writing and carries on from there::
+
+    python -m scripts.import_geography geography.csv --delete-missing --resume
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+
+from pydantic import ValidationError
+from sqlalchemy import create_engine, or_, update
+from sqlalchemy.orm import Session, sessionmaker
+
+import database
+import libs.cache  # noqa: F401 (commits bump the shared cache versions)
+from libs import ancestors
+from libs.bulk import BATCH_SIZE, bulk_insert
+from libs.search import index_rows, unindex_rows
+from libs.utils import generate_id, now
+from models import CityModel, CountryModel, SeaRegionModel, StateModel
+from routers.admin.v1.schemas import CityAdd, CountryAdd, SeaRegionAdd, StateAdd
+
+logger = logging.getLogger(__name__)
+
+# (record key, model, parent column, add schema), top-down
+LEVELS = [
+    ("sea_region", SeaRegionModel, None, SeaRegionAdd),
+    ("country", CountryModel, "sea_region_id", CountryAdd),
+    ("state", StateModel, "country_id", StateAdd),
+    ("city", CityModel, "state_id", CityAdd),
+]
+
+
+class RecordError(Exception):
+    pass
+
+
+def read_records(path: str):
+    """Yield ``(record number, record dict)`` without loading the whole file."""
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline="", encoding="utf-8") as file:
+        if extension == ".csv":
+            yield from enumerate(csv.DictReader(file), start=1)
+        elif extension in (".ndjson", ".jsonl"):
+            number = 0
+            for line in file:
+                if line.strip():
+                    number += 1
+                    yield number, json.loads(line)
+        elif extension == ".json":
+            yield from enumerate(json.load(file), start=1)
+        else:
+            raise SystemExit(f"unsupported file type: {extension}")
+
+
+def _name_key(parent_id, name: str):
+    return parent_id, name.strip().lower()
+
+
+class Level:
+    """Known rows of one table, indexed by id and by (parent id, name)."""
+
+    def __init__(self, key: str, model, parent_column, schema):
+        self.key = key
+        self.model = model
+        self.parent_column = parent_column
+        self.schema = schema
+        self.by_id = {}
+        self.by_name = {}
+        self.seen = set()
+        self.inserts = []
+        self.updates = {}
+        # moved to another parent, their descendants' ancestor ids with them
+        self.reparented = set()
+
+    def remember(self, id: str, name: str, parent_id, is_deleted: bool):
+        self.by_id[id] = {
+            "name": name,
+            "parent_id": parent_id,
+            "is_deleted": is_deleted,
+        }
+        self.by_name[_name_key(parent_id, name)] = id
+
+    def load(self, rows):
+        for row in rows:
+            parent_id = getattr(row, self.parent_column) if self.parent_column else None
+            self.remember(row.id, row.name, parent_id, bool(row.is_deleted))
+
+    def columns(self):
+        columns = [self.model.id, self.model.name, self.model.is_deleted]
+        if self.parent_column:
+            columns.append(getattr(self.model, self.parent_column))
+        return columns
+
+    def validate(self, name: str, parent_id):
+        data = {"name": name}
+        if self.parent_column:
+            data[self.parent_column] = parent_id
+        try:
+            self.schema(**data)
+        except ValidationError as error:
+            raise RecordError(f"{self.key}: {error.errors()[0]['msg']}")
+
+    def resolve(self, id, name, parent_id):
+        """Return the id ``(id, name)`` refers to, queueing the needed writes."""
+        if not id:
+            if self.parent_column and parent_id is None:
+                raise RecordError(f"{self.key} without a parent")
+            id = self.by_name.get(_name_key(parent_id, name))
+        known = self.by_id.get(id) if id else None
+
+        if known is None:
+            if not name:
+                raise RecordError(f"{self.key} {id} does not exist")
+            if self.parent_column and parent_id is None:
+                raise RecordError(f"{self.key} without a parent")
+            self.validate(name, parent_id)
+            id = id or generate_id()
+            row = {"id": id, "name": name}
+            if self.parent_column:
+                row[self.parent_column] = parent_id
+            self.inserts.append(row)
+            self.remember(id, name, parent_id, False)
+        elif name:
+            if parent_id is None:
+                parent_id = known["parent_id"]
+            if (
+                known["name"] != name
+                or known["parent_id"] != parent_id
+                or known["is_deleted"]
+            ):
+                self.validate(name, parent_id)
+                change = {"id": id, "name": name, "is_deleted": False}
+                if self.parent_column:
+                    change[self.parent_column] = parent_id
+                self.updates[id] = change
+                if known["parent_id"] != parent_id:
+                    self.reparented.add(id)
+                self.by_name.pop(_name_key(known["parent_id"], known["name"]), None)
+                self.remember(id, name, parent_id, False)
+
+        self.seen.add(id)
+        return id
+
+
+class GeographyImport:
+    def __init__(
+        self,
+        db: Session,
+        batch_size: int = BATCH_SIZE,
+        delete_missing: bool = False,
+        checkpoint_path: str = None,
+    ):
+        self.db = db
+        self.batch_size = batch_size
+        self.delete_missing = delete_missing
+        self.checkpoint_path = checkpoint_path
+        self.levels = [Level(*level) for level in LEVELS]
+        self.cities = self.levels[-1]
+        self.pending_cities = []
+        self.stats = {"rows": 0, "inserted": 0, "updated": 0, "deleted": 0}
+        self.errors = 0
+        self.started = time.monotonic()
+
+    def load_parents(self):
+        # sea regions, countries and states are small enough to keep in
+        # memory; cities are looked up per batch in ``resolve_cities``
+        for level in self.levels[:-1]:
+            level.load(self.db.query(*level.columns()))
+
+    def add_record(self, number: int, record: dict):
+        parent_id = None
+        try:
+            for depth, level in enumerate(self.levels):
+                id = (record.get(f"{level.key}_id") or "").strip()
+                name = (record.get(level.key) or "").strip()
+                if not id and not name:
+                    for child in self.levels[depth + 1 :]:
+                        if record.get(child.key) or record.get(f"{child.key}_id"):
+                            raise RecordError(f"{child.key} without a {level.key}")
+                    break
+                if level is self.cities:
+                    self.pending_cities.append((number, id, name, parent_id))
+                else:
+                    parent_id = level.resolve(id, name, parent_id)
+        except RecordError as error:
+            self.errors += 1
+            logger.warning("record %s skipped: %s", number, error)
+
+    def resolve_cities(self):
+        if not self.pending_cities:
+            return
+        state_ids = {state_id for _, _, _, state_id in self.pending_cities}
+        ids = {id for _, id, _, _ in self.pending_cities if id}
+        cities = self.cities
+        cities.by_id, cities.by_name = {}, {}
+        cities.load(
+            self.db.query(*cities.columns()).filter(
+                or_(CityModel.state_id.in_(state_ids), CityModel.id.in_(ids))
+            )
+        )
+        for number, id, name, state_id in self.pending_cities:
+            try:
+                cities.resolve(id, name, state_id)
+            except RecordError as error:
+                self.errors += 1
+                logger.warning("record %s skipped: %s", number, error)
+        self.pending_cities = []
+
+    def flush(self, write: bool = True):
+        self.resolve_cities()
+        for level in self.levels:
+            if write:
+                self.write(level)
+            level.inserts, level.updates, level.reparented = [], {}, set()
+        if write:
+            self.db.commit()
+        else:
+            self.db.rollback()
+
+    def inherited(self, level: Level, parent_id):
+        """The ancestor ids above ``parent_id`` that ``level`` rows carry.
+
+        They are read from the parent levels in memory, which already hold
+        this batch's changes.
+        """
+        values = {}
+        depth = self.levels.index(level) - 1
+        while depth > 0 and parent_id is not None:
+            parent_id = self.levels[depth].by_id[parent_id]["parent_id"]
+            depth -= 1
+            values[f"{self.levels[depth].key}_id"] = parent_id
+        return values
+
+    def write(self, level: Level):
+        table = level.model.__tablename__
+        for row in (*level.inserts, *level.updates.values()):
+            if level.parent_column:
+                row.update(self.inherited(level, row[level.parent_column]))
+        if level.inserts:
+            bulk_insert(db=self.db, model=level.model, rows=level.inserts)
+            index_rows(
+                db=self.db,
+                table=table,
+                rows=[(row["id"], row["name"]) for row in level.inserts],
+                replace=False,
+            )
+            self.stats["inserted"] += len(level.inserts)
+        if level.updates:
+            changes = list(level.updates.values())
+            timestamp = now()
+            for change in changes:
+                change["updated_at"] = timestamp
+            self.db.bulk_update_mappings(level.model, changes)
+            index_rows(
+                db=self.db,
+                table=table,
+                rows=[(change["id"], change["name"]) for change in changes],
+            )
+            self.stats["updated"] += len(changes)
+        # after the row's own update, which the cascade copies from
+        for id in level.reparented:
+            ancestors.cascade(db=self.db, model=level.model, id=id)
+
+    def soft_delete_missing(self):
+        for level in reversed(self.levels):
+            model = level.model
+            if level is self.cities:
+                seen = self.seen_cities
+            else:
+                seen = level.seen
+            # no "" to start from: with binary ids it would be bound as NULL
+            last_id = None
+            while True:
+                query = self.db.query(model.id).filter(model.is_deleted == False)
+                if last_id is not None:
+                    query = query.filter(model.id > last_id)
+                ids = [
+                    row.id for row in query.order_by(model.id).limit(self.batch_size)
+                ]
+                if not ids:
+                    break
+                last_id = ids[-1]
+                missing = [id for id in ids if id not in seen]
+                if missing:
+                    self.db.execute(
+                        update(model)
+                        .where(model.id.in_(missing))
+                        .values(is_deleted=True, updated_at=now()),
+                        execution_options={"synchronize_session": False},
+                    )
+                    unindex_rows(db=self.db, table=model.__tablename__, ids=missing)
+                    self.db.commit()
+                    self.stats["deleted"] += len(missing)
+                    self.report()
+
+    def report(self):
+        elapsed = time.monotonic() - self.started
+        logger.info(
+            "%(rows)s rows read, %(inserted)s inserted, %(updated)s updated,"
+            " %(deleted)s deleted, %(errors)s errors, %(rate).0f rows/s",
+            {**self.stats, "errors": self.errors, "rate": self.stats["rows"] / elapsed},
+        )
+
+    def save_checkpoint(self, path: str, rows: int):
+        if not self.checkpoint_path:
+            return
+        stat = os.stat(path)
+        with open(self.checkpoint_path, "w") as file:
+            json.dump(
+                {"size": stat.st_size, "mtime": stat.st_mtime, "rows": rows}, file
+            )
+
+    def load_checkpoint(self, path: str):
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return 0
+        with open(self.checkpoint_path) as file:
+            checkpoint = json.load(file)
+        stat = os.stat(path)
+        if (checkpoint["size"], checkpoint["mtime"]) != (stat.st_size, stat.st_mtime):
+            logger.warning("%s changed since the checkpoint, starting over", path)
+            return 0
+        return checkpoint["rows"]
+
+    def run(self, path: str, resume: bool = False):
+        committed = self.load_checkpoint(path) if resume else 0
+        if committed:
+            logger.info("resuming after record %s", committed)
+        self.load_parents()
+        # city ids are only needed for --delete-missing, the parent levels
+        # keep theirs in ``Level.seen``
+        self.seen_cities = set()
+
+        in_batch = 0
+        for number, record in read_records(path):
+            self.add_record(number, record)
+            self.stats["rows"] += 1
+            in_batch += 1
+            if in_batch >= self.batch_size:
+                self.end_batch(path, number, write=number > committed)
+                in_batch = 0
+        self.end_batch(path, self.stats["rows"], write=True)
+
+        if self.delete_missing:
+            self.soft_delete_missing()
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        self.report()
+        return self.stats
+
+    def end_batch(self, path: str, number: int, write: bool):
+        self.flush(write=write)
+        if self.delete_missing:
+            self.seen_cities.update(self.cities.seen)
+        self.cities.seen = set()
+        if write:
+            self.save_checkpoint(path, number)
+        self.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="CSV, NDJSON or JSON file to import")
+    parser.add_argument("--url", help="database URL, defaults to the app's")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument(
+        "--delete-missing",
+        action="store_true",
+        help="soft-delete live rows that are not in the file",
+    )
+    parser.add_argument(
+        "--resume", action="store_true", help="continue after the last checkpoint"
+    )
+    parser.add_argument(
+        "--checkpoint", help="checkpoint file, defaults to <path>.checkpoint"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    engine = create_engine(args.url) if args.url else database.engine
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        importer = GeographyImport(
+            db=db,
+            batch_size=args.batch_size,
+            delete_missing=args.delete_missing,
+            checkpoint_path=args.checkpoint or f"{args.path}.checkpoint",
+        )
+        importer.run(args.path, resume=args.resume)
+    finally:
+        db.close()
+    sys.exit(1 if importer.errors else 0)
+
+
+if __name__ == "__main__":
+    main()
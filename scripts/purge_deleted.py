@@ -0,0 +1,178 @@
+"""Archive or hard-delete soft-deleted rows past the retention period.
+
+Rows with ``is_deleted`` set and no update for ``--older-than-days`` are
+copied to the matching ``*_archive`` table and deleted (``--mode archive``),
+or only deleted (``--mode delete``). Tables are purged bottom-up, cities
+first, and a row is only purged once no row of the table below still points
+at it, so foreign keys hold throughout.
+
+Each batch of ``--batch-size`` rows is picked by primary key and committed on
+its own, so no lock is held for longer than one small batch. ``--pause``
+sleeps between batches to leave room for replication. ``--optimize`` rebuilds
+the purged tables afterwards so their files and indexes actually shrink::
+
+    python -m scripts.purge_deleted --older-than-days 90 --mode archive
+"""
+
+import argparse
+import logging
+import time
+from datetime import timedelta
+
+from sqlalchemy import create_engine, exists, insert, literal, select, text
+from sqlalchemy.orm import Session, sessionmaker
+
+import database
+import libs.cache  # noqa: F401 (commits bump the shared cache versions)
+from libs import config
+from libs.search import unindex_rows
+from libs.utils import now
+from models import (
+    CityArchiveModel,
+    CityModel,
+    CountryArchiveModel,
+    CountryModel,
+    SeaRegionArchiveModel,
+    SeaRegionModel,
+    StateArchiveModel,
+    StateModel,
+)
+
+logger = logging.getLogger(__name__)
+
+# (model, archive model, foreign key of the table below), bottom-up
+LEVELS = [
+    (CityModel, CityArchiveModel, None),
+    (StateModel, StateArchiveModel, CityModel.state_id),
+    (CountryModel, CountryArchiveModel, StateModel.country_id),
+    (SeaRegionModel, SeaRegionArchiveModel, CountryModel.sea_region_id),
+]
+
+
+def purgeable_ids(db: Session, model, child_key, cutoff, limit: int):
+    query = db.query(model.id).filter(
+        model.is_deleted == True, model.updated_at < cutoff
+    )
+    if child_key is not None:
+        # any child row, deleted or not, still holds a foreign key to it
+        query = query.filter(~exists().where(child_key == model.id))
+    return [row_id for row_id, in query.limit(limit)]
+
+
+def archive_rows(db: Session, model, archive, ids):
+    columns = [column.name for column in model.__table__.columns]
+    rows = select(
+        *(model.__table__.c[name] for name in columns),
+        literal(now(), type_=archive.__table__.c.archived_at.type),
+    ).where(model.id.in_(ids))
+    db.execute(insert(archive).from_select([*columns, "archived_at"], rows))
+
+
+def purge_table(
+    db: Session, model, archive, child_key, cutoff, batch_size: int, pause: float
+):
+    """Purge ``model`` batch by batch; returns the number of rows purged."""
+    purged = 0
+    while True:
+        ids = purgeable_ids(db, model, child_key, cutoff, batch_size)
+        if not ids:
+            return purged
+        if archive is not None:
+            archive_rows(db, model, archive, ids)
+        # soft deletes unindex already; this catches rows deleted before that
+        unindex_rows(db=db, table=model.__tablename__, ids=ids)
+        db.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        purged += len(ids)
+        if len(ids) < batch_size:
+            return purged
+        if pause:
+            time.sleep(pause)
+
+
+def optimize(db: Session, tables):
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        for table in tables:
+            db.execute(text(f"OPTIMIZE TABLE {table}"))
+    elif dialect == "sqlite":
+        db.commit()
+        db.connection().exec_driver_sql("VACUUM")
+    db.commit()
+
+
+def run(db: Session, days: float, mode: str, batch_size: int, pause: float = 0):
+    cutoff = now() - timedelta(days=days)
+    report = []
+    for model, archive, child_key in LEVELS:
+        started = time.perf_counter()
+        purged = purge_table(
+            db=db,
+            model=model,
+            archive=archive if mode == "archive" else None,
+            child_key=child_key,
+            cutoff=cutoff,
+            batch_size=batch_size,
+            pause=pause,
+        )
+        elapsed = time.perf_counter() - started
+        rate = purged / elapsed if elapsed else 0
+        logger.info(
+            "%s: %d rows %sd in %.1fs (%.0f rows/s)",
+            model.__tablename__,
+            purged,
+            mode,
+            elapsed,
+            rate,
+        )
+        report.append((model.__tablename__, purged, elapsed))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="database URL, defaults to the app's")
+    parser.add_argument(
+        "--older-than-days", type=float, default=config.PURGE_RETENTION_DAYS
+    )
+    parser.add_argument(
+        "--mode", choices=("archive", "delete"), default=config.PURGE_MODE
+    )
+    parser.add_argument("--batch-size", type=int, default=config.PURGE_BATCH_SIZE)
+    parser.add_argument(
+        "--pause", type=float, default=0, help="seconds to sleep between batches"
+    )
+    parser.add_argument(
+        "--optimize",
+        action="store_true",
+        help="rebuild the purged tables to give the space back",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    engine = create_engine(args.url) if args.url else database.engine
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        report = run(
+            db=db,
+            days=args.older_than_days,
+            mode=args.mode,
+            batch_size=args.batch_size,
+            pause=args.pause,
+        )
+        purged = sum(rows for _, rows, _ in report)
+        elapsed = sum(seconds for _, _, seconds in report)
+        logger.info(
+            "total: %d rows in %.1fs (%.0f rows/s)",
+            purged,
+            elapsed,
+            purged / elapsed if elapsed else 0,
+        )
+        if args.optimize and purged:
+            optimize(db, [table for table, rows, _ in report if rows])
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
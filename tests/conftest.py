@@ -0,0 +1,91 @@
+"""Fixtures running the app against a scratch SQLite database.
+
+The settings are read from the environment when ``libs.config`` is first
+imported, so they are set here before anything from the app is.
+"""
+
+import os
+import re
+import sys
+import tempfile
+
+DIRECTORY = tempfile.mkdtemp(prefix="master-crud-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{DIRECTORY}/primary.db"
+os.environ["DATABASE_MODE"] = "sync"
+os.environ["REPLICA_URLS"] = ""
+os.environ["QUERY_BUDGET"] = "raise"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+import database  # noqa: E402
+import main  # noqa: E402
+import models  # noqa: E402
+from benchmarks import dataset  # noqa: E402
+from libs import cache  # noqa: E402
+
+STATEMENTS = re.compile(r'desc="(\d+) statements')
+
+
+def clear_caches():
+    for table_cache in cache.caches.values():
+        table_cache.clear()
+
+
+def reset_database():
+    """Recreate the tables empty and drop everything cached from them."""
+    models.Base.metadata.drop_all(database.engine)
+    models.Base.metadata.create_all(database.engine)
+    clear_caches()
+
+
+@pytest.fixture(autouse=True)
+def empty_database():
+    reset_database()
+
+
+@pytest.fixture
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture
+def db():
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def seed(db):
+    """Seed a ``benchmarks.dataset.Dataset`` of the given sizes and return it."""
+
+    def seed(**sizes):
+        data = dataset.Dataset(**sizes)
+        dataset.seed(db, data, batch_size=1000)
+        return data
+
+    return seed
+
+
+@pytest.fixture
+def sql():
+    """The SQL statements run on the primary while the test holds it."""
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append(statement)
+
+    event.listen(database.engine, "before_cursor_execute", capture)
+    yield captured
+    event.remove(database.engine, "before_cursor_execute", capture)
+
+
+def statements(response):
+    """SQL statements the request issued, from its ``Server-Timing`` header."""
+    return int(STATEMENTS.search(response.headers["server-timing"]).group(1))
@@ -0,0 +1,49 @@
+import logging
+
+import pytest
+
+from libs import config
+from libs.instrumentation import QueryBudgetExceeded
+from routers.admin.v1 import api
+from tests.conftest import statements
+
+
+@pytest.fixture
+def over_budget(monkeypatch, client, seed):
+    """``GET /city/{id}`` with its budget one statement short of its count."""
+    data = seed(regions=1, countries=1, states=1, cities=2)
+    path = f"/city/{data.id('city', 0)}"
+    budget = statements(client.get(path)) - 1
+    monkeypatch.setattr(api.get_city, "query_budget", budget)
+    return path
+
+
+def test_over_budget_raises_in_raise_mode(monkeypatch, client, over_budget):
+    monkeypatch.setattr(config, "QUERY_BUDGET", "raise")
+    with pytest.raises(Exception) as raised:
+        client.get(over_budget)
+    error = raised.value
+    # newer anyio versions wrap errors from the middleware in exception groups
+    while hasattr(error, "exceptions"):
+        error = error.exceptions[0]
+    assert isinstance(error, QueryBudgetExceeded)
+    assert "over its budget" in str(error)
+
+
+def test_over_budget_only_logs_in_warn_mode(monkeypatch, client, over_budget, caplog):
+    monkeypatch.setattr(config, "QUERY_BUDGET", "warn")
+    with caplog.at_level(logging.WARNING, logger="sql.requests"):
+        response = client.get(over_budget)
+    assert response.status_code == 200
+    assert [record.getMessage() for record in caplog.records] == [
+        f"GET /city/{{city_id}} issued {api.get_city.query_budget + 1} SQL"
+        f" statements, over its budget of {api.get_city.query_budget}"
+    ]
+
+
+def test_over_budget_is_ignored_when_off(monkeypatch, client, over_budget, caplog):
+    monkeypatch.setattr(config, "QUERY_BUDGET", "off")
+    with caplog.at_level(logging.WARNING, logger="sql.requests"):
+        response = client.get(over_budget)
+    assert response.status_code == 200
+    assert not caplog.records
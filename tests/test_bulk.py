@@ -0,0 +1,83 @@
+from models import CityModel, CountryModel, SeaRegionModel
+
+
+def test_malformed_items_are_reported_without_rejecting_the_rest(client, db, seed):
+    data = seed(regions=1, countries=1, states=2, cities=0)
+    state_id = data.id("state", 0)
+    response = client.post(
+        "/city/bulk",
+        json=[
+            {"name": "Brest", "state_id": state_id},
+            {"name": "B", "state_id": state_id},
+            "not an object",
+            {"name": "Caen", "state_id": data.id("country", 0)},
+            {"name": "Nantes", "state_id": data.id("state", 1)},
+        ],
+    )
+    assert response.status_code == 201, response.text
+    result = response.json()
+    assert [created["index"] for created in result["created"]] == [0, 4]
+    errors = {error["index"]: error["detail"] for error in result["errors"]}
+    assert sorted(errors) == [1, 2, 3]
+    assert errors[1].startswith("name:")
+    assert errors[3] == "state is not found"
+    names = {name for name, in db.query(CityModel.name)}
+    assert names == {"Brest", "Nantes"}
+
+
+def test_all_or_nothing_rejects_the_batch_over_one_malformed_item(client, db, seed):
+    data = seed(regions=1, countries=1, states=1, cities=0)
+    response = client.post(
+        "/city/bulk",
+        params={"all_or_nothing": True},
+        json=[{"name": "Brest", "state_id": data.id("state", 0)}, {"name": "B"}],
+    )
+    assert response.status_code == 422
+    assert [error["index"] for error in response.json()["detail"]] == [1]
+    assert db.query(CityModel).count() == 0
+
+
+def test_bulk_sea_regions_report_malformed_items(client):
+    response = client.post("/sea_region/bulk", json=[{"name": "Atlantic"}, {}])
+    assert response.status_code == 201
+    result = response.json()
+    assert [created["index"] for created in result["created"]] == [0]
+    assert [error["index"] for error in result["errors"]] == [1]
+
+
+def test_bulk_sea_regions_all_or_nothing(client, db):
+    response = client.post(
+        "/sea_region/bulk",
+        params={"all_or_nothing": True},
+        json=[{"name": "Atlantic"}, {"name": "A"}],
+    )
+    assert response.status_code == 422
+    assert [error["index"] for error in response.json()["detail"]] == [1]
+    assert db.query(SeaRegionModel).count() == 0
+
+
+def test_bulk_countries_check_their_sea_regions(client, db, seed):
+    data = seed(regions=1, countries=0, states=0, cities=0)
+    response = client.post(
+        "/countries/bulk",
+        json=[
+            {"name": "France", "sea_region_id": data.id("sea_region", 0)},
+            {"name": "Spain", "sea_region_id": data.id("sea_region", 1)},
+        ],
+    )
+    assert response.status_code == 201, response.text
+    result = response.json()
+    assert [created["index"] for created in result["created"]] == [0]
+    assert result["errors"] == [{"index": 1, "detail": "Sea-Region is Not Found"}]
+    country = db.get(CountryModel, result["created"][0]["id"])
+    assert country.sea_region_id == data.id("sea_region", 0)
+
+
+def test_bulk_rows_inherit_their_ancestors(client, db, seed):
+    data = seed(regions=2, countries=2, states=2, cities=0)
+    response = client.post(
+        "/city/bulk", json=[{"name": "Brest", "state_id": data.id("state", 1)}]
+    )
+    city = db.get(CityModel, response.json()["created"][0]["id"])
+    assert city.country_id == data.id("country", 1)
+    assert city.sea_region_id == data.id("sea_region", 1)
@@ -0,0 +1,62 @@
+def test_detail_validators_read_the_row_not_the_tables(client, seed, sql):
+    data = seed(regions=1, countries=1, states=2, cities=20)
+    sql.clear()
+    response = client.get(f"/city/{data.id('city', 0)}")
+    assert response.status_code == 200
+    assert "count(" not in " ".join(sql).lower()
+    assert "max(" not in " ".join(sql).lower()
+    sql.clear()
+    etag = response.headers["etag"]
+    response = client.get(
+        f"/city/{data.id('city', 0)}", headers={"if-none-match": etag}
+    )
+    assert response.status_code == 304
+    # the validator query alone answers the revalidation
+    assert len(sql) == 1 and "WHERE citys.id = ?" in sql[0]
+
+
+def test_detail_etag_follows_the_row_and_its_ancestors(client, seed):
+    data = seed(regions=1, countries=1, states=2, cities=20)
+    city_id, state_id = data.id("city", 0), data.id("state", 0)
+
+    def etag():
+        return client.get(f"/city/{city_id}").headers["etag"]
+
+    first = etag()
+    # another city of the same table leaves this one's ETag alone
+    client.put(
+        f"/city/{data.id('city', 1)}", json={"name": "Brest", "state_id": state_id}
+    )
+    assert etag() == first
+    client.put(
+        f"/state/{state_id}",
+        json={"name": "Bretagne", "country_id": data.id("country", 0)},
+    )
+    renamed = etag()
+    assert renamed != first
+    client.put(f"/city/{city_id}", json={"name": "Quimper", "state_id": state_id})
+    assert etag() != renamed
+
+
+def test_deleted_rows_have_no_validators(client, seed):
+    data = seed(regions=1, countries=1, states=1, cities=2)
+    city_id = data.id("city", 0)
+    client.delete(f"/city/{city_id}")
+    response = client.get(f"/city/{city_id}")
+    assert response.status_code == 404
+    assert "etag" not in response.headers
+
+
+def test_list_validators_read_the_write_counters(client, seed, sql):
+    data = seed(regions=1, countries=1, states=1, cities=20)
+    sql.clear()
+    response = client.get("/city")
+    etag, last_modified = response.headers["etag"], response.headers["last-modified"]
+    assert "cache_versions" in sql[0]
+    assert client.get("/city", headers={"if-none-match": etag}).status_code == 304
+    assert (
+        client.get("/city", headers={"if-modified-since": last_modified}).status_code
+        == 304
+    )
+    client.post("/city", json={"name": "Brest", "state_id": data.id("state", 0)})
+    assert client.get("/city", headers={"if-none-match": etag}).status_code == 200
@@ -0,0 +1,48 @@
+import pytest
+
+from routers.admin.v1.schemas import City, expand_paths
+
+
+@pytest.fixture
+def city_paths(seed):
+    data = seed(regions=1, countries=1, states=1, cities=3)
+    city_id = data.id("city", 0)
+    return {
+        f"/city/{city_id}": lambda body: body,
+        "/city": lambda body: next(c for c in body["list"] if c["id"] == city_id),
+        "/city/all/": lambda body: next(c for c in body if c["id"] == city_id),
+    }
+
+
+def depth(city):
+    """How many parents ``city`` embeds."""
+    levels, node = 0, city
+    for name in ("state", "country", "sea_region"):
+        if not isinstance(node.get(name), dict):
+            return levels
+        levels, node = levels + 1, node[name]
+    return levels
+
+
+@pytest.mark.parametrize("levels, expand", enumerate(expand_paths(City)))
+def test_expand_sets_the_nesting_depth(client, city_paths, sql, levels, expand):
+    for path, find in city_paths.items():
+        sql.clear()
+        response = client.get(path, params={"expand": expand})
+        assert response.status_code == 200, response.text
+        city = find(response.json())
+        assert depth(city) == levels
+        # the first parent left out is referenced by its id instead
+        node = city
+        for name in ("state", "country", "sea_region")[:levels]:
+            node = node[name]
+        if levels < 3:
+            parent = ("state", "country", "sea_region")[levels]
+            assert parent not in node and f"{parent}_id" in node
+        # and the route's query, which runs last, only joins those embedded
+        assert sql[-1].count("JOIN") == levels
+
+
+def test_unknown_expand_is_rejected(client, city_paths):
+    for path in city_paths:
+        assert client.get(path, params={"expand": "country"}).status_code == 422
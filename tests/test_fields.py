@@ -0,0 +1,43 @@
+import pytest
+
+PATHS = {
+    "/city": lambda body: body["list"],
+    "/city/all/": lambda body: body,
+}
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_fields_select_only_those_columns(client, seed, sql, path):
+    seed(regions=1, countries=1, states=1, cities=3)
+    sql.clear()
+    response = client.get(path, params={"fields": "id,name"})
+    assert response.status_code == 200, response.text
+    assert all(set(city) == {"id", "name"} for city in PATHS[path](response.json()))
+    # the route's query runs last; unrequested columns and parents stay out
+    assert "citys.state_id" not in sql[-1]
+    assert "JOIN" not in sql[-1]
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_fields_can_keep_an_expanded_parent(client, seed, path):
+    seed(regions=1, countries=1, states=1, cities=3)
+    response = client.get(path, params={"fields": "name,state", "expand": "state"})
+    assert response.status_code == 200, response.text
+    for city in PATHS[path](response.json()):
+        assert set(city) == {"name", "state"}
+        assert "country_id" in city["state"]
+
+
+@pytest.mark.parametrize("path", PATHS)
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"fields": "id,population"},
+        # the state is only referenced by id without expand=state
+        {"fields": "id,state", "expand": "none"},
+    ],
+)
+def test_unknown_fields_are_a_400(client, path, params):
+    response = client.get(path, params=params)
+    assert response.status_code == 400
+    assert "Unknown fields" in response.json()["detail"]
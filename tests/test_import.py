@@ -0,0 +1,68 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import models
+from libs import config
+from scripts.import_geography import GeographyImport
+
+HEADER = "sea_region,country,state,city\n"
+
+
+@pytest.fixture(params=["string", "binary"])
+def import_db(request, tmp_path, monkeypatch):
+    """A session on a database of its own, with ids stored as ``request.param``.
+
+    A new engine, so that the id column types are set up for that storage.
+    """
+    monkeypatch.setattr(config, "ID_STORAGE", request.param)
+    engine = create_engine(f"sqlite:///{tmp_path}/import.db")
+    models.Base.metadata.create_all(engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield db
+    db.close()
+    engine.dispose()
+
+
+def run_import(db, path, lines, **options):
+    path.write_text(HEADER + "".join(f"{line}\n" for line in lines))
+    importer = GeographyImport(db=db, batch_size=2, **options)
+    stats = importer.run(str(path))
+    assert importer.errors == 0
+    return stats
+
+
+def live_cities(db):
+    return {
+        city.name: city
+        for city in db.query(models.CityModel).filter(
+            models.CityModel.is_deleted == False
+        )
+    }
+
+
+def test_import_fills_the_hierarchy_and_its_ancestor_ids(import_db, tmp_path):
+    stats = run_import(
+        import_db,
+        tmp_path / "geography.csv",
+        ["Atlantic,France,Bretagne,Brest", "Atlantic,France,Bretagne,Quimper"],
+    )
+    assert stats["inserted"] == 5
+    brest = live_cities(import_db)["Brest"]
+    assert brest.country_id == brest.state.country_id
+    assert brest.sea_region_id == brest.state.country.sea_region_id
+
+
+def test_delete_missing_soft_deletes_what_the_file_leaves_out(import_db, tmp_path):
+    lines = [
+        "Atlantic,France,Bretagne,Brest",
+        "Atlantic,France,Bretagne,Quimper",
+        "Atlantic,France,Normandie,Caen",
+    ]
+    run_import(import_db, tmp_path / "first.csv", lines)
+    stats = run_import(
+        import_db, tmp_path / "second.csv", lines[:1], delete_missing=True
+    )
+    # two cities and the state left without any
+    assert stats["deleted"] == 3
+    assert set(live_cities(import_db)) == {"Brest"}
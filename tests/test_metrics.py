@@ -0,0 +1,66 @@
+import re
+
+SAMPLE = re.compile(r"^(\w+)(\{.*\})? (\S+)$")
+
+
+def scrape(client):
+    """``{(name, labels): value}`` of every sample ``/metrics`` exposes."""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = {}
+    for line in response.text.splitlines():
+        if line.startswith("#"):
+            continue
+        name, labels, value = SAMPLE.match(line).groups()
+        samples[name, labels or ""] = float(value)
+    return samples
+
+
+def route_count(samples, route, status):
+    labels = f'{{route="{route}",status="{status}"}}'
+    return samples.get(("http_request_duration_seconds_count", labels), 0)
+
+
+def test_metrics_count_requests_by_route_template_and_status(client, seed):
+    data = seed(regions=1, countries=1, states=1, cities=2)
+    before = scrape(client)
+    for index in (0, 1):
+        assert client.get(f"/city/{data.id('city', index)}").status_code == 200
+    assert client.get(f"/city/{data.id('state', 0)}").status_code == 404
+    after = scrape(client)
+
+    for status, requests in ((200, 2), (404, 1)):
+        assert (
+            route_count(after, "/city/{city_id}", status)
+            - route_count(before, "/city/{city_id}", status)
+            == requests
+        )
+
+
+def test_metrics_histograms_are_cumulative(client, seed):
+    data = seed(regions=1, countries=1, states=1, cities=1)
+    client.get(f"/city/{data.id('city', 0)}")
+    samples = scrape(client)
+    buckets = [
+        (labels, value)
+        for (name, labels), value in samples.items()
+        if name == "http_request_duration_seconds_bucket"
+        and 'route="/city/{city_id}",status="200"' in labels
+    ]
+    assert buckets
+    values = [value for _, value in buckets]
+    assert values == sorted(values)
+    assert buckets[-1][0].endswith('le="+Inf"}')
+    assert values[-1] == route_count(samples, "/city/{city_id}", 200)
+
+
+def test_metrics_include_pool_and_cache_series(client):
+    names = {name for name, _ in scrape(client)}
+    assert {
+        "http_requests_in_flight",
+        "db_pool_checkouts_total",
+        "db_pool_wait_seconds_count",
+        "cache_hits_total",
+        "cache_size",
+    } <= names
@@ -0,0 +1,63 @@
+import pytest
+
+from libs.pagination import MAX_LIMIT, paginate
+from models import CityModel
+from tests.conftest import statements
+
+
+@pytest.mark.parametrize("limit", [0, -1, MAX_LIMIT + 1])
+def test_list_routes_reject_limits_out_of_range(client, limit):
+    response = client.get("/city", params={"limit": limit})
+    assert response.status_code == 422
+
+
+def test_paginate_rejects_an_empty_page(db):
+    with pytest.raises(ValueError):
+        paginate(
+            query=db.query(CityModel),
+            model=CityModel,
+            start=0,
+            limit=0,
+            sort_by="name",
+            order="asc",
+        )
+
+
+def test_cursor_walks_every_page(client, seed):
+    seed(regions=1, countries=1, states=1, cities=25)
+    names, cursor = [], None
+    while True:
+        params = {"limit": 10, "sort_by": "name", "order": "asc", "count_mode": "skip"}
+        if cursor is not None:
+            params["cursor"] = cursor
+        page = client.get("/city", params=params).json()
+        names += [city["name"] for city in page["list"]]
+        cursor = page["next_cursor"]
+        assert page["has_more"] == (cursor is not None)
+        if cursor is None:
+            break
+    assert len(names) == 25
+
+
+def test_count_modes(client, seed):
+    data = seed(regions=1, countries=1, states=1, cities=12)
+
+    def get(count_mode):
+        response = client.get("/city", params={"count_mode": count_mode})
+        assert response.status_code == 200
+        return response.json()["count"], statements(response)
+
+    exact, exact_statements = get("exact")
+    assert exact == 12
+    skipped, skipped_statements = get("skip")
+    assert skipped is None
+    assert skipped_statements == exact_statements - 1
+
+    assert get("cached") == (12, exact_statements)
+    # the second request reuses the count
+    assert get("cached") == (12, exact_statements - 1)
+    response = client.post(
+        "/city", json={"name": "Brest", "state_id": data.id("state", 0)}
+    )
+    assert response.status_code == 201
+    assert get("cached") == (13, exact_statements)
@@ -0,0 +1,78 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import update
+
+from libs.utils import now
+from models import (
+    CityArchiveModel,
+    CityModel,
+    CountryArchiveModel,
+    CountryModel,
+    SeaRegionModel,
+    StateArchiveModel,
+    StateModel,
+)
+from scripts import purge_deleted
+
+MODELS = (CityModel, StateModel, CountryModel, SeaRegionModel)
+
+
+@pytest.fixture
+def deleted_country(client, seed, db):
+    """A country deleted with its subtree 100 days ago."""
+    data = seed(regions=1, countries=1, states=2, cities=4)
+    response = client.delete(
+        f"/countries/{data.id('country', 0)}", params={"cascade": True}
+    )
+    assert response.status_code == 200, response.text
+    for model in MODELS:
+        db.execute(
+            update(model)
+            .where(model.is_deleted == True)
+            .values(updated_at=now() - timedelta(days=100))
+        )
+    db.commit()
+    return data
+
+
+def counts(db, *models):
+    return [db.query(model).count() for model in models]
+
+
+def test_archive_moves_old_rows_bottom_up(db, deleted_country):
+    report = purge_deleted.run(db=db, days=90, mode="archive", batch_size=1)
+    assert [(table, rows) for table, rows, _ in report] == [
+        ("citys", 4),
+        ("states", 2),
+        ("countrys", 1),
+        ("sea_regions", 0),
+    ]
+    assert counts(db, *MODELS) == [0, 0, 0, 1]
+    archived = counts(db, CityArchiveModel, StateArchiveModel, CountryArchiveModel)
+    assert archived == [4, 2, 1]
+    city = db.query(CityArchiveModel).first()
+    assert city.archived_at is not None and city.state_id is not None
+
+
+def test_delete_mode_archives_nothing(db, deleted_country):
+    purge_deleted.run(db=db, days=90, mode="delete", batch_size=10)
+    assert counts(db, *MODELS) == [0, 0, 0, 1]
+    assert counts(db, CityArchiveModel, StateArchiveModel) == [0, 0]
+
+
+def test_parents_wait_for_their_children(db, deleted_country):
+    data = deleted_country
+    # one city was deleted recently, so its state must stay for now
+    db.execute(
+        update(CityModel)
+        .where(CityModel.id == data.id("city", 0))
+        .values(updated_at=now())
+    )
+    db.commit()
+    state_id = db.get(CityModel, data.id("city", 0)).state_id
+
+    purge_deleted.run(db=db, days=90, mode="archive", batch_size=10)
+    assert [city_id for city_id, in db.query(CityModel.id)] == [data.id("city", 0)]
+    assert [state for state, in db.query(StateModel.id)] == [state_id]
+    assert counts(db, CountryModel) == [1]
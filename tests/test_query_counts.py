@@ -0,0 +1,60 @@
+import pytest
+
+from benchmarks.dataset import Dataset
+from routers.admin.v1.schemas import City, Country, State, expand_paths
+from tests.conftest import clear_caches, reset_database, statements
+
+SMALL = {"regions": 2, "countries": 4, "states": 8, "cities": 40}
+LARGE = {level: count * 10 for level, count in SMALL.items()}
+
+# route prefix -> (dataset level, schema with expand=, filters on ancestors)
+LEVELS = {
+    "sea_region": ("sea_region", None, ()),
+    "countries": ("country", Country, ("sea_region",)),
+    "state": ("state", State, ("country", "sea_region")),
+    "city": ("city", City, ("state", "country", "sea_region")),
+}
+
+
+def reads(data: Dataset, prefix: str):
+    level, _, filters = LEVELS[prefix]
+    paths = {
+        f"/{prefix}": (f"/{prefix}", {}),
+        f"/{prefix}/all/": (f"/{prefix}/all/", {}),
+        f"/{prefix}/{{id}}": (f"/{prefix}/{data.id(level, 0)}", {}),
+    }
+    for parent in filters:
+        params = {f"{parent}_id": data.id(parent, 0)}
+        paths[f"/{prefix}?{parent}_id="] = (f"/{prefix}", params)
+        paths[f"/{prefix}/all/?{parent}_id="] = (f"/{prefix}/all/", params)
+    return paths
+
+
+def count_statements(client, data: Dataset, prefix: str, expand):
+    counts = {}
+    for name, (path, params) in reads(data, prefix).items():
+        # the read cache would answer the second dataset's requests without SQL
+        clear_caches()
+        if expand is not None:
+            params = {**params, "expand": expand}
+        response = client.get(path, params=params)
+        assert response.status_code == 200, response.text
+        counts[name] = statements(response)
+    return counts
+
+
+@pytest.mark.parametrize(
+    "prefix, expand",
+    [
+        (prefix, expand)
+        for prefix, (_, schema, _) in LEVELS.items()
+        for expand in (expand_paths(schema) if schema is not None else [None])
+    ],
+)
+def test_reads_issue_as_many_statements_at_ten_times_the_rows(
+    client, seed, prefix, expand
+):
+    small = count_statements(client, seed(**SMALL), prefix, expand)
+    reset_database()
+    large = count_statements(client, seed(**LARGE), prefix, expand)
+    assert small == large
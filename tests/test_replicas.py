@@ -0,0 +1,118 @@
+"""Read routing against a replica: a second SQLite database copied from the
+primary, which then lags behind it since nothing replicates the writes.
+"""
+
+import os
+import shutil
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import database
+import main
+from libs import replicas
+from libs.pool import engine_options
+
+PRIMARY = database.engine.url.database
+REPLICA = os.path.join(os.path.dirname(PRIMARY), "replica.db")
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    url = f"sqlite:///{REPLICA}"
+    engine = create_engine(url, **engine_options(url, name="replica0"))
+    replica = replicas.Replica(
+        name="replica0",
+        engine=engine,
+        session_factory=sessionmaker(
+            autocommit=False, autoflush=False, bind=engine, info={"replica": "replica0"}
+        ),
+    )
+    monkeypatch.setattr(replicas, "replicas", [replica])
+    yield replica
+    engine.dispose()
+
+
+@pytest.fixture
+def replicate(replica):
+    """Copy the primary to the replica, as replication catching up would."""
+
+    def replicate():
+        replica.engine.dispose()
+        shutil.copyfile(PRIMARY, REPLICA)
+
+    return replicate
+
+
+def rename(client, region_id, name):
+    response = client.put(f"/sea_region/{region_id}", json={"name": name})
+    assert response.status_code == 200
+    return response
+
+
+def region_name(client, region_id):
+    response = client.get(f"/sea_region/{region_id}")
+    assert response.status_code == 200
+    return response.json()["name"]
+
+
+def test_reads_go_to_the_replica_and_writes_to_the_primary(seed, replicate):
+    data = seed(regions=1, countries=0, states=0, cities=0)
+    replicate()
+    region_id = data.id("sea_region", 0)
+    writer, reader = TestClient(main.app), TestClient(main.app)
+
+    response = rename(writer, region_id, "Renamed")
+    assert response.cookies.get(replicas.STICKY_COOKIE) == "1"
+    # the writer reads the primary, the other client the lagging replica
+    assert region_name(writer, region_id) == "Renamed"
+    assert region_name(reader, region_id) == data.name("sea_region", 0)
+
+
+def test_reads_do_not_set_the_sticky_cookie(client, seed, replicate):
+    data = seed(regions=1, countries=0, states=0, cities=0)
+    replicate()
+    response = client.get(f"/sea_region/{data.id('sea_region', 0)}")
+    assert response.status_code == 200
+    assert replicas.STICKY_COOKIE not in response.cookies
+
+
+def test_writer_does_not_read_replica_values_from_the_cache(seed, replicate):
+    data = seed(regions=1, countries=0, states=0, cities=0)
+    replicate()
+    region_id = data.id("sea_region", 0)
+    writer, reader = TestClient(main.app), TestClient(main.app)
+
+    assert region_name(reader, region_id) == data.name("sea_region", 0)
+    rename(writer, region_id, "Renamed")
+    # cached from the replica after the write invalidated the table
+    assert region_name(reader, region_id) == data.name("sea_region", 0)
+    assert region_name(writer, region_id) == "Renamed"
+
+
+def test_writer_does_not_read_replica_counts_from_the_cache(seed, replicate):
+    seed(regions=3, countries=0, states=0, cities=0)
+    replicate()
+    writer, reader = TestClient(main.app), TestClient(main.app)
+
+    def count(client):
+        response = client.get("/sea_region", params={"count_mode": "cached"})
+        assert response.status_code == 200
+        return response.json()["count"]
+
+    assert count(reader) == 3
+    response = writer.post("/sea_region", json={"name": "Added"})
+    assert response.status_code == 201
+    assert count(reader) == 3
+    assert count(writer) == 4
+
+
+def test_unhealthy_replica_falls_back_to_the_primary(client, seed, replica):
+    data = seed(regions=1, countries=0, states=0, cities=0)
+    missing = os.path.join(os.path.dirname(PRIMARY), "missing", "replica.db")
+    replica.engine = create_engine(f"sqlite:///{missing}")
+    replicas.check(replica)
+    assert not replica.usable()
+    assert region_name(client, data.id("sea_region", 0)) == data.name("sea_region", 0)
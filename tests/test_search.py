@@ -0,0 +1,63 @@
+import pytest
+
+NAMES = [
+    "Paris",
+    "Parma",
+    "Sparta",
+    "Lyon",
+    "100% Town",
+    "100 Town",
+    "Ville_A",
+    "VilleXA",
+]
+
+
+@pytest.fixture
+def cities(client, seed):
+    data = seed(regions=1, countries=1, states=1, cities=0)
+    for name in NAMES:
+        response = client.post(
+            "/city", json={"name": name, "state_id": data.id("state", 0)}
+        )
+        assert response.status_code == 201
+
+
+def search(client, term, **params):
+    response = client.get("/city", params={"search": term, "limit": 100, **params})
+    assert response.status_code == 200, response.text
+    return [city["name"] for city in response.json()["list"]]
+
+
+@pytest.mark.parametrize(
+    "term, expected",
+    [
+        ("y", {"Lyon"}),
+        ("ar", {"Paris", "Parma", "Sparta"}),
+        ("Par", {"Paris", "Parma", "Sparta"}),
+        ("arm", {"Parma"}),
+        ("00 T", {"100 Town"}),
+        ("zzz", set()),
+    ],
+)
+def test_search_matches_substrings_of_any_length(client, cities, term, expected):
+    assert set(search(client, term)) == expected
+
+
+@pytest.mark.parametrize(
+    "term, expected",
+    [("0%", {"100% Town"}), ("e_A", {"Ville_A"}), ("%", {"100% Town"})],
+)
+def test_search_escapes_like_wildcards(client, cities, term, expected):
+    assert set(search(client, term)) == expected
+
+
+def test_relevance_puts_exact_then_prefix_matches_first(client, seed):
+    data = seed(regions=1, countries=1, states=1, cities=0)
+    for name in ["Cormeilles-en-Parisis", "Paris Nord", "Paris", "Aparis"]:
+        client.post("/city", json={"name": name, "state_id": data.id("state", 0)})
+    assert search(client, "paris", sort_by="relevance") == [
+        "Paris",
+        "Paris Nord",
+        "Aparis",
+        "Cormeilles-en-Parisis",
+    ]
@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+SIZES = {"regions": 2, "countries": 4, "states": 8, "cities": 16}
+CHILDREN = ("countries", "states", "cities")
+
+
+def walk(nodes, level=0, parent=None):
+    """``(level, node, parent id)`` of every node under ``nodes``, top down."""
+    for node in nodes:
+        yield level, node, parent
+        if level < len(CHILDREN):
+            yield from walk(node.get(CHILDREN[level], []), level + 1, node["id"])
+
+
+def parents(client, prefix, key):
+    rows = client.get(f"/{prefix}/all/", params={"expand": "none"}).json()
+    return {row["id"]: row[key] for row in rows}
+
+
+def test_tree_nests_every_live_row_under_its_parent(client, seed):
+    seed(**SIZES)
+    response = client.get("/tree")
+    assert response.status_code == 200
+    nodes = list(walk(response.json()))
+    assert [sum(1 for level, _, _ in nodes if level == n) for n in range(4)] == [
+        SIZES["regions"],
+        SIZES["countries"],
+        SIZES["states"],
+        SIZES["cities"],
+    ]
+    expected = {
+        **parents(client, "countries", "sea_region_id"),
+        **parents(client, "state", "country_id"),
+        **parents(client, "city", "state_id"),
+    }
+    assert {node["id"]: parent for _, node, parent in nodes if parent} == expected
+    # the last level carries no children key
+    assert all(set(node) == {"id", "name"} for level, node, _ in nodes if level == 3)
+
+
+@pytest.mark.parametrize("depth", [0, 1, 2])
+def test_depth_limits_the_levels_under_the_root(client, seed, depth):
+    data = seed(**SIZES)
+    response = client.get(
+        "/tree",
+        params={
+            "root_type": "country",
+            "root_id": data.id("country", 0),
+            "depth": depth,
+        },
+    )
+    assert response.status_code == 200
+    tree = response.json()
+    assert [node["id"] for node in tree] == [data.id("country", 0)]
+    levels = {level for level, _, _ in walk(tree, level=1)}
+    assert levels == set(range(1, depth + 2))
+    deepest = [node for level, node, _ in walk(tree, level=1) if level == depth + 1]
+    assert all(set(node) == {"id", "name"} for node in deepest)
+
+
+def test_ndjson_streams_parents_first(client, seed):
+    seed(**SIZES)
+    response = client.get("/tree", params={"format": "ndjson"})
+    assert response.status_code == 200
+    seen = set()
+    for line in response.text.splitlines():
+        record = json.loads(line)
+        assert record["parent_id"] is None or record["parent_id"] in seen
+        seen.add(record["id"])
+    assert len(seen) == sum(SIZES.values())
+
+
+@pytest.mark.parametrize("export_format", ["json", "ndjson"])
+def test_missing_root_is_a_404(client, seed, export_format):
+    data = seed(**SIZES)
+    response = client.get(
+        "/tree",
+        params={
+            "root_type": "state",
+            "root_id": data.id("city", 0),
+            "format": export_format,
+        },
+    )
+    assert response.status_code == 404
+
+
+def test_root_type_needs_a_root_id(client):
+    assert client.get("/tree", params={"root_type": "state"}).status_code == 400
@@ -0,0 +1,109 @@
+import pytest
+
+
+@pytest.fixture
+def deleted_state(client, seed):
+    """A seeded hierarchy whose second state has been deleted."""
+    data = seed(regions=1, countries=1, states=2, cities=0)
+    response = client.delete(f"/state/{data.id('state', 1)}")
+    assert response.status_code == 200, response.text
+    return data
+
+
+def test_add_under_a_deleted_parent_is_a_404(client, deleted_state):
+    data = deleted_state
+    response = client.post(
+        "/city", json={"name": "Brest", "state_id": data.id("state", 1)}
+    )
+    assert response.status_code == 404
+    assert client.get("/city", params={"search": "Brest"}).json()["list"] == []
+
+
+def test_update_to_a_deleted_parent_is_a_404(client, deleted_state):
+    data = deleted_state
+    city = client.post(
+        "/city", json={"name": "Brest", "state_id": data.id("state", 0)}
+    ).json()
+    response = client.put(
+        f"/city/{city['id']}", json={"name": "Caen", "state_id": data.id("state", 1)}
+    )
+    assert response.status_code == 404
+    city = client.get(f"/city/{city['id']}", params={"expand": "none"}).json()
+    assert (city["name"], city["state_id"]) == ("Brest", data.id("state", 0))
+
+
+def test_update_of_a_deleted_row_is_a_404(client, deleted_state):
+    data = deleted_state
+    response = client.put(
+        f"/state/{data.id('state', 1)}",
+        json={"name": "Bretagne", "country_id": data.id("country", 0)},
+    )
+    assert response.status_code == 404
+
+
+def test_delete_is_a_403_while_the_row_has_live_children(client, seed):
+    data = seed(regions=1, countries=1, states=1, cities=0)
+    state_id = data.id("state", 0)
+    city = client.post("/city", json={"name": "Brest", "state_id": state_id}).json()
+    assert client.delete(f"/state/{state_id}").status_code == 403
+    assert client.get(f"/state/{state_id}").status_code == 200
+
+    assert client.delete(f"/city/{city['id']}").status_code == 200
+    assert client.delete(f"/state/{state_id}").status_code == 200
+    assert client.get(f"/state/{state_id}").status_code == 404
+    assert client.delete(f"/state/{state_id}").status_code == 404
+
+
+def test_cascade_deletes_the_whole_subtree(client, seed):
+    data = seed(regions=1, countries=2, states=4, cities=8)
+    country_id = data.id("country", 0)
+    assert client.delete(f"/countries/{country_id}").status_code == 403
+    response = client.delete(f"/countries/{country_id}", params={"cascade": True})
+    assert response.status_code == 200, response.text
+
+    assert client.get(f"/countries/{country_id}").status_code == 404
+    for prefix in ("state", "city"):
+        rows = client.get(f"/{prefix}/all/", params={"country_id": country_id})
+        assert rows.json() == []
+    # the other country keeps its subtree
+    other = {"country_id": data.id("country", 1)}
+    assert client.get("/state/all/", params=other).json() != []
+    assert client.get("/city/all/", params=other).json() != []
+
+
+def batch_states(client, seed):
+    """Ids of a free state, a state with a city and a missing one."""
+    data = seed(regions=1, countries=1, states=2, cities=0)
+    free, parent = data.id("state", 0), data.id("state", 1)
+    client.post("/city", json={"name": "Brest", "state_id": parent})
+    return free, parent, data.id("state", 2)
+
+
+def test_batch_delete_reports_what_it_left(client, seed):
+    free, parent, missing = batch_states(client, seed)
+    response = client.delete("/state", params={"ids": f"{free},{parent},{missing}"})
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert result["deleted"] == [free]
+    assert {error["id"]: error["detail"] for error in result["errors"]} == {
+        missing: "state is Not found",
+        parent: "State has city",
+    }
+
+
+def test_batch_delete_all_or_nothing(client, seed):
+    free, parent, _ = batch_states(client, seed)
+    response = client.delete(
+        "/state",
+        params={"ids": f"{free},{parent}", "all_or_nothing": True},
+    )
+    assert response.status_code == 403
+    assert client.get(f"/state/{free}").status_code == 200
+
+    response = client.delete(
+        "/state",
+        params={"ids": f"{free},{parent}", "cascade": True, "all_or_nothing": True},
+    )
+    assert response.status_code == 200
+    assert sorted(response.json()["deleted"]) == sorted([free, parent])
+    assert client.get("/city/all/").json() == []